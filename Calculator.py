@@ -1,9 +1,38 @@
 import streamlit as st
 import pandas as pd
+import altair as alt
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from motor_roi import CAMPOS_OEE, calcular_roi_oee, calcular_ale_ciber
+from montecarlo import simular_ciber, beta_desde_media
+from sensibilidad import tornado_oee
+from portafolio import CAMPOS_CIBER, procesar_portafolio
+from optimizador import CATALOGO_BASE, optimizar_modulos
+from flujos import proyectar_flujos, van, tir
+from punto_equilibrio import mejora_minima_roi, costo_maximo_payback, probabilidad_equilibrio
+from oee_logs import oee_desde_bitacora, agregar_oee, resumen_para_roi
+from incidentes import cargar_indice, indice_guardado
 
 # CONFIGURACIÓN DE LA PÁGINA
 st.set_page_config(page_title="Calculadora de Valor Industrial", layout="wide", page_icon="🏭")
 
+# CACHÉ DE SIMULACIONES (mover otros sliders no re-simula)
+@st.cache_data(show_spinner="Simulando escenarios...")
+def simular_ciber_cache(ingreso_diario, dist_dias, dist_prob, costo_ciber, dist_mitig, n):
+    return simular_ciber(ingreso_diario, dist_dias, dist_prob, costo_ciber, dist_mitig, n=n, semilla=42)
+
+# CACHÉ DEL OPTIMIZADOR (los sliders de las otras pestañas no lo vuelven a correr)
+@st.cache_data(max_entries=32, show_spinner=False)
+def optimizar_modulos_cache(catalogo, presupuesto, obligatorios):
+    return optimizar_modulos(catalogo, presupuesto, obligatorios)
+
+# HILO DE FONDO PARA EL BOOTSTRAP DE INCIDENTES (la pestaña no se congela)
+@st.cache_resource
+def ejecutor_fondo():
+    return ThreadPoolExecutor(max_workers=1)
+
 # TÍTULO Y ENCABEZADO
 st.title("🏭 Calculadora de Ingeniería de Valor")
 
@@ -27,7 +56,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- PESTAÑAS DE NAVEGACIÓN ---
-tab1, tab2 = st.tabs(["💰 ROI Operativo (OEE)", "🛡️ ROI Ciberseguridad"])
+tab1, tab2, tab3, tab4 = st.tabs(["💰 ROI Operativo (OEE)", "🛡️ ROI Ciberseguridad", "🧭 Simulador de Estrategia", "📊 Portafolio Multi-Planta"])
 
 # ==============================================================================
 # TAB 1: ROI OPERATIVO (La Verdad Financiera)
@@ -38,37 +67,58 @@ with tab1:
     col1, col2 = st.columns([1, 2])
     
     with col1:
+        # DATOS REALES (Bitácora de máquina en lugar de adivinar)
+        with st.expander("📥 OEE Real desde Bitácora de Máquina (opcional)"):
+            bitacora = st.file_uploader("Bitácora de estados (CSV/Parquet)", type=["csv", "parquet"],
+                                        help="Columnas: timestamp, linea, estado, piezas, piezas_malas. Ordenada por tiempo.")
+            ciclo_ideal = st.number_input("Tiempo de Ciclo Ideal (seg/pieza)", value=1.0, min_value=0.01)
+            horas_turno = st.selectbox("Duración del Turno (h)", [8, 12], index=0)
+            recuperable = st.slider("Brecha Recuperable vs. Clase Mundial (%)", 10, 100, 30, help="Qué parte de la distancia al 85% de OEE esperas recuperar.") / 100
+            if bitacora and st.button("Procesar Bitácora"):
+                estado_bitacora = st.empty()
+                st.session_state.oee_real = oee_desde_bitacora(
+                    bitacora, ciclo_ideal_seg=ciclo_ideal, horas_turno=horas_turno,
+                    progreso=lambda n: estado_bitacora.text(f"{n:,} eventos leídos..."),
+                )
+            if "oee_real" in st.session_state:
+                por_turno = st.session_state.oee_real
+                lineas = st.multiselect("Líneas", sorted(por_turno.index.get_level_values("linea").unique()))
+                real = resumen_para_roi(por_turno, lineas or None, recuperable)
+                st.metric("OEE Actual", f"{real['oee_actual']*100:.1f}%",
+                          help=f"Disp. {real['disponibilidad']*100:.0f}% × Rend. {real['rendimiento']*100:.0f}% × Cal. {real['calidad']*100:.0f}%")
+                st.dataframe(agregar_oee(por_turno, ("linea", "turno"))[["disponibilidad", "rendimiento", "calidad", "oee"]].round(3),
+                             use_container_width=True)
+            else:
+                real = None
+        
         st.subheader("1. Datos de Planta")
         prod_anual = st.number_input("Producción Anual (Unidades)", value=500000, step=1000)
         precio_unit = st.number_input("Precio de Venta Unitario ($)", value=10.0)
         margen_pct = st.slider("Margen de Ganancia Neto (%)", 5, 60, 30) / 100
         
         st.subheader("2. Datos Operativos")
-        horas_anuales = st.number_input("Horas Operativas Anuales", value=4000)
+        horas_anuales = st.number_input("Horas Operativas Anuales", value=int(real["horas_anuales"]) if real else 4000)
         costo_hora_duro = st.number_input("Costo Operativo por Hora (Nómina+Luz) ($)", value=500.0, help="Solo costos que se pagan sí o sí. NO incluyas lucro cesante aquí.")
         
         st.subheader("3. Tu Solución")
         costo_solucion = st.number_input("Inversión Anual Proyecto ($)", value=15000.0)
-        mejora_oee = st.slider("Mejora Estimada de Eficiencia (%)", 1, 15, 5, help="Sé conservador. 5-7% es realista al inicio.") / 100
+        mejora_sugerida = min(15, max(1, round(real["mejora_oee"] * 100))) if real else 5
+        mejora_oee = st.slider("Mejora Estimada de Eficiencia (%)", 1, 15, mejora_sugerida, help="Sé conservador. 5-7% es realista al inicio.") / 100
 
     with col2:
         st.subheader("Resultados Financieros")
         
-        # CÁLCULOS (Lógica Corregida)
-        # 1. Ganancia por Volumen (Opportunity Cost)
-        unidades_hora = prod_anual / horas_anuales
-        horas_ganadas = horas_anuales * mejora_oee
-        unidades_extra = horas_ganadas * unidades_hora
-        ganancia_extra = unidades_extra * precio_unit * margen_pct
-        
-        # 2. Ahorro por Eficiencia (Hard Costs)
-        ahorro_costos = horas_ganadas * costo_hora_duro
-        
-        # 3. Totales
-        beneficio_total = ganancia_extra + ahorro_costos
-        net_value = beneficio_total - costo_solucion
-        roi = (net_value / costo_solucion) * 100 if costo_solucion > 0 else 0
-        payback = (costo_solucion / beneficio_total) * 12 if beneficio_total > 0 else 0
+        # CÁLCULOS (Lógica Corregida, ver motor_roi.py)
+        r = calcular_roi_oee(prod_anual, precio_unit, margen_pct, horas_anuales,
+                             costo_hora_duro, costo_solucion, mejora_oee)
+        unidades_extra = float(r["unidades_extra"])
+        horas_ganadas = float(r["horas_ganadas"])
+        ganancia_extra = float(r["ganancia_extra"])
+        ahorro_costos = float(r["ahorro_costos"])
+        beneficio_total = float(r["beneficio_total"])
+        net_value = float(r["net_value"])
+        roi = float(r["roi"])
+        payback = float(r["payback"])
         
         # VISUALIZACIÓN
         c1, c2, c3 = st.columns(3)
@@ -93,6 +143,73 @@ with tab1:
             st.warning("⚠️ **VEREDICTO:** El proyecto es rentable, pero el margen es ajustado. Requiere ejecución impecable.")
         else:
             st.error("🛑 **VEREDICTO:** No es viable con estos números. Necesitamos reducir el costo de la solución o encontrar más ineficiencias.")
+        
+        # ANÁLISIS DE SENSIBILIDAD (¿Qué dato mueve más el resultado?)
+        with st.expander("🌪️ Análisis de Sensibilidad (Tornado)"):
+            col_t1, col_t2 = st.columns(2)
+            variacion = col_t1.slider("Variación de cada dato (±%)", 5, 50, 10) / 100
+            metrica = col_t2.radio("Ordenar por", ["net_value", "payback"], horizontal=True,
+                                   format_func=lambda m: "Valor Neto ($)" if m == "net_value" else "Payback (Meses)")
+            
+            tornado = tornado_oee({
+                "prod_anual": prod_anual, "precio_unit": precio_unit, "margen_pct": margen_pct,
+                "horas_anuales": horas_anuales, "costo_hora_duro": costo_hora_duro,
+                "costo_solucion": costo_solucion, "mejora_oee": mejora_oee,
+            }, variacion, metrica)
+            
+            base_metrica = tornado.attrs[f"{metrica}_base"]
+            barras = pd.concat([
+                pd.DataFrame({"Dato": tornado["variable"], "Escenario": f"-{variacion*100:.0f}%",
+                              "Cambio": tornado[f"{metrica}_bajo"] - base_metrica}),
+                pd.DataFrame({"Dato": tornado["variable"], "Escenario": f"+{variacion*100:.0f}%",
+                              "Cambio": tornado[f"{metrica}_alto"] - base_metrica}),
+            ])
+            grafica = alt.Chart(barras).mark_bar().encode(
+                x=alt.X("Cambio:Q", title=f"Cambio en {metrica} vs. base"),
+                y=alt.Y("Dato:N", sort=tornado["variable"].tolist(), title=None),
+                color="Escenario:N",
+            )
+            st.altair_chart(grafica, use_container_width=True)
+            st.caption(f"Base: {base_metrica:,.1f}. Cada barra mueve un solo dato, los demás se quedan fijos.")
+        
+        # PUNTO DE EQUILIBRIO (Preguntas inversas sin mover sliders)
+        with st.expander("🎯 Punto de Equilibrio (Goal-Seek)"):
+            col_g1, col_g2 = st.columns(2)
+            roi_objetivo = col_g1.number_input("ROI Objetivo (%)", value=100.0, step=25.0)
+            meses_objetivo = col_g2.number_input("Payback Objetivo (Meses)", value=12.0, step=1.0, min_value=0.5)
+            
+            datos_planta = dict(prod_anual=prod_anual, precio_unit=precio_unit, margen_pct=margen_pct,
+                                horas_anuales=horas_anuales, costo_hora_duro=costo_hora_duro)
+            mejora_min = float(mejora_minima_roi(**datos_planta, costo_solucion=costo_solucion, roi_objetivo=roi_objetivo))
+            costo_max = float(costo_maximo_payback(**datos_planta, mejora_oee=mejora_oee, meses=meses_objetivo))
+            
+            c_g1, c_g2 = st.columns(2)
+            c_g1.metric(f"Mejora OEE mínima para ROI ≥ {roi_objetivo:.0f}%", "N/A" if pd.isna(mejora_min) else f"{mejora_min*100:.2f}%")
+            c_g2.metric(f"Inversión máxima para pagarse en {meses_objetivo:.0f} meses", f"${costo_max:,.0f}")
+        
+        # FLUJO MULTI-AÑO (Lo que pide Finanzas)
+        with st.expander("📈 Flujo de Efectivo Multi-Año (VAN / TIR)"):
+            col_f1, col_f2 = st.columns(2)
+            anios = col_f1.slider("Horizonte (Años)", 1, 10, 5)
+            anios_rampa = col_f1.slider("Años para alcanzar la mejora completa", 1, 5, 2, help="La mejora de OEE no llega completa el primer año.")
+            forma_rampa = col_f1.radio("Curva de arranque", ["lineal", "s"], horizontal=True, format_func=lambda f: "Lineal" if f == "lineal" else "Curva S")
+            tasa_descuento = col_f2.slider("Tasa de Descuento (%)", 0, 30, 12) / 100
+            inversion_inicial = col_f2.number_input("Inversión Inicial Única ($)", value=0.0, step=5000.0, help="Implementación, hardware, etc. La inversión anual se paga al inicio de cada año.")
+            
+            flujos = proyectar_flujos(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro,
+                                      costo_solucion, mejora_oee, anios, anios_rampa, forma_rampa, inversion_inicial)
+            valor_presente = float(van(flujos, tasa_descuento)[0])
+            tasa_interna = float(tir(flujos)[0])
+            
+            c_f1, c_f2 = st.columns(2)
+            c_f1.metric("VAN (Valor Actual Neto)", f"${valor_presente:,.0f}")
+            c_f2.metric("TIR (Tasa Interna de Retorno)", "N/A" if pd.isna(tasa_interna) else f"{tasa_interna*100:.1f}%")
+            
+            st.bar_chart(pd.DataFrame({
+                "Año": range(anios + 1),
+                "Flujo Neto ($)": flujos[0],
+                "Flujo Acumulado ($)": flujos[0].cumsum(),
+            }), x="Año", stack=False)
 
 # ==============================================================================
 # TAB 2: ROI CIBERSEGURIDAD (El Slider de la Verdad)
@@ -103,19 +220,77 @@ with tab2:
     col_cyber1, col_cyber2 = st.columns([1, 2])
     
     with col_cyber1:
+        # HISTÓRICO DE INCIDENTES (Bootstrap en lugar de adivinar)
+        with st.expander("📚 Histórico de Incidentes (opcional)"):
+            ruta_incidentes = st.text_input("Archivo de incidentes (CSV/Parquet)", placeholder="datos/incidentes.csv",
+                                            help="Columnas: industria, dias_paro, costo. Precalcula con: python incidentes.py <archivo>")
+            ruta_exposicion = st.text_input("Exposición por industria (CSV, opcional)", placeholder="datos/exposicion.csv",
+                                            help="Columnas: industria, planta_anios. Sin esto no se estima la probabilidad.")
+            historico = None
+            if ruta_incidentes and not os.path.exists(ruta_incidentes):
+                st.warning("No se encontró el archivo de incidentes.")
+            elif ruta_incidentes:
+                exposicion = ruta_exposicion if ruta_exposicion and os.path.exists(ruta_exposicion) else None
+                indice = indice_guardado(ruta_incidentes, exposicion)
+                if indice is None:
+                    # Sin índice vigente: se remuestrea en segundo plano y se avisa
+                    llave = (ruta_incidentes, exposicion)
+                    tarea = st.session_state.get("indice_incidentes")
+                    if tarea is None or tarea[0] != llave:
+                        tarea = (llave, ejecutor_fondo().submit(cargar_indice, ruta_incidentes, exposicion))
+                        st.session_state.indice_incidentes = tarea
+                    if tarea[1].done():
+                        try:
+                            indice = tarea[1].result()
+                        except (ValueError, KeyError) as e:
+                            st.error(f"Error en el histórico: {e}")
+                    else:
+                        st.info("Calculando intervalos bootstrap en segundo plano...")
+                        st.button("Actualizar")
+                if indice:
+                    industria = st.selectbox("Industria", list(indice), format_func=lambda k: "Todas" if k == "todas" else k)
+                    historico = indice[industria]
+                    st.metric("Días de Paro (media)", f"{historico['dias_paro']:.1f}",
+                              help=f"IC 95%: {historico['dias_paro_ic'][0]:.1f} - {historico['dias_paro_ic'][1]:.1f} ({historico['incidentes']:,} incidentes)")
+                    st.metric("Costo por Incidente (media)", f"${historico['costo']:,.0f}",
+                              help=f"IC 95%: ${historico['costo_ic'][0]:,.0f} - ${historico['costo_ic'][1]:,.0f}")
+                    if historico["probabilidad"] == historico["probabilidad"]:  # No es NaN
+                        st.metric("Probabilidad Anual", f"{historico['probabilidad']*100:.1f}%",
+                                  help=f"IC 95%: {historico['probabilidad_ic'][0]*100:.1f}% - {historico['probabilidad_ic'][1]*100:.1f}%")
+
         ingreso_diario = st.number_input("Ingreso Diario de la Planta ($)", value=50000.0)
-        dias_paro = st.slider("Días de Paro por Ransomware", 1, 30, 14, help="El promedio de la industria es 21 días para recuperación total.")
-        probabilidad = st.slider("Probabilidad de Ataque Anual (%)", 1, 50, 10, help="Deja que el cliente mueva esto.") / 100
+        dias_sugeridos = min(30, max(1, round(historico["dias_paro"]))) if historico else 14
+        dias_paro = st.slider("Días de Paro por Ransomware", 1, 30, dias_sugeridos, help="El promedio de la industria es 21 días para recuperación total.")
+        prob_sugerida = 10
+        if historico and historico["probabilidad"] == historico["probabilidad"]:
+            prob_sugerida = min(50, max(1, round(historico["probabilidad"] * 100)))
+        probabilidad = st.slider("Probabilidad de Ataque Anual (%)", 1, 50, prob_sugerida, help="Deja que el cliente mueva esto.") / 100
         costo_ciber = st.number_input("Costo Solución Ciberseguridad ($)", value=12000.0)
         mitigacion = st.slider("Capacidad de Mitigación (%)", 50, 99, 85) / 100
         
+        st.markdown("---")
+        modo_simulacion = st.toggle("🎲 Modo Simulación (Monte Carlo)", value=False, help="Trata cada dato como un rango incierto en lugar de un valor fijo.")
+        if modo_simulacion:
+            with st.expander("Distribuciones", expanded=True):
+                tipo_dias = st.selectbox("Días de Paro", ["Triangular", "Lognormal"])
+                if tipo_dias == "Triangular":
+                    dias_min, dias_max = st.slider("Rango de Días (mín - máx)", 1, 60, (min(7, dias_paro), max(30, dias_paro)))
+                    dist_dias = ("triangular", dias_min, min(max(dias_paro, dias_min), dias_max), dias_max)
+                else:
+                    sigma_dias = st.slider("Dispersión (sigma log)", 0.1, 1.5, 0.5)
+                    dist_dias = ("lognormal", dias_paro, sigma_dias)
+                conc_prob = st.slider("Certeza sobre la Probabilidad (Beta)", 2, 200, 20, help="Más alto = menos incertidumbre alrededor del valor del slider.")
+                conc_mitig = st.slider("Certeza sobre la Mitigación (Beta)", 2, 200, 30)
+                n_muestras = st.select_slider("Muestras", options=[100_000, 1_000_000, 2_000_000], value=1_000_000)
+        
     with col_cyber2:
-        # CÁLCULOS
-        impacto_evento = (ingreso_diario * dias_paro) * 1.2 # 1.2 factor de recuperación técnica
-        ale_actual = impacto_evento * probabilidad
-        ale_futuro = ale_actual * (1 - mitigacion)
-        ahorro_riesgo = ale_actual - ale_futuro
-        roi_ciber = ((ahorro_riesgo - costo_ciber) / costo_ciber) * 100 if costo_ciber > 0 else 0
+        # CÁLCULOS (ver motor_roi.py)
+        r_ciber = calcular_ale_ciber(ingreso_diario, dias_paro, probabilidad, costo_ciber, mitigacion)
+        impacto_evento = float(r_ciber["impacto_evento"])
+        ale_actual = float(r_ciber["ale_actual"])
+        ale_futuro = float(r_ciber["ale_futuro"])
+        ahorro_riesgo = float(r_ciber["ahorro_riesgo"])
+        roi_ciber = float(r_ciber["roi_ciber"])
         
         st.subheader("Exposición al Riesgo")
         
@@ -128,96 +303,149 @@ with tab2:
         st.write(f"Al reducir el riesgo un **{mitigacion*100:.0f}%**, proteges valor por:")
         st.title(f"${ahorro_riesgo:,.0f} / año")
         
-        st.metric("ROI de la Protección", f"{roi_ciber:.1f}%")
+        c_r1, c_r2 = st.columns(2)
+        c_r1.metric("ROI de la Protección", f"{roi_ciber:.1f}%")
+        prob_eq = float(probabilidad_equilibrio(ingreso_diario, dias_paro, costo_ciber, mitigacion))
+        c_r2.metric("Probabilidad de Equilibrio", "N/A" if pd.isna(prob_eq) else f"{prob_eq*100:.2f}%",
+                    help="Probabilidad anual de ataque a partir de la cual la protección se paga sola.")
         
         chart_data = pd.DataFrame({
             "Escenario": ["Riesgo Actual", "Riesgo con Solución"],
             "Pérdida Esperada ($)": [ale_actual, ale_futuro]
         })
         st.bar_chart(chart_data, x="Escenario", y="Pérdida Esperada ($)")
+        
+        if modo_simulacion:
+            st.markdown("---")
+            st.subheader("Riesgo de Cola (Monte Carlo)")
+            sim = simular_ciber_cache(
+                ingreso_diario, dist_dias,
+                beta_desde_media(probabilidad, conc_prob),
+                costo_ciber,
+                beta_desde_media(mitigacion, conc_mitig, 0.5, 0.99),
+                n_muestras,
+            )
+            pct = sim["percentiles"]
+            tabla_pct = pd.DataFrame({
+                "ALE Actual ($)": pct["ale_actual"],
+                "ALE con Solución ($)": pct["ale_futuro"],
+                "ROI Protección (%)": pct["roi_ciber"],
+            }).rename(index=lambda p: f"P{p}")
+            st.dataframe(tabla_pct.round(0), use_container_width=True)
+            st.caption(f"{sim['n']:,} escenarios simulados. Probabilidad de ROI positivo: {sim['prob_roi_positivo']*100:.1f}%")
+            
+            st.write("**Curva de Excedencia de Pérdidas** (probabilidad anual de perder más de X)")
+            curva = sim["curva_excedencia"]
+            st.line_chart(pd.DataFrame({
+                "Pérdida ($)": curva["perdida"],
+                "Riesgo Actual": curva["prob_actual"],
+                "Riesgo con Solución": curva["prob_futuro"],
+            }), x="Pérdida ($)")
 
 # ==============================================================================
 # TAB 3: SIMULADOR DE ESTRATEGIA (Lógica de Dependencias)
 # ==============================================================================
-# with tab3:
-#     st.header("Priorización de Inversiones")
-#     st.markdown("Simulador de presupuesto basado en dependencias técnicas (No puedes predecir sin medir).")
-#     
-#     presupuesto = st.number_input("💰 Presupuesto Disponible ($)", value=40000.0, step=5000.0)
-#     
-#     st.write("Selecciona los módulos a implementar:")
-#     
-#     col_s1, col_s2 = st.columns(2)
-#     
-#     with col_s1:
-#         check_monitoreo = st.checkbox("1. Monitoreo Básico (OEE)", value=True, help="Costo: $10k. Requisito base.")
-#         check_integracion = st.checkbox("2. Integración IT/OT (Gateway)", value=False, help="Costo: $15k. Requiere Monitoreo.")
-#         check_predictivo = st.checkbox("3. Analítica Predictiva (IA)", value=False, help="Costo: $25k. Requiere Integración.")
-#         check_ciber = st.checkbox("4. Ciberseguridad Industrial", value=False, help="Costo: $8k. Crítico.")
-#         
-#     # LÓGICA DE DEPENDENCIAS Y PRESUPUESTO
-#     costos_items = {
-#         "Monitoreo": 10000, "Integración": 15000, "Predictivo": 25000, "Ciberseguridad": 8000
-#     }
-#     impacto_items = { # Impacto en productividad
-#         "Monitoreo": 0.05, "Integración": 0.03, "Predictivo": 0.12, "Ciberseguridad": 0.0
-#     }
-#     
-#     gasto_total = 0
-#     impacto_total = 0
-#     mensajes = []
-#     estado = "OK"
-#     
-#     # Validación Lógica
-#     if check_monitoreo:
-#         gasto_total += costos_items["Monitoreo"]
-#         impacto_total += impacto_items["Monitoreo"]
-#     
-#     if check_integracion:
-#         if not check_monitoreo:
-#             mensajes.append("❌ ERROR: No puedes integrar IT/OT sin Monitoreo base.")
-#             estado = "ERROR"
-#         else:
-#             gasto_total += costos_items["Integración"]
-#             impacto_total += impacto_items["Integración"]
-#             
-#     if check_predictivo:
-#         if not check_integracion:
-#             mensajes.append("❌ ERROR: La IA Predictiva requiere Integración IT/OT (Datos limpios).")
-#             estado = "ERROR"
-#         else:
-#             gasto_total += costos_items["Predictivo"]
-#             impacto_total += impacto_items["Predictivo"]
-#             
-#     if check_ciber:
-#         gasto_total += costos_items["Ciberseguridad"]
-#         # No suma productividad directa, pero es necesaria.
-# 
-#     with col_s2:
-#         st.subheader("Análisis de Viabilidad")
-#         
-#         if estado == "ERROR":
-#             for msg in mensajes:
-#                 st.error(msg)
-#         else:
-#             # Chequeo de Presupuesto
-#             if gasto_total > presupuesto:
-#                 st.error(f"💸 PRESUPUESTO EXCEDIDO por ${gasto_total - presupuesto:,.0f}")
-#             else:
-#                 st.success(f"✅ Estrategia Viable. Sobran ${presupuesto - gasto_total:,.0f}")
-#                 
-#                 st.markdown(f"""
-#                 <div class="success-box">
-#                     <h3>Resultados Proyectados:</h3>
-#                     <ul>
-#                         <li><strong>Inversión Total:</strong> ${gasto_total:,.0f}</li>
-#                         <li><strong>Mejora Productiva Estimada:</strong> {impacto_total*100:.1f}%</li>
-#                         <li><strong>Estado de Seguridad:</strong> {'🔒 Protegido' if check_ciber else '⚠️ RIESGO ALTO (Sin Ciberseguridad)'}</li>
-#                     </ul>
-#                 </div>
-#                 """, unsafe_allow_html=True)
-#                 
-#                 # Barra de progreso del presupuesto
-#                 pct_uso = gasto_total / presupuesto
-#                 st.write(f"Uso de Presupuesto: {pct_uso*100:.1f}%")
-#                 st.progress(pct_uso)
\ No newline at end of file
+with tab3:
+    st.header("Priorización de Inversiones")
+    st.markdown("Optimizador de presupuesto basado en dependencias técnicas (No puedes predecir sin medir).")
+    
+    presupuesto = st.number_input("💰 Presupuesto Disponible ($)", value=40000.0, step=5000.0)
+    
+    col_s1, col_s2 = st.columns(2)
+    
+    with col_s1:
+        st.write("Catálogo de módulos (edita, agrega filas o sube un CSV):")
+        archivo_catalogo = st.file_uploader("Catálogo CSV (nombre, costo, impacto, requiere)", type="csv")
+        if archivo_catalogo:
+            catalogo_df = pd.read_csv(archivo_catalogo)
+        else:
+            catalogo_df = pd.DataFrame([{**m, "requiere": ", ".join(m["requiere"])} for m in CATALOGO_BASE])
+        catalogo_df = st.data_editor(
+            catalogo_df, num_rows="dynamic", use_container_width=True,
+            column_config={
+                "costo": st.column_config.NumberColumn("Costo ($)", format="$%d"),
+                "impacto": st.column_config.NumberColumn("Impacto (fracción de productividad)"),
+                "requiere": st.column_config.TextColumn("Requiere (separados por coma)"),
+            },
+        )
+        catalogo = [{
+            "nombre": str(fila["nombre"]).strip(),
+            "costo": float(fila["costo"]),
+            "impacto": float(fila["impacto"]),
+            "requiere": [r.strip() for r in str(fila["requiere"]).split(",") if r.strip()],
+        } for fila in catalogo_df.dropna(subset=["nombre", "costo", "impacto"]).fillna({"requiere": ""}).to_dict("records")]
+        
+        obligatorios = st.multiselect("Módulos obligatorios", [m["nombre"] for m in catalogo],
+                                      help="Se incluyen sí o sí, junto con sus prerrequisitos (ej. Ciberseguridad).")
+    
+    with col_s2:
+        st.subheader("Análisis de Viabilidad")
+        
+        try:
+            plan = optimizar_modulos_cache(catalogo, presupuesto, tuple(obligatorios))
+        except ValueError as e:
+            st.error(f"❌ ERROR: {e}")
+        else:
+            gasto_total = plan["costo_total"]
+            impacto_total = plan["impacto_total"]
+            protegido = any("ciber" in n.lower() for n in plan["seleccion"])
+            
+            if plan["optimo"]:
+                st.success(f"✅ Estrategia Óptima. Sobran ${presupuesto - gasto_total:,.0f}")
+            else:
+                st.success(f"✅ Estrategia Recomendada. Sobran ${presupuesto - gasto_total:,.0f}")
+                st.warning("⚠️ Catálogo muy grande o con dependencias muy cruzadas: la selección es la mejor encontrada en el tiempo disponible, no una óptima garantizada.")
+            
+            st.markdown(f"""
+            <div class="success-box">
+                <h3>Resultados Proyectados:</h3>
+                <ul>
+                    <li><strong>Módulos:</strong> {' → '.join(plan['seleccion']) or 'Ninguno'}</li>
+                    <li><strong>Inversión Total:</strong> ${gasto_total:,.0f}</li>
+                    <li><strong>Mejora Productiva Estimada:</strong> {impacto_total*100:.1f}%</li>
+                    <li><strong>Estado de Seguridad:</strong> {'🔒 Protegido' if protegido else '⚠️ RIESGO ALTO (Sin Ciberseguridad)'}</li>
+                </ul>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            # Barra de progreso del presupuesto
+            pct_uso = gasto_total / presupuesto if presupuesto > 0 else 0
+            st.write(f"Uso de Presupuesto: {pct_uso*100:.1f}%")
+            st.progress(min(pct_uso, 1.0))
+
+# ==============================================================================
+# TAB 4: PORTAFOLIO MULTI-PLANTA (Carga Masiva)
+# ==============================================================================
+with tab4:
+    st.header("Análisis de Portafolio")
+    st.markdown("Sube un CSV o Parquet con una planta por fila. También corre sin Streamlit: `python portafolio.py plantas.csv -o resultados.csv`")
+    
+    with st.expander("Formato de columnas"):
+        st.write("**Obligatorias (OEE):** " + ", ".join(CAMPOS_OEE))
+        st.write("**Opcionales (Ciber, todas o ninguna):** " + ", ".join(CAMPOS_CIBER))
+        st.caption("Porcentajes en 0-100, igual que en los sliders (margen_pct=30 significa 30%).")
+    
+    archivo_plantas = st.file_uploader("Cargar Portafolio", type=["csv", "parquet"])
+    formato_salida = st.radio("Formato de resultados", ["csv", "parquet"], horizontal=True)
+    
+    if archivo_plantas and st.button("Calcular Portafolio"):
+        barra = st.progress(0.0)
+        estado = st.empty()
+        # El directorio temporal se borra al salir; solo quedan los bytes para la descarga
+        with tempfile.TemporaryDirectory(prefix="portafolio_") as carpeta:
+            destino = os.path.join(carpeta, f"resultados.{formato_salida}")
+            try:
+                total = procesar_portafolio(
+                    archivo_plantas, destino, formato_salida=formato_salida,
+                    progreso=lambda n: estado.text(f"{n:,} plantas procesadas..."),
+                )
+                barra.progress(1.0)
+                with open(destino, "rb") as f:
+                    st.session_state.portafolio = {"datos": f.read(), "total": total, "formato": formato_salida}
+            except ValueError as e:
+                st.error(f"❌ {e}")
+    
+    if "portafolio" in st.session_state:
+        resultado = st.session_state.portafolio
+        st.success(f"✅ {resultado['total']:,} plantas calculadas.")
+        st.download_button("Bajar Resultados", resultado["datos"], f"resultados_portafolio.{resultado['formato']}")
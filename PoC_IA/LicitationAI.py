@@ -2,9 +2,14 @@ import streamlit as st
 import google.generativeai as genai
 from pypdf import PdfReader
 import pandas as pd
-import json
 import io
 
+from concurrent.futures import ThreadPoolExecutor
+
+from extraccion import textos_pagina
+from json_incremental import parsear_tolerante
+from fragmentos import fragmentar, combinar_resultados
+
 # --- Configuración de ventana ---
 st.set_page_config(page_title="Licitation AI", layout="wide")
 
@@ -18,6 +23,8 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+MAX_TOKENS_FRAGMENTO = 50_000  # Tokens contados con tokens.py; en español, ~200k caracteres (el recorte que se usaba antes)
+
 # --- CATÁLOGO MOCK (reemplazar por el nuestro) ---
 CATALOGO_MOCK = """
 1. SKU: CS-9200L-48P | Marca: Cisco | Switch Catalyst 9200L 48 puertos PoE+. Precio: $4,500.
@@ -28,15 +35,9 @@ CATALOGO_MOCK = """
 
 def get_pdf_text(uploaded_file):
     reader = PdfReader(uploaded_file)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text
+    return "".join(textos_pagina(reader))
 
-def analizar_completo(text, api_key):
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-2.5-flash') # Usar Flash para velocidad, Pro para razonamiento complejo
-    
+def construir_prompt(fragmento):
     # --- Prompt ---
     prompt = f"""
     ERES: Un Analista Senior de Licitaciones y Preventa Técnica.
@@ -59,7 +60,7 @@ def analizar_completo(text, api_key):
        - Asigna el producto si Match > 80%. Si no, pon "TERCERIA".
     
     DOCUMENTO DE ENTRADA:
-    {text[:200000]} 
+    {fragmento} 
     
     FORMATO DE SALIDA (JSON ÚNICO):
     {{
@@ -85,11 +86,25 @@ def analizar_completo(text, api_key):
     }}
     Responde SOLO con el JSON.
     """
+    return prompt
+
+def analizar_fragmento(model, fragmento):
+    response = model.generate_content(construir_prompt(fragmento))
+    data = parsear_tolerante(response.text)
+    if not data:
+        raise ValueError("La respuesta del modelo no contiene JSON válido")
+    return data
+
+def analizar_completo(text, api_key):
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel('gemini-2.5-flash') # Usar Flash para velocidad, Pro para razonamiento complejo
     
+    # Map-reduce: el pliego completo en fragmentos paralelos, sin recortar (ver fragmentos.py)
+    fragmentos = fragmentar(text, MAX_TOKENS_FRAGMENTO)
     try:
-        response = model.generate_content(prompt)
-        clean_json = response.text.replace("```json", "").replace("```", "").strip()
-        return json.loads(clean_json)
+        with ThreadPoolExecutor(max_workers=min(len(fragmentos), 8)) as pool:
+            parciales = list(pool.map(lambda f: analizar_fragmento(model, f.texto), fragmentos))
+        return combinar_resultados(parciales)
     except Exception as e:
         st.error(f"Error en el análisis: {e}")
         try:
@@ -0,0 +1,165 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+
+from cache_texto import podar_por_uso
+
+# ==============================================================================
+# ALMACÉN COMPARTIDO DE DOCUMENTOS CONSOLIDADOS
+# ==============================================================================
+# En vez de guardar el texto consolidado de cada licitación en la sesión de cada
+# usuario, se guarda una sola vez en disco, bajo el SHA-256 del texto: diez
+# analistas abriendo las mismas bases comparten un solo archivo, y la sesión
+# solo conserva un `Documento` (huella y largo).
+#
+# El archivo está comprimido por bloques independientes de BLOQUE caracteres,
+# con una tabla de offsets al inicio, y se lee con mmap: para sacar un rango
+# (los pasajes que el chat manda al modelo) se descomprimen solo los bloques
+# que lo cubren; el índice del chat guarda offsets, no texto. Los
+# últimos mapas abiertos y los últimos bloques leídos se comparten entre todas
+# las sesiones del proceso; un mapa que sale del LRU se cierra.
+#
+# Variables de entorno:
+#   LICI_ALMACEN_DIR  carpeta del almacén (por defecto ~/.cache/licitacion_ai/documentos)
+#   LICI_ALMACEN_MB   tamaño máximo en MB (por defecto 2000)
+
+DIRECTORIO = os.environ.get("LICI_ALMACEN_DIR",
+                            os.path.join(os.path.expanduser("~"), ".cache", "licitacion_ai", "documentos"))
+MAX_MB = float(os.environ.get("LICI_ALMACEN_MB", 2000))
+BLOQUE = 64 * 1024         # Caracteres por bloque comprimido
+BLOQUES_EN_MEMORIA = 64    # Bloques descomprimidos que se conservan (LRU), para todo el proceso
+MAPAS_ABIERTOS = 16        # Documentos mapeados a la vez (LRU); los demás se vuelven a abrir al leerlos
+
+MAGIA = b"LICIDOC1"
+_CABECERA = struct.Struct("<8sQQQ")  # magia, largo en caracteres, caracteres por bloque, número de bloques
+
+# Lo que guarda la sesión en lugar del texto
+Documento = namedtuple("Documento", "huella largo")
+
+
+class DocumentoNoDisponible(KeyError):
+    """El documento ya no está en el almacén (p. ej. lo borró la poda)."""
+
+
+class AlmacenDocumentos:
+    """Textos consolidados comprimidos en disco, deduplicados por contenido y leídos con mmap."""
+
+    def __init__(self, directorio=DIRECTORIO, max_mb=MAX_MB, bloques_en_memoria=BLOQUES_EN_MEMORIA,
+                 mapas_abiertos=MAPAS_ABIERTOS):
+        self.directorio = directorio
+        self.max_bytes = int(max_mb * 2**20)
+        self.bloques_en_memoria = bloques_en_memoria
+        self.mapas_abiertos = mapas_abiertos
+        self._mapas = OrderedDict()    # huella -> (mmap, offsets, largo, bloque)
+        self._bloques = OrderedDict()  # (huella, n) -> texto del bloque
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, sha):
+        return os.path.join(self.directorio, sha[:2], f"{sha}.doc")
+
+    def guardar(self, texto):
+        """Guarda el texto (si no estaba ya) y devuelve su Documento."""
+        sha = hashlib.sha256(texto.encode("utf-8")).hexdigest()
+        ruta = self._ruta(sha)
+        if not os.path.exists(ruta):
+            self._escribir(ruta, texto)
+            self.podar()
+        self._mapa(sha)  # Se mapea ya: el mapa sigue válido aunque otro proceso borre el archivo
+        return Documento(sha, len(texto))
+
+    def _escribir(self, ruta, texto):
+        bloques = [zlib.compress(texto[i:i + BLOQUE].encode("utf-8"), 6) for i in range(0, len(texto), BLOQUE)]
+        offsets, posicion = [], _CABECERA.size + 8 * (len(bloques) + 1)
+        for b in bloques:
+            offsets.append(posicion)
+            posicion += len(b)
+        offsets.append(posicion)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_CABECERA.pack(MAGIA, len(texto), BLOQUE, len(bloques)))
+                f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+                for b in bloques:
+                    f.write(b)
+            os.replace(temporal, ruta)
+        except OSError:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+    def _mapa(self, sha):
+        with self._lock:
+            return self._mapa_sin_lock(sha)
+
+    def _mapa_sin_lock(self, sha):
+        # Se llama con self._lock tomado: un mapa solo se cierra bajo el lock
+        if sha in self._mapas:
+            self._mapas.move_to_end(sha)
+            return self._mapas[sha]
+        try:
+            with open(self._ruta(sha), "rb") as f:
+                os.utime(f.fileno())  # Marca de uso reciente para el LRU
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise DocumentoNoDisponible(sha) from e
+        magia, largo, bloque, n = _CABECERA.unpack_from(mapa, 0)
+        if magia != MAGIA:
+            mapa.close()
+            raise DocumentoNoDisponible(sha)
+        offsets = struct.unpack_from(f"<{n + 1}Q", mapa, _CABECERA.size)
+        self._mapas[sha] = (mapa, offsets, largo, bloque)
+        while len(self._mapas) > self.mapas_abiertos:
+            self._mapas.popitem(last=False)[1][0].close()
+        return self._mapas[sha]
+
+    def _bloque(self, sha, n):
+        llave = (sha, n)
+        with self._lock:
+            if llave in self._bloques:
+                self._bloques.move_to_end(llave)
+                return self._bloques[llave]
+            # Se copia el bloque comprimido antes de soltar el lock; se descomprime fuera
+            mapa, offsets, _, _ = self._mapa_sin_lock(sha)
+            comprimido = mapa[offsets[n]:offsets[n + 1]]
+        texto = zlib.decompress(comprimido).decode("utf-8")
+        with self._lock:
+            self._bloques[llave] = texto
+            while len(self._bloques) > self.bloques_en_memoria:
+                self._bloques.popitem(last=False)
+        return texto
+
+    def leer(self, documento, inicio=0, fin=None):
+        """Texto [inicio, fin) del documento, descomprimiendo solo los bloques necesarios."""
+        _, _, largo, bloque = self._mapa(documento.huella)
+        fin = largo if fin is None else min(fin, largo)
+        if fin <= inicio:
+            return ""
+        primero, ultimo = inicio // bloque, (fin - 1) // bloque
+        if primero == ultimo:
+            return self._bloque(documento.huella, primero)[inicio - primero * bloque:fin - primero * bloque]
+        piezas = [self._bloque(documento.huella, n) for n in range(primero, ultimo + 1)]
+        return "".join(piezas)[inicio - primero * bloque:fin - primero * bloque]
+
+    def podar(self):
+        """Borra los documentos menos usados hasta quedar bajo el límite de tamaño.
+
+        Los que borra se cierran aquí; otros procesos los siguen leyendo hasta cerrar su mapa.
+        """
+        for ruta in podar_por_uso(self.directorio, ".doc", self.max_bytes):
+            self._olvidar(os.path.basename(ruta)[:-len(".doc")])
+
+    def _olvidar(self, sha):
+        """Cierra el mapa de un documento borrado y descarta sus bloques."""
+        with self._lock:
+            abierto = self._mapas.pop(sha, None)
+            if abierto is not None:
+                abierto[0].close()
+            for llave in [llave for llave in self._bloques if llave[0] == sha]:
+                del self._bloques[llave]
@@ -0,0 +1,205 @@
+import time
+
+from fragmentos import fragmentar, MAX_TOKENS_FRAGMENTO
+from enrutador import paginas_por_modulo, texto_de_paginas, etiqueta_pagina, MARGEN
+from tokens import contar_tokens, presupuesto_prompt, empaquetar_paginas
+from cache_ia import llave_respuesta
+from limitador import espera_exponencial
+from json_incremental import ParserIncremental
+
+# ==============================================================================
+# ANÁLISIS MODULAR (sin Streamlit)
+# ==============================================================================
+# Prompts de los módulos General, Legal y Técnico, la llamada al modelo con
+# reintentos y el armado de las tareas (enrutado + presupuesto de tokens).
+# No importa Streamlit: lo usan tanto la app como los trabajadores en segundo
+# plano (ver trabajador.py), que lo cargan sin ejecutar la interfaz.
+
+MODELO_ANALISIS = 'gemini-2.5-flash'
+MAX_LLAMADAS_SIMULTANEAS = 8
+INTERVALO_PARCIAL = 0.5  # Segundos entre reportes del JSON parcial mientras llega la respuesta
+
+CATALOGO_MOCK = """
+1. SKU: CS-9200L-48P | Marca: Cisco | Switch Catalyst 9200L 48 puertos PoE+. Precio: $4,500.
+2. SKU: DL-R750-XS | Marca: Dell | Servidor PowerEdge R750 Xeon Gold. Precio: $12,500.
+3. SKU: FG-60F-BDL | Marca: Fortinet | Firewall FortiGate 60F. Precio: $950.
+"""
+
+
+def llamada_segura_ia(model, prompt, modulo_nombre, limitador=None, aviso=None, cache=None, refrescar=False,
+                      parcial=None):
+    """Realiza una llamada a la API con manejo de errores y reintentos.
+
+    Puede correr en un hilo: no toca Streamlit, los avisos de espera salen por `aviso`.
+    Con `cache` (CacheIA) un prompt ya respondido no vuelve a la API; `refrescar`
+    ignora lo guardado y lo reemplaza con la respuesta nueva.
+    La respuesta llega por streaming: `parcial` recibe cada tanto el JSON con las
+    filas completas hasta el momento, y una respuesta truncada o con un carácter
+    inválido conserva su parte válida (ver json_incremental.py).
+    """
+    if cache is not None:
+        llave = llave_respuesta(model.model_name, prompt, getattr(model, "_generation_config", None))
+        guardado = None if refrescar else cache.obtener(llave)
+        if guardado is not None:
+            return guardado
+    max_retries = 5
+    for attempt in range(max_retries):
+        if limitador: limitador.adquirir()
+        parser = ParserIncremental()
+        try:
+            ultimo_parcial = time.monotonic()
+            for trozo in model.generate_content(prompt, stream=True):
+                try:
+                    texto = trozo.text
+                except ValueError:
+                    continue  # Trozo sin texto (solo metadatos)
+                parser.alimentar(texto)
+                if parcial and time.monotonic() - ultimo_parcial >= INTERVALO_PARCIAL:
+                    parcial(parser.resultado())
+                    ultimo_parcial = time.monotonic()
+            if limitador: limitador.exito()
+            data = parser.resultado(final=True)
+            # Solo se guarda en caché una respuesta que cerró bien
+            if cache is not None and data and parser.completo: cache.guardar(llave, model.model_name, data)
+            return data
+        except Exception as e:
+            if "429" in str(e) or "quota" in str(e).lower():
+                # Backoff exponencial con jitter; el limitador baja el ritmo para todos los módulos
+                if limitador: limitador.saturado()
+                espera = espera_exponencial(attempt)
+                if aviso: aviso(f"Cuota excedida. Esperando {espera:.0f}s para módulo {modulo_nombre}...")
+                time.sleep(espera)
+            else:
+                return parser.resultado(final=True)
+    return {}
+
+
+def prompts_modulos(fragmento, enfoque):
+    """Prompts de los tres módulos para un fragmento del documento consolidado."""
+    # --- ANALISIS GENERAL (Resumen y Cronograma) ---
+    prompt_1 = f"""
+        ERES: Un Analista Senior de Licitaciones.
+        
+        INSTRUCCIONES DE EXTRACCIÓN (SECCIÓN GENERAL):
+        1. RESUMEN EJECUTIVO:
+           - Identifica la ENTIDAD compradora.
+           - Genera un párrafo describiendo el OBJETO.
+           - Genera un breve resumen de la licitación.
+        
+        2. CRONOGRAMA DE EVENTOS:
+           - Extrae eventos clave (Junta de Aclaraciones, Fallo, Visita a instalaciones, etc.) y sus fechas (DD/MM/AAAA).
+           - Si menciona un RESPONSABLE o nota específica, agrégalo.
+        
+        3. ANÁLISIS ESTRATÉGICO:
+           - Método de Evaluación (Costo, Puntos, Binario).
+           - Presupuesto máximo.
+
+        DOCUMENTO CONSOLIDADO: {fragmento} 
+        
+        SALIDA JSON: 
+        {{ 
+            "resumen": {{ "entidad": "...", "objeto": "...", "presupuesto": "..." }}, 
+            "eventos": [ {{ "evento": "...", "fecha": "...", "responsable_notas": "..." }} ],
+            "evaluacion": {{ "metodo": "...", "detalles": "..." }}
+        }}
+        """
+    # --- ANALISIS LEGAL (Control y Cumplimiento) ---
+    prompt_2 = f"""
+        ERES: Abogado Auditor de Licitaciones.
+        ENFOQUE: "{enfoque}"
+        
+        INSTRUCCIONES DE EXTRACCIÓN (SECCIÓN LEGAL):
+        1. MATRIZ DE CONTROL (DOCUMENTAL):
+           - Lista de documentos obligatorios (Legal, Admin, Financiero).
+           - Extrae el nombre exacto y los CRITERIOS DE EVALUACIÓN específicos.
+        
+        2. MATRIZ DE CUMPLIMIENTO (PROCESO):
+           - Reglas de negocio y causas de desechamiento.
+           - Indica si es INDISPENSABLE o si es causas de desechamiento o no.
+        
+        Utiliza una evaluación binaria (SI/NO).
+
+        DOCUMENTO CONSOLIDADO: {fragmento}
+        
+        SALIDA JSON: 
+        {{ 
+            "matriz_control": [ {{ "documento": "...", "criterio": "...", "tipo": "LEGAL/FINANCIERO" }} ], 
+            "matriz_cumplimiento": [ {{ "requisito": "...", "indispensable": "SI/NO", "causa_incumplimiento": "..." }} ] 
+        }}
+        """
+    # --- ANALISIS TECNICO (Productos) ---
+    prompt_3 = f"""
+        ERES: Ingeniero Preventa Experto.
+        CATÁLOGO PROPIO: {CATALOGO_MOCK}
+        
+        INSTRUCCIONES DE EXTRACCIÓN (SECCIÓN TÉCNICA):
+        1. MATCHING TÉCNICO (PRODUCTOS):
+           - Extrae las partidas de hardware/software.
+           - Extrae el nombre exacto y los CRITERIOS DE EVALUACIÓN específicos.
+           - Cruza con CATÁLOGO PROPIO. 
+           - Si Match > 70%, asigna SKU y marca origen como "INTERNO".
+           - Si NO encuentras en catálogo, marca como "COTIZAR MANUAL" (No busques en web).
+           - Si es Obra Civil/Torres/Infraestructura, marca "TERCERIA".
+
+        DOCUMENTO CONSOLIDADO: {fragmento}
+        
+        SALIDA JSON: 
+        {{ 
+            "matriz_tecnica": [ {{ "partida": "...", "descripcion": "...", "propuesta": "...", "score": "...", "origen": "..." }} ] 
+        }}
+        """
+    return {"General": prompt_1, "Legal": prompt_2, "Técnico": prompt_3}
+
+
+def planear_tareas(text, enfoque, indice_paginas=None, margen=MARGEN, documentos=None):
+    """Prompts a ejecutar, {(documento, módulo, i): prompt} en orden fijo, y posiciones de páginas excluidas.
+
+    documentos: el documento (archivo) de cada página del índice. Cada archivo se
+    enruta y se empaqueta por separado, así sus tareas no dependen de los demás:
+    cuando una junta de aclaraciones agrega o corrige un anexo, solo cambian las
+    tareas de ese anexo. Sin `documentos` todo cuenta como el documento 0.
+    Es determinista: el mismo documento con los mismos parámetros da las mismas
+    tareas, así un trabajo interrumpido retoma solo las que faltan.
+    """
+    # --- PRESUPUESTO: tokens del documento por llamada. La ventana del modelo (ver tokens.py) es
+    # el tope duro; MAX_TOKENS_FRAGMENTO reparte un documento grande en varias llamadas paralelas ---
+    plantillas = prompts_modulos("", enfoque)
+    presupuestos = {nombre: min(presupuesto_prompt(MODELO_ANALISIS, plantilla), MAX_TOKENS_FRAGMENTO)
+                    for nombre, plantilla in plantillas.items()}
+
+    # --- ENRUTADO: cada módulo recibe solo sus páginas (ver enrutador.py) ---
+    # --- MAP: las páginas se empaquetan completas hasta el presupuesto; lo que no
+    # cabe en una llamada va en la siguiente, y se reportan las que quedaron fuera.
+    fragmentos, excluidas = {}, set()
+    if indice_paginas:
+        costos = [pagina[4] + contar_tokens(etiqueta_pagina(pagina[0], pagina[1])) for pagina in indice_paginas]
+        por_documento = {}
+        for posicion, documento in enumerate(documentos or [0] * len(indice_paginas)):
+            por_documento.setdefault(documento, []).append(posicion)
+        for documento, posiciones in por_documento.items():
+            propio = [indice_paginas[i] for i in posiciones]
+            if all(numero is None for _, numero, *_ in propio):
+                continue  # Archivo ilegible: solo trae el marcador de error, no hay nada que analizar
+            for nombre, elegidas in paginas_por_modulo(text, propio, margen=margen).items():
+                elegidas = [posiciones[i] for i in elegidas]
+                grupos, fuera = empaquetar_paginas(elegidas, costos, presupuestos[nombre])
+                fragmentos[(documento, nombre)] = [texto_de_paginas(text, indice_paginas, g) for g in grupos]
+                excluidas.update(fuera)
+    else:
+        # Sin índice de páginas (texto pegado o de otra fuente) se parte por secciones
+        for nombre in plantillas:
+            fragmentos[(0, nombre)] = [f.texto for f in fragmentar(text, presupuestos[nombre])]
+
+    tareas = {}
+    for (documento, nombre), textos in fragmentos.items():
+        for i, fragmento in enumerate(textos):
+            tareas[(documento, nombre, i)] = prompts_modulos(fragmento, enfoque)[nombre]
+    return tareas, sorted(excluidas)
+
+
+def describir_excluidas(excluidas, indice_paginas, maximo=10):
+    """Aviso legible con las páginas que no entraron en ningún prompt."""
+    paginas = [f"{indice_paginas[i][0]} pág. {indice_paginas[i][1] or '?'}" for i in excluidas]
+    resto = f" y {len(paginas) - maximo} más" if len(paginas) > maximo else ""
+    return (f"{len(paginas)} página(s) no caben en un prompt y no se analizaron: "
+            f"{', '.join(paginas[:maximo])}{resto}.")
@@ -1,11 +1,20 @@
 import streamlit as st
 import google.generativeai as genai
-from pypdf import PdfReader
 import pandas as pd
 import json
-import io
 import time
 import os
+import subprocess
+import sys
+
+from extraccion import leer_bytes
+from indice_chat import IndiceChat, pasajes_desde_paginas, formatear_pasajes, TOP_K
+from enrutador import MARGEN
+from reporte_excel import generar_excel, huella_resultados
+from almacen import AlmacenDocumentos, Documento, DocumentoNoDisponible
+from limitador import limitador_para, espera_exponencial
+from trabajos import ColaTrabajos, LISTO, ERROR, MAX_INTENTOS
+from trabajador import TRABAJADORES
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(page_title="Licitacion AI", layout="wide")
@@ -67,150 +76,201 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-CATALOGO_MOCK = """
-1. SKU: CS-9200L-48P | Marca: Cisco | Switch Catalyst 9200L 48 puertos PoE+. Precio: $4,500.
-2. SKU: DL-R750-XS | Marca: Dell | Servidor PowerEdge R750 Xeon Gold. Precio: $12,500.
-3. SKU: FG-60F-BDL | Marca: Fortinet | Firewall FortiGate 60F. Precio: $950.
-"""
-
-# --- 1. CARGA DE ARCHIVOS ---
-def procesar_archivo_individual(file_obj, filename):
-    """Lee un archivo PDF y devuelve su texto."""
-    if isinstance(file_obj, str): 
-         with open(file_obj, "rb") as f: file_bytes = f.read()
-    else: 
-        file_bytes = file_obj.getvalue()
-
-    try:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        texto_archivo = f"\n\n--- INICIO DOCUMENTO: {filename} ---\n"
-        for i, page in enumerate(reader.pages):
-            texto_archivo += page.extract_text() or ""
-        texto_archivo += f"\n--- FIN DOCUMENTO: {filename} ---\n"
-        return texto_archivo
-    except Exception as e:
-        return f"\n[ERROR LEYENDO {filename}]: {str(e)}\n"
-
-# --- 2. LLAMADA A IA (EXTRACCIÓN) ---
-def llamada_segura_ia(model, prompt, modulo_nombre):
-    """Realiza una llamada a la API con manejo de errores y reintentos."""
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            res = model.generate_content(prompt)
-            clean = res.text.replace("```json", "").replace("```", "").strip()
-            if "{" in clean: clean = clean[clean.find("{"):clean.rfind("}")+1]
-            return json.loads(clean)
-        except Exception as e:
-            if "429" in str(e) or "quota" in str(e).lower():
-                wait = (attempt + 1) * 10
-                st.toast(f"Cuota excedida. Esperando {wait}s para módulo {modulo_nombre}...", icon="⏸️")
-                time.sleep(wait)
+MATRICES_EN_VIVO = {"matriz_control": "Documental", "matriz_tecnica": "Técnica"}
+INTERVALO_SONDEO = 2  # Segundos entre consultas al estado del trabajo
+
+# --- 1. ANÁLISIS EN SEGUNDO PLANO (ver trabajos.py y trabajador.py) ---
+@st.cache_resource
+def cola_trabajos():
+    return ColaTrabajos()
+
+@st.cache_resource
+def lanzamientos():
+    """Momento del último trabajador lanzado por este servidor (evita lanzar dos mientras arranca)."""
+    return {"ultimo": 0.0}
+
+def asegurar_trabajador():
+    """Lanza un proceso trabajador si no hay suficientes vivos."""
+    registro = lanzamientos()
+    if cola_trabajos().trabajadores_vivos() >= TRABAJADORES or time.time() - registro["ultimo"] < 30:
+        return
+    registro["ultimo"] = time.time()
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(cola_trabajos().directorio, "trabajador.log"), "ab") as log:
+        subprocess.Popen([sys.executable, os.path.join(carpeta, "trabajador.py")], cwd=carpeta,
+                         stdout=log, stderr=log, start_new_session=True)
+
+def cargar_resultado(resultado, api_key):
+    """Pasa el resultado de un trabajo terminado a la sesión."""
+    st.session_state.resultados = resultado["datos"]
+    st.session_state.huella_resultados = huella_resultados(resultado["datos"])
+    st.session_state.documento = Documento(*resultado["documento"])
+    st.session_state.indice_paginas = [tuple(p) for p in resultado["indice_paginas"]]
+    st.session_state.aviso_analisis = resultado.get("aviso")
+    st.session_state.diferencias = resultado.get("diferencias")
+    st.session_state.reutilizados = resultado.get("reutilizados", 0)
+    st.session_state.fallidas = resultado.get("fallidas", [])
+    # Índice del chat: se arma una sola vez por documento, para todas las sesiones
+    if api_key:
+        with st.spinner("Indexando documento para el chat..."):
+            st.session_state.indice_chat = indice_chat_compartido(st.session_state.documento,
+                                                                  st.session_state.indice_paginas, api_key)
+    st.session_state.analisis_completo = True
+
+@st.fragment(run_every=INTERVALO_SONDEO)
+def seguimiento_trabajo(api_key):
+    """Consulta el trabajo en curso; al terminar carga el resultado y redibuja la app."""
+    cola = cola_trabajos()
+    info = cola.estado(st.session_state.trabajo)
+    if info is None:
+        st.session_state.trabajo = None
+        st.query_params.pop("trabajo", None)
+        st.rerun()
+    if info["estado"] == LISTO:
+        cargar_resultado(info["resultado"], api_key)
+        st.rerun()
+    if info["estado"] == ERROR:
+        st.error(f"El análisis falló después de {info['intentos']} intento(s): {info['error']}")
+        st.caption("Al reintentar se retoma desde la última etapa completa.")
+        if st.button("Reintentar"):
+            if not api_key:
+                st.error("Falta API Key")
             else:
-                return {} 
-    return {}
-
-def ejecutar_analisis_modular(text, gemini_key, enfoque):
-    genai.configure(api_key=gemini_key)
-    # Usamos flash para la extracción inicial
-    model = genai.GenerativeModel('gemini-2.5-flash') 
-    
-    resultados_totales = {}
-    
-    # --- ANALISIS GENERAL (Resumen y Cronograma) ---
-    with st.spinner("Análisis Estratégico y Cronograma..."):
-        prompt_1 = f"""
-        ERES: Un Analista Senior de Licitaciones.
-        
-        INSTRUCCIONES DE EXTRACCIÓN (SECCIÓN GENERAL):
-        1. RESUMEN EJECUTIVO:
-           - Identifica la ENTIDAD compradora.
-           - Genera un párrafo describiendo el OBJETO.
-           - Genera un breve resumen de la licitación.
-        
-        2. CRONOGRAMA DE EVENTOS:
-           - Extrae eventos clave (Junta de Aclaraciones, Fallo, Visita a instalaciones, etc.) y sus fechas (DD/MM/AAAA).
-           - Si menciona un RESPONSABLE o nota específica, agrégalo.
-        
-        3. ANÁLISIS ESTRATÉGICO:
-           - Método de Evaluación (Costo, Puntos, Binario).
-           - Presupuesto máximo.
-
-        DOCUMENTO CONSOLIDADO: {text[:500000]} 
-        
-        SALIDA JSON: 
-        {{ 
-            "resumen": {{ "entidad": "...", "objeto": "...", "presupuesto": "..." }}, 
-            "eventos": [ {{ "evento": "...", "fecha": "...", "responsable_notas": "..." }} ],
-            "evaluacion": {{ "metodo": "...", "detalles": "..." }}
-        }}
-        """
-        data_1 = llamada_segura_ia(model, prompt_1, "General")
-        resultados_totales.update(data_1)
-    
-    time.sleep(2)
-
-    # --- ANALISIS LEGAL (Control y Cumplimiento) ---
-    with st.spinner("Auditoría Legal y Documental (DA/DT)..."):
-        prompt_2 = f"""
-        ERES: Abogado Auditor de Licitaciones.
-        ENFOQUE: "{enfoque}"
-        
-        INSTRUCCIONES DE EXTRACCIÓN (SECCIÓN LEGAL):
-        1. MATRIZ DE CONTROL (DOCUMENTAL):
-           - Lista de documentos obligatorios (Legal, Admin, Financiero).
-           - Extrae el nombre exacto y los CRITERIOS DE EVALUACIÓN específicos.
-        
-        2. MATRIZ DE CUMPLIMIENTO (PROCESO):
-           - Reglas de negocio y causas de desechamiento.
-           - Indica si es INDISPENSABLE o si es causas de desechamiento o no.
-        
-        Utiliza una evaluación binaria (SI/NO).
+                cola.reintentar(st.session_state.trabajo, api_key)
+                asegurar_trabajador()
+        return
+
+    asegurar_trabajador()
+    progreso = info["progreso"]
+    total = progreso.get("total") or 0
+    if not progreso:
+        st.info("En cola, esperando un trabajador...")
+    else:
+        texto = f"{progreso['etapa']}: {progreso['hechas']:,} de {total:,}"
+        if progreso["etapa"] == "Extracción":
+            texto += " páginas"
+        elif total:
+            texto += " llamadas"
+        st.progress(progreso["hechas"] / total if total else 0.0, text=texto)
+        for nombre, estado in progreso.get("modulos", {}).items():
+            st.write(f"Módulo {nombre}: {estado}.")
+        for mensaje in progreso.get("avisos", []):
+            st.caption(f"⏸️ {mensaje}")
+    if info["error"]:
+        st.caption(f"Reintento {info['intentos']}/{MAX_INTENTOS - 1} tras error: {info['error']}")
+    # Filas completas que ya llegaron, aunque los módulos sigan generando
+    for clave, titulo_tabla in MATRICES_EN_VIVO.items():
+        if info["parcial"].get(clave):
+            st.caption(f"{titulo_tabla}: {len(info['parcial'][clave])} filas hasta ahora")
+            st.dataframe(pd.DataFrame(info["parcial"][clave]), use_container_width=True)
+
+def mostrar_diferencias(cambios, reutilizados):
+    """Cambios en las matrices respecto al análisis anterior de la misma licitación."""
+    if reutilizados:
+        st.caption(f"{reutilizados} archivo(s) sin cambios se tomaron del análisis anterior.")
+    if not cambios:
+        st.caption("Sin cambios en las matrices respecto al análisis anterior.")
+        return
+    resumen = ", ".join(f"{clave}: +{len(c['agregadas'])} / -{len(c['eliminadas'])} / ~{len(c['modificadas'])}"
+                        for clave, c in cambios.items())
+    with st.expander(f"Cambios respecto al análisis anterior ({resumen})"):
+        for clave, c in cambios.items():
+            st.markdown(f"**{clave}**")
+            if c["agregadas"]:
+                st.caption("Agregadas")
+                st.dataframe(pd.DataFrame(c["agregadas"]), use_container_width=True)
+            if c["eliminadas"]:
+                st.caption("Eliminadas")
+                st.dataframe(pd.DataFrame(c["eliminadas"]), use_container_width=True)
+            if c["modificadas"]:
+                st.caption("Modificadas (antes → después)")
+                st.dataframe(pd.DataFrame([{"antes": json.dumps(a, ensure_ascii=False),
+                                            "después": json.dumps(d, ensure_ascii=False)}
+                                           for a, d in c["modificadas"]]), use_container_width=True)
+
+# --- 2. FUNCIÓN DE CHAT ---
+MODELO_EMBEDDINGS = "models/text-embedding-004"
+MAX_REINTENTOS_EMBEDDINGS = 5
+
+class IndiceSinVectores(Exception):
+    """Los embeddings fallaron: el índice (solo BM25) sirve a esta sesión, pero no se comparte."""
+    def __init__(self, indice):
+        super().__init__("Índice del chat sin embeddings")
+        self.indice = indice
+
+def embeber_textos(textos, api_key, tipo="retrieval_document"):
+    """Embeddings de Gemini en lotes de 100 (el máximo por llamada), al ritmo del limitador de la API key."""
+    limitador = limitador_para(api_key)
+    vectores = []
+    for i in range(0, len(textos), 100):
+        for intento in range(MAX_REINTENTOS_EMBEDDINGS):
+            limitador.adquirir()
+            try:
+                res = genai.embed_content(model=MODELO_EMBEDDINGS, content=textos[i:i + 100], task_type=tipo)
+                break
+            except Exception as e:
+                cuota = "429" in str(e) or "quota" in str(e).lower()
+                if not cuota or intento == MAX_REINTENTOS_EMBEDDINGS - 1:
+                    raise
+                limitador.saturado()
+                time.sleep(espera_exponencial(intento))
+        limitador.exito()
+        vectores.extend(res["embedding"])
+    return vectores
+
+def construir_indice_chat(texto, indice_paginas, api_key):
+    """Índice híbrido del chat; si los embeddings fallan queda solo BM25."""
+    genai.configure(api_key=api_key)
+    pasajes = pasajes_desde_paginas(texto, indice_paginas)
+    try:
+        vectores = embeber_textos([texto[p.inicio:p.fin] for p in pasajes], api_key) if pasajes else None
+    except Exception:
+        vectores = None
+    return IndiceChat(texto, pasajes, vectores)
+
+@st.cache_resource
+def almacen_documentos():
+    """Almacén de textos consolidados compartido por todas las sesiones (ver almacen.py)."""
+    return AlmacenDocumentos()
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def _indice_chat_cache(documento, _indice_paginas, _api_key):
+    indice = construir_indice_chat(almacen_documentos().leer(documento), _indice_paginas, _api_key)
+    if indice.vectores is None and indice.n:
+        raise IndiceSinVectores(indice)  # Una excepción no queda en la caché: la próxima sesión reintenta
+    return indice
+
+def indice_chat_compartido(documento, indice_paginas, api_key):
+    """Un solo índice del chat por documento; las sesiones que abren las mismas bases lo comparten.
+
+    Si los embeddings fallan (un 429 pasajero, una key inválida) el índice solo BM25
+    se usa en esta sesión pero no se guarda para las demás.
+    """
+    try:
+        return _indice_chat_cache(documento, indice_paginas, api_key)
+    except IndiceSinVectores as e:
+        return e.indice
 
-        DOCUMENTO CONSOLIDADO: {text[:500000]}
-        
-        SALIDA JSON: 
-        {{ 
-            "matriz_control": [ {{ "documento": "...", "criterio": "...", "tipo": "LEGAL/FINANCIERO" }} ], 
-            "matriz_cumplimiento": [ {{ "requisito": "...", "indispensable": "SI/NO", "causa_incumplimiento": "..." }} ] 
-        }}
-        """
-        data_2 = llamada_segura_ia(model, prompt_2, "Legal")
-        resultados_totales.update(data_2)
-
-    time.sleep(2) 
-
-    # --- ANALISIS TECNICO (Productos) ---
-    with st.spinner("Ingeniería y Catálogo..."):
-        prompt_3 = f"""
-        ERES: Ingeniero Preventa Experto.
-        CATÁLOGO PROPIO: {CATALOGO_MOCK}
-        
-        INSTRUCCIONES DE EXTRACCIÓN (SECCIÓN TÉCNICA):
-        1. MATCHING TÉCNICO (PRODUCTOS):
-           - Extrae las partidas de hardware/software.
-           - Extrae el nombre exacto y los CRITERIOS DE EVALUACIÓN específicos.
-           - Cruza con CATÁLOGO PROPIO. 
-           - Si Match > 70%, asigna SKU y marca origen como "INTERNO".
-           - Si NO encuentras en catálogo, marca como "COTIZAR MANUAL" (No busques en web).
-           - Si es Obra Civil/Torres/Infraestructura, marca "TERCERIA".
-
-        DOCUMENTO CONSOLIDADO: {text[:500000]}
-        
-        SALIDA JSON: 
-        {{ 
-            "matriz_tecnica": [ {{ "partida": "...", "descripcion": "...", "propuesta": "...", "score": "...", "origen": "..." }} ] 
-        }}
-        """
-        data_3 = llamada_segura_ia(model, prompt_3, "Técnico")
-        resultados_totales.update(data_3)
-
-    return resultados_totales
-
-# --- 3. FUNCIÓN DE CHAT ---
-def generar_respuesta_chat(prompt_usuario, contexto_texto, contexto_datos, api_key):
+def generar_respuesta_chat(prompt_usuario, indice, documento, contexto_datos, api_key):
+    """Genera la respuesta por partes (streaming) conforme el modelo la produce."""
     genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-2.5-flash') # Flash es ideal para ventanas de contexto grandes (1M tokens)
+    model = genai.GenerativeModel('gemini-2.5-flash')
+
+    # Solo viajan los pasajes relevantes (con página), no el documento completo
+    vector_pregunta = None
+    if indice.vectores is not None:
+        try:
+            vector_pregunta = embeber_textos([prompt_usuario], api_key, "retrieval_query")[0]
+        except Exception:
+            pass  # Se responde con BM25
+    pasajes = indice.buscar(prompt_usuario, TOP_K, vector_pregunta)
+    # Del almacén solo se descomprimen los bloques que cubren estos pasajes
+    try:
+        contexto = formatear_pasajes(pasajes, lambda inicio, fin: almacen_documentos().leer(documento, inicio, fin))
+    except DocumentoNoDisponible:
+        yield "El documento ya no está en el almacén. Vuelve a iniciar el análisis para chatear con él."
+        return
+    resumen = {k: contexto_datos.get(k) for k in ("resumen", "evaluacion") if contexto_datos.get(k)}
     
     # Construimos un prompt que incluye el contexto de la licitación
     prompt_sistema = f"""
@@ -218,35 +278,36 @@ def generar_respuesta_chat(prompt_usuario, contexto_texto, contexto_datos, api_k
     TU TAREA: Responder dudas del usuario basándote EXCLUSIVAMENTE en la información de la licitación proporcionada.
     
     CONTEXTO ESTRUCTURADO (Resumen de lo que ya analizaste):
-    {json.dumps(contexto_datos, ensure_ascii=False)}
+    {json.dumps(resumen, ensure_ascii=False)}
     
-    CONTEXTO COMPLETO DEL DOCUMENTO (Referencia cruda):
-    {contexto_texto[:800000]} 
+    PASAJES RELEVANTES DEL DOCUMENTO (Referencia cruda, con archivo y página):
+    {contexto}
 
     PREGUNTA DEL USUARIO: {prompt_usuario}
     
     REGLAS:
     1. Sé directo y profesional.
-    2. Cita la sección o página si es posible (basado en el texto).
-    3. Si la respuesta no está en el documento, dilo claramente.
+    2. Cita el archivo y la página de los pasajes que uses.
+    3. Si la respuesta no está en los pasajes, dilo claramente.
     """
     
     try:
-        response = model.generate_content(prompt_sistema)
-        return response.text
+        for trozo in model.generate_content(prompt_sistema, stream=True):
+            # Un trozo sin texto (p. ej. solo metadatos de seguridad) lanza al leer .text
+            try:
+                texto = trozo.text
+            except ValueError:
+                continue
+            if texto:
+                yield texto
     except Exception as e:
-        return f"Error al generar respuesta: {str(e)}"
-
-# --- 4. EXPORTAR EXCEL ---
-def format_excel(writer, df, sheet):
-    wb = writer.book
-    ws = writer.sheets[sheet]
-    fmt = wb.add_format({'bold': True, 'bg_color': '#1f497d', 'font_color': 'white', 'border': 1, 'text_wrap': True, 'valign': 'top'})
-    text_fmt = wb.add_format({'text_wrap': True, 'valign': 'top', 'border': 1})
-    
-    for col_num, value in enumerate(df.columns.values):
-        ws.write(0, col_num, value, fmt)
-        ws.set_column(col_num, col_num, 25, text_fmt)
+        yield f"Error al generar respuesta: {str(e)}"
+
+# --- 3. EXPORTAR EXCEL ---
+@st.cache_data(max_entries=8, show_spinner="Generando reporte Excel...")
+def reporte_excel(huella, _data):
+    """Bytes del reporte; se genera una vez por huella de resultados (ver reporte_excel.py)."""
+    return generar_excel(_data)
 
 # --- UI ---
 def main():
@@ -256,22 +317,48 @@ def main():
         st.session_state.analisis_completo = False
     if "resultados" not in st.session_state:
         st.session_state.resultados = {}
-    if "texto_completo" not in st.session_state:
-        st.session_state.texto_completo = ""
+    if "huella_resultados" not in st.session_state:
+        st.session_state.huella_resultados = None
+    if "documento" not in st.session_state:
+        st.session_state.documento = None  # Solo la huella: el texto vive en el almacén compartido
+    if "indice_paginas" not in st.session_state:
+        st.session_state.indice_paginas = []
+    if "indice_chat" not in st.session_state:
+        st.session_state.indice_chat = None
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
+    if "aviso_analisis" not in st.session_state:
+        st.session_state.aviso_analisis = None
+    if "diferencias" not in st.session_state:
+        st.session_state.diferencias = None  # Cambios respecto al análisis anterior (reanálisis)
+        st.session_state.reutilizados = 0
+    if "fallidas" not in st.session_state:
+        st.session_state.fallidas = []  # Fragmentos que el modelo dejó sin datos
+    if "trabajo" not in st.session_state:
+        # En la URL: un refresh del navegador vuelve a encontrar el trabajo en curso
+        st.session_state.trabajo = st.query_params.get("trabajo")
 
     with st.sidebar:
         st.title("Configuración")
         api_key = st.text_input("Gemini API Key", type="password")
         st.success("OCR Activo")
+        margen_recall = st.slider("Margen de recall del enrutador (%)", 0, 50, int(MARGEN * 100), help="Páginas extra (las siguientes más relevantes) que recibe cada módulo además de las que detecta el enrutador.") / 100
+        refrescar_ia = st.checkbox("Ignorar caché de IA", help="Vuelve a consultar al modelo aunque ya exista una respuesta guardada para el mismo documento.")
         
         if st.session_state.analisis_completo:
             if st.button("Limpiar Análisis"):
                 st.session_state.analisis_completo = False
                 st.session_state.resultados = {}
-                st.session_state.texto_completo = ""
+                st.session_state.huella_resultados = None
+                st.session_state.documento = None
+                st.session_state.indice_paginas = []
+                st.session_state.indice_chat = None
                 st.session_state.chat_history = []
+                st.session_state.aviso_analisis = None
+                st.session_state.diferencias = None
+                st.session_state.fallidas = []
+                st.session_state.trabajo = None
+                st.query_params.pop("trabajo", None)
                 st.rerun()
 
     st.title("Licitacion AI")
@@ -299,36 +386,24 @@ def main():
 
     enfoque = st.text_input("Enfoque:", "Cumplimiento estricto de formatos DA/DT")
 
-    # Botón de análisis (Solo procesa si no se ha hecho ya)
+    # Botón de análisis: el trabajo se encola y lo ejecuta un proceso aparte;
+    # un refresh o un rerun no lo interrumpen. Si ya hay un análisis (p. ej. antes
+    # de una junta de aclaraciones), ese es la base: solo se analizan los archivos
+    # nuevos o cambiados y se muestran las diferencias.
     if st.button("INICIAR ANÁLISIS") and archivos_procesar:
         if not api_key: 
             st.error("Falta API Key")
         else:
-            # 1. Ingesta de Documentos
-            texto_consolidado = ""
-            barra = st.progress(0)
-            status_text = st.empty()
-            
-            for i, (archivo, nombre) in enumerate(archivos_procesar):
-                status_text.text(f"Leyendo: {nombre}...")
-                texto_doc = procesar_archivo_individual(archivo, nombre)
-                texto_consolidado += texto_doc
-                barra.progress((i + 1) / len(archivos_procesar))
-            
-            status_text.empty()
-            barra.empty()
-            
-            # 2. Análisis Modular
-            data = ejecutar_analisis_modular(texto_consolidado, api_key, enfoque)
-            
-            if not data:
-                st.error("Hubo un error crítico al procesar los módulos.")
-            else:
-                # GUARDAR EN SESSION STATE
-                st.session_state.resultados = data
-                st.session_state.texto_completo = texto_consolidado
-                st.session_state.analisis_completo = True
-                st.success("¡Análisis Completado!")
+            archivos = [(leer_bytes(f), nombre) for f, nombre in archivos_procesar]
+            base = st.session_state.trabajo if st.session_state.analisis_completo else None
+            parametros = {"enfoque": enfoque, "margen": margen_recall, "refrescar": refrescar_ia, "base": base}
+            st.session_state.trabajo = cola_trabajos().encolar(archivos, parametros, api_key)
+            st.query_params["trabajo"] = st.session_state.trabajo
+            st.session_state.analisis_completo = False
+            asegurar_trabajador()
+
+    if st.session_state.trabajo and not st.session_state.analisis_completo:
+        seguimiento_trabajo(api_key)
 
     # --- MOSTRAR RESULTADOS (Si ya existen en memoria) ---
     if st.session_state.analisis_completo:
@@ -337,6 +412,15 @@ def main():
         # Resumen
         res = data.get('resumen', {})
         st.info(f"Proyecto: {res.get('objeto', 'N/A')}")
+        if st.session_state.aviso_analisis:
+            st.warning(st.session_state.aviso_analisis)
+        if st.session_state.fallidas:
+            detalle = ", ".join(f"{f['modulo']} ({f['archivo']}, fragmento {f['fragmento']})"
+                                for f in st.session_state.fallidas)
+            st.warning(f"Resultados incompletos: el modelo no devolvió datos para {detalle}. "
+                       "Vuelve a iniciar el análisis para completarlos; lo demás se reutiliza.")
+        if st.session_state.diferencias is not None:
+            mostrar_diferencias(st.session_state.diferencias, st.session_state.reutilizados)
         
         # Tabs de Tablas
         tabs = st.tabs(["Documental", "Técnica", "Cronograma"])
@@ -349,24 +433,11 @@ def main():
         with tabs[2]: 
             if data.get('eventos'): st.dataframe(pd.DataFrame(data.get('eventos')), use_container_width=True)
 
-        # Botón de Descarga Excel
-        buff = io.BytesIO()
-        with pd.ExcelWriter(buff, engine='xlsxwriter') as writer:
-            if data.get('matriz_control'): 
-                pd.DataFrame(data['matriz_control']).to_excel(writer, sheet_name='Control', index=False)
-                format_excel(writer, pd.DataFrame(data['matriz_control']), 'Control')
-            if data.get('matriz_cumplimiento'): 
-                pd.DataFrame(data['matriz_cumplimiento']).to_excel(writer, sheet_name='Cumplimiento', index=False)
-                format_excel(writer, pd.DataFrame(data['matriz_cumplimiento']), 'Cumplimiento')
-            if data.get('matriz_tecnica'): 
-                pd.DataFrame(data['matriz_tecnica']).to_excel(writer, sheet_name='Tecnica', index=False)
-                format_excel(writer, pd.DataFrame(data['matriz_tecnica']), 'Tecnica')
-            if data.get('eventos'): 
-                pd.DataFrame(data['eventos']).to_excel(writer, sheet_name='Cronograma', index=False)
-                format_excel(writer, pd.DataFrame(data['eventos']), 'Cronograma')
-            pd.DataFrame([res]).to_excel(writer, sheet_name='Resumen', index=False)
-
-        st.download_button("Bajar Reporte Excel", buff.getvalue(), "Reporte_Licitacion.xlsx")
+        # Botón de Descarga Excel: los reruns del chat reutilizan los bytes ya generados
+        if st.session_state.huella_resultados is None:
+            st.session_state.huella_resultados = huella_resultados(data)
+        st.download_button("Bajar Reporte Excel", reporte_excel(st.session_state.huella_resultados, data),
+                           "Reporte_Licitacion.xlsx")
 
         # --- SECCIÓN DE CHATBOT ---
         st.divider()
@@ -387,20 +458,38 @@ def main():
                 st.session_state.chat_history.append({"role": "user", "content": prompt})
                 with st.chat_message("user"):
                     st.markdown(prompt)
-
-                # Generar respuesta
-                with st.chat_message("assistant"):
-                    with st.spinner("Consultando las bases..."):
-                        respuesta = generar_respuesta_chat(
+                if st.session_state.indice_chat is None:
+                    # El resultado se cargó sin API key (p. ej. después de un refresh)
+                    with st.spinner("Indexando documento para el chat..."):
+                        st.session_state.indice_chat = indice_chat_compartido(
+                            st.session_state.documento, st.session_state.indice_paginas, api_key)
+
+                # Generar respuesta (se pinta token por token)
+                partes = []
+                completa = False
+
+                def acumular(flujo):
+                    for trozo in flujo:
+                        partes.append(trozo)
+                        yield trozo
+
+                try:
+                    with st.chat_message("assistant"):
+                        st.write_stream(acumular(generar_respuesta_chat(
                             prompt, 
-                            st.session_state.texto_completo, 
+                            st.session_state.indice_chat, 
+                            st.session_state.documento, 
                             st.session_state.resultados, 
                             api_key
-                        )
-                        st.markdown(respuesta)
-                
-                # Guardar respuesta
-                st.session_state.chat_history.append({"role": "assistant", "content": respuesta})
+                        )))
+                    completa = True
+                finally:
+                    # Guardar respuesta, aunque el usuario la interrumpa a la mitad (rerun)
+                    respuesta = "".join(partes)
+                    if respuesta and not completa:
+                        respuesta += " *(respuesta interrumpida)*"
+                    if respuesta:
+                        st.session_state.chat_history.append({"role": "assistant", "content": respuesta})
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -2,10 +2,15 @@ import streamlit as st
 import google.generativeai as genai
 from pypdf import PdfReader
 import pandas as pd
-import json
 import io
 import time
 
+from concurrent.futures import ThreadPoolExecutor
+
+from extraccion import textos_pagina
+from json_incremental import parsear_tolerante
+from fragmentos import fragmentar, combinar_resultados, MAX_TOKENS_FRAGMENTO
+
 # --- CONFIGURACIÓN ---
 st.set_page_config(page_title="LiciBot - Segmentación Lógica", layout="wide")
 
@@ -26,33 +31,28 @@ CATALOGO_MOCK = """
 # --- 1. PIPELINE DE EXTRACCIÓN HÍBRIDA (SPRINT 2) ---
 def procesar_pdf_hibrido(uploaded_file, umbral_caracteres=50):
     reader = PdfReader(uploaded_file)
-    texto_completo = ""
+    piezas = []  # Se unen al final: `+=` por página copia el texto completo cada vez
     log_procesamiento = [] 
 
     barra = st.progress(0)
     total_paginas = len(reader.pages)
 
-    for i, page in enumerate(reader.pages):
-        texto_nativo = page.extract_text() or ""
-        
+    for i, texto_nativo in enumerate(textos_pagina(reader)):
         # Semáforo de Decisión
         if len(texto_nativo.strip()) < umbral_caracteres:
             texto_ocr = f"\n[PÁGINA {i+1} - IMAGEN DETECTADA (OCR)]: (Contenido simulado de anexo escaneado...)\n"
-            texto_completo += texto_ocr
+            piezas.append(texto_ocr)
             log_procesamiento.append("OCR")
         else:
-            texto_completo += texto_nativo
+            piezas.append(texto_nativo)
             log_procesamiento.append("NATIVO")
         
         barra.progress((i + 1) / total_paginas)
 
-    return texto_completo, log_procesamiento
+    return "".join(piezas), log_procesamiento
 
 # --- 2. MOTOR DE RAZONAMIENTO CON SEGMENTACIÓN LÓGICA (SPRINT PLANNING) ---
-def analizar_con_logica(text, api_key, input_usuario):
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    
+def construir_prompt(fragmento, input_usuario):
     # AQUÍ ESTÁ LA MAGIA: El Prompt refleja tu diagrama de "Segmentación Lógica"
     prompt = f"""
     ERES: El "LiciBot", un motor de análisis de licitaciones experto.
@@ -79,7 +79,7 @@ def analizar_con_logica(text, api_key, input_usuario):
     - Cruza con el Catálogo. Si no existe, sugiere TERCERIA.
     
     DOCUMENTO A PROCESAR:
-    {text[:500000]}
+    {fragmento}
     
     --- SALIDA ESTRUCTURADA (JSON) ---
     Responde SOLO con este JSON:
@@ -103,11 +103,25 @@ def analizar_con_logica(text, api_key, input_usuario):
         ]
     }}
     """
-    
+    return prompt
+
+def analizar_fragmento(model, fragmento, input_usuario):
+    res = model.generate_content(construir_prompt(fragmento, input_usuario))
+    data = parsear_tolerante(res.text)
+    if not data:
+        raise ValueError("La respuesta del modelo no contiene JSON válido")
+    return data
+
+def analizar_con_logica(text, api_key, input_usuario):
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel('gemini-2.5-flash')
+
+    # Map-reduce: cada fragmento en paralelo y luego se combinan (ver fragmentos.py)
+    fragmentos = fragmentar(text, MAX_TOKENS_FRAGMENTO)
     try:
-        res = model.generate_content(prompt)
-        clean = res.text.replace("```json", "").replace("```", "").strip()
-        return json.loads(clean)
+        with ThreadPoolExecutor(max_workers=min(len(fragmentos), 8)) as pool:
+            parciales = list(pool.map(lambda f: analizar_fragmento(model, f.texto, input_usuario), fragmentos))
+        return combinar_resultados(parciales)
     except Exception as e:
         return {"error": str(e)}
 
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+# ==============================================================================
+# CACHÉ DE RESPUESTAS DE IA (SQLite local)
+# ==============================================================================
+# Guarda el JSON ya interpretado de cada llamada al modelo, con una llave que
+# combina el nombre del modelo, el hash del prompt y los parámetros de
+# generación. Un mismo prompt sobre el mismo documento no vuelve a gastar cuota.
+# SQLite en modo WAL permite que varias sesiones y procesos lean y escriban a la
+# vez. Las entradas vencen por antigüedad (TTL) y, si la base crece de más, se
+# borran primero las menos usadas.
+#
+# Variables de entorno:
+#   LICI_CACHE_IA      ruta de la base (por defecto ~/.cache/licitacion_ai/respuestas.sqlite)
+#   LICI_CACHE_IA_DIAS vigencia de una respuesta en días (por defecto 7)
+#   LICI_CACHE_IA_MB   tamaño máximo en MB (por defecto 200)
+
+RUTA = os.environ.get("LICI_CACHE_IA",
+                      os.path.join(os.path.expanduser("~"), ".cache", "licitacion_ai", "respuestas.sqlite"))
+TTL_DIAS = float(os.environ.get("LICI_CACHE_IA_DIAS", 7))
+MAX_MB = float(os.environ.get("LICI_CACHE_IA_MB", 200))
+
+
+def llave_respuesta(modelo, prompt, parametros=None):
+    """Hash estable de (modelo, prompt, parámetros de generación)."""
+    h = hashlib.sha256()
+    h.update(str(modelo).encode("utf-8"))
+    h.update(b"\0")
+    h.update(hashlib.sha256(prompt.encode("utf-8")).digest())
+    h.update(b"\0")
+    h.update(json.dumps(parametros or {}, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class CacheIA:
+    """Caché persistente de respuestas JSON del modelo."""
+
+    def __init__(self, ruta=RUTA, ttl_dias=TTL_DIAS, max_mb=MAX_MB):
+        self.ruta = ruta
+        self.ttl = ttl_dias * 86400
+        self.max_bytes = int(max_mb * 2**20)
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        with self._conectar() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("""CREATE TABLE IF NOT EXISTS respuestas (
+                llave TEXT PRIMARY KEY, modelo TEXT, creado REAL, usado REAL,
+                tamano INTEGER, datos TEXT)""")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_usado ON respuestas (usado)")
+
+    @contextmanager
+    def _conectar(self):
+        # Una conexión por operación: así se puede usar desde varios hilos
+        con = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            with con:  # Commit al salir, rollback si hay error
+                yield con
+        finally:
+            con.close()
+
+    def obtener(self, llave):
+        """El JSON guardado para la llave, o None si no existe o ya venció."""
+        ahora = time.time()
+        with self._conectar() as con:
+            fila = con.execute("SELECT datos, creado FROM respuestas WHERE llave = ?", (llave,)).fetchone()
+            if fila is None:
+                return None
+            if ahora - fila[1] > self.ttl:
+                con.execute("DELETE FROM respuestas WHERE llave = ?", (llave,))
+                return None
+            con.execute("UPDATE respuestas SET usado = ? WHERE llave = ?", (ahora, llave))
+        return json.loads(fila[0])
+
+    def guardar(self, llave, modelo, datos):
+        texto = json.dumps(datos, ensure_ascii=False)
+        ahora = time.time()
+        with self._conectar() as con:
+            con.execute("INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?)",
+                        (llave, str(modelo), ahora, ahora, len(texto.encode("utf-8")), texto))
+        self.podar()
+
+    def podar(self):
+        """Borra lo vencido y, si sigue sobre el límite, lo menos usado."""
+        with self._conectar() as con:
+            con.execute("DELETE FROM respuestas WHERE creado < ?", (time.time() - self.ttl,))
+            total = con.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            sobrante = total - self.max_bytes
+            for llave, tamano in con.execute("SELECT llave, tamano FROM respuestas ORDER BY usado").fetchall():
+                if sobrante <= 0:
+                    break
+                con.execute("DELETE FROM respuestas WHERE llave = ?", (llave,))
+                sobrante -= tamano
+
+    def limpiar(self):
+        with self._conectar() as con:
+            con.execute("DELETE FROM respuestas")
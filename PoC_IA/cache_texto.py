@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+# ==============================================================================
+# CACHÉ DE TEXTO EXTRAÍDO (en disco, por contenido)
+# ==============================================================================
+# Guarda el texto (y los tokens) por página de cada PDF bajo el SHA-256 de sus bytes y la
+# versión del extractor, comprimido con gzip. Al ser archivos en disco, la
+# comparten todas las sesiones de Streamlit y todos los procesos de la máquina.
+# Las escrituras son atómicas (archivo temporal + os.replace) y el tamaño total
+# se acota borrando primero lo que lleva más tiempo sin usarse (LRU por mtime).
+#
+# Variables de entorno:
+#   LICI_CACHE_DIR  carpeta de la caché (por defecto ~/.cache/licitacion_ai/textos)
+#   LICI_CACHE_MB   tamaño máximo en MB (por defecto 500)
+
+DIRECTORIO = os.environ.get("LICI_CACHE_DIR",
+                            os.path.join(os.path.expanduser("~"), ".cache", "licitacion_ai", "textos"))
+MAX_MB = float(os.environ.get("LICI_CACHE_MB", 500))
+
+
+def huella(datos):
+    """SHA-256 hexadecimal de los bytes del archivo."""
+    return hashlib.sha256(datos).hexdigest()
+
+
+def podar_por_uso(directorio, sufijo, max_bytes):
+    """Borra los archivos `sufijo` de `directorio` que llevan más tiempo sin usarse (mtime)
+    hasta quedar bajo max_bytes. Devuelve las rutas borradas.
+
+    La comparten esta caché y el almacén de documentos.
+    """
+    entradas, total = [], 0
+    for raiz, _, archivos in os.walk(directorio):
+        for nombre in archivos:
+            if not nombre.endswith(sufijo):
+                continue
+            ruta = os.path.join(raiz, nombre)
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                continue  # Otro proceso la borró
+            entradas.append((st.st_mtime, st.st_size, ruta))
+            total += st.st_size
+    borradas = []
+    for _, tamano, ruta in sorted(entradas):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+        total -= tamano
+        borradas.append(ruta)
+    return borradas
+
+
+class CacheTexto:
+    """Caché de páginas extraídas, direccionada por contenido y acotada en tamaño."""
+
+    def __init__(self, directorio=DIRECTORIO, max_mb=MAX_MB):
+        self.directorio = directorio
+        self.max_bytes = int(max_mb * 2**20)
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, sha, version):
+        return os.path.join(self.directorio, sha[:2], f"{sha}-{version}.json.gz")
+
+    def obtener(self, sha, version):
+        """Lista de páginas ([texto, tokens]), o None si no está en caché."""
+        ruta = self._ruta(sha, version)
+        try:
+            with gzip.open(ruta, "rt", encoding="utf-8") as f:
+                paginas = json.load(f)
+            os.utime(ruta)  # Marca de uso reciente para el LRU
+            return paginas
+        except (OSError, ValueError, EOFError):
+            return None  # Ausente, a medio borrar o corrupto: se vuelve a extraer
+
+    def guardar(self, sha, version, paginas):
+        ruta = self._ruta(sha, version)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+        try:
+            # GzipFile no cierra un objeto de archivo ajeno: el crudo se cierra aparte
+            with os.fdopen(fd, "wb") as crudo, gzip.open(crudo, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump(list(paginas), f, ensure_ascii=False)
+            os.replace(temporal, ruta)
+        except OSError:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return
+        self.podar()
+
+    def podar(self):
+        """Borra las entradas menos usadas hasta quedar bajo el límite de tamaño."""
+        podar_por_uso(self.directorio, ".json.gz", self.max_bytes)
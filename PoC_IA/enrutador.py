@@ -0,0 +1,114 @@
+import math
+from collections import Counter
+
+import numpy as np
+
+from indice_chat import tokenizar
+
+# ==============================================================================
+# ENRUTADOR DE PÁGINAS POR MÓDULO
+# ==============================================================================
+# Antes de llamar al modelo, un clasificador local (palabras clave ponderadas
+# por TF-IDF) puntúa cada página para cada módulo, y cada prompt recibe solo
+# las páginas que le tocan: el Legal las de DA/DT y desechamiento, el Técnico
+# el anexo técnico y las partidas, etc. Para no perder requisitos se agrega un
+# margen de seguridad: páginas vecinas de cada página elegida, una fracción
+# extra de las siguientes mejor puntuadas y, para el General, las primeras
+# páginas de cada documento (convocatoria y datos de la entidad). Si el
+# enrutador no reconoce casi nada, el módulo recibe el documento completo.
+
+PALABRAS_MODULO = {
+    "General": """convocatoria objeto entidad dependencia convocante presupuesto monto maximo minimo
+        calendario cronograma fecha fechas junta aclaraciones apertura fallo visita instalaciones
+        evaluacion puntos porcentajes binario criterio plazo vigencia contrato propuestas acto""",
+    "Legal": """documento documentos documentacion legal administrativa administrativo acta constitutiva
+        poder notarial identificacion declaracion escrito protesta formato formatos da dt desechamiento
+        desechara desechar descalificacion causales causal incumplimiento requisito requisitos obligatorio
+        indispensable garantia fianza penalizacion penas convencionales sancion financiero financieros
+        estados opinion cumplimiento sat imss infonavit rfc firma autografa""",
+    "Técnico": """anexo tecnico tecnica tecnicas especificaciones partida partidas cantidad cantidades
+        unidad equipo equipos servidor servidores switch licencia licencias software hardware marca
+        modelo caracteristicas capacidad puertos memoria procesador almacenamiento instalacion
+        configuracion soporte suministro catalogo componentes red""",
+}
+UMBRAL = 0.15            # Puntaje mínimo relativo al de la página más relevante del módulo
+VECINOS = 1              # Páginas antes y después de cada página elegida
+MARGEN = 0.10            # Fracción extra de páginas (las siguientes mejor puntuadas)
+PAGINAS_PORTADA = 3      # Primeras páginas de cada documento que siempre ve el General
+MIN_PAGINAS = 5          # Con menos páginas elegidas se manda el documento completo
+MAX_FRACCION = 0.85      # Si se elige casi todo, se manda todo
+
+
+def puntuar_paginas(texto, indice_paginas):
+    """Matriz (páginas x módulos) con el puntaje TF-IDF de las palabras clave de cada módulo."""
+    modulos = list(PALABRAS_MODULO)
+    claves = {m: set(tokenizar(PALABRAS_MODULO[m])) for m in modulos}
+    conteos = [Counter(tokenizar(texto[pagina[2]:pagina[3]])) for pagina in indice_paginas]
+    n = len(conteos)
+    vocabulario = set().union(*claves.values())
+    df = Counter(t for c in conteos for t in vocabulario if t in c)
+    idf = {t: math.log((1 + n) / (1 + df[t])) + 1 for t in vocabulario}
+
+    puntajes = np.zeros((n, len(modulos)), dtype=np.float32)
+    for i, conteo in enumerate(conteos):
+        largo = math.sqrt(sum(conteo.values()) or 1)
+        for j, m in enumerate(modulos):
+            puntajes[i, j] = sum((1 + math.log(conteo[t])) * idf[t] for t in claves[m] if t in conteo) / largo
+    return modulos, puntajes
+
+
+def seleccionar_paginas(puntajes, indice_paginas, modulo, umbral=UMBRAL, vecinos=VECINOS, margen=MARGEN):
+    """Posiciones (en el índice de páginas) que recibe el módulo, o None para mandar todo."""
+    n = len(puntajes)
+    maximo = float(puntajes.max()) if n else 0.0
+    if maximo <= 0:
+        return None
+    elegidas = set(np.flatnonzero(puntajes >= umbral * maximo).tolist())
+
+    # Margen de recall: vecinas y una fracción extra de las siguientes mejor puntuadas
+    for i in list(elegidas):
+        elegidas.update(range(max(0, i - vecinos), min(n, i + vecinos + 1)))
+    extra = int(math.ceil(margen * n))
+    for i in np.argsort(-puntajes, kind="stable"):
+        if extra <= 0 or puntajes[i] <= 0:
+            break
+        if int(i) not in elegidas:
+            elegidas.add(int(i))
+            extra -= 1
+    if modulo == "General":
+        vistas = Counter()
+        for i, (archivo, *_) in enumerate(indice_paginas):
+            if vistas[archivo] < PAGINAS_PORTADA:
+                elegidas.add(i)
+            vistas[archivo] += 1
+
+    if len(elegidas) < min(MIN_PAGINAS, n) or len(elegidas) >= MAX_FRACCION * n:
+        return None
+    return sorted(elegidas)
+
+
+def etiqueta_pagina(archivo, numero):
+    etiqueta = f"pág. {numero}" if numero else "aviso"
+    return f"\n\n--- {archivo} | {etiqueta} ---\n"
+
+
+def texto_de_paginas(texto, indice_paginas, posiciones):
+    """Arma el texto de las páginas elegidas, marcando archivo y página de cada una."""
+    piezas = []
+    for i in posiciones:
+        archivo, numero, inicio, fin = indice_paginas[i][:4]
+        piezas.append(etiqueta_pagina(archivo, numero))
+        piezas.append(texto[inicio:fin])
+    return "".join(piezas)
+
+
+def paginas_por_modulo(texto, indice_paginas, umbral=UMBRAL, vecinos=VECINOS, margen=MARGEN):
+    """Devuelve {módulo: posiciones de las páginas que recibe}, todas si el enrutador no decide."""
+    modulos, puntajes = puntuar_paginas(texto, indice_paginas)
+    todas = list(range(len(indice_paginas)))
+    salida = {}
+    for j, m in enumerate(modulos):
+        posiciones = seleccionar_paginas(puntajes[:, j], indice_paginas, m, umbral, vecinos, margen)
+        salida[m] = todas if posiciones is None else posiciones
+    return salida
+
@@ -0,0 +1,234 @@
+import io
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pypdf
+from pypdf import PdfReader
+
+from cache_texto import huella
+from tokens import contar_tokens
+
+# ==============================================================================
+# EXTRACCIÓN PARALELA DE PDFs
+# ==============================================================================
+# Reparte la lectura con pypdf en un pool de procesos, por archivo y por rango
+# de páginas, y entrega las páginas en el orden original como un flujo de
+# registros. Nada se concatena con `+=`: el texto consolidado se arma con un
+# solo join al final y cada página conserva sus offsets para poder citarla.
+# Con una CacheTexto, los documentos ya vistos se sirven desde disco sin pypdf.
+# Los tokens de cada página se cuentan aquí, una sola vez, y viajan en la caché.
+# Este módulo no importa Streamlit: los procesos hijo lo cargan sin ejecutar la app.
+
+PAGINAS_POR_TAREA = 25
+MIN_PAGINAS_PARALELO = 40  # Por debajo de esto el arranque del pool cuesta más de lo que ahorra
+# Cambiar si cambia la forma de extraer: invalida la caché de texto
+VERSION_EXTRACTOR = f"2-pypdf{pypdf.__version__}"  # 2: páginas como [texto, tokens]
+
+# Una página del texto consolidado. documento es la posición del archivo en la
+# carga; inicio/fin son offsets de caracteres en ese texto; numero empieza en 1
+# y es None para los marcadores de error; tokens es el costo de la página en un prompt.
+Pagina = namedtuple("Pagina", "documento archivo numero texto inicio fin tokens")
+
+
+def leer_bytes(file_obj):
+    """Devuelve los bytes de una ruta o de un archivo subido en Streamlit."""
+    if isinstance(file_obj, str):
+        with open(file_obj, "rb") as f:
+            return f.read()
+    return file_obj.getvalue()
+
+
+def textos_pagina(reader, inicio=0, fin=None):
+    """Genera el texto de cada página de un PdfReader, una a la vez."""
+    fin = len(reader.pages) if fin is None else fin
+    for i in range(inicio, fin):
+        yield reader.pages[i].extract_text() or ""
+
+
+# Estado de cada proceso hijo: la fuente de cada archivo (ruta o bytes) llega una
+# sola vez, en el inicializador del pool, y el último PdfReader abierto se reutiliza
+# entre rangos del mismo archivo. Cada tarea solo manda (archivo, inicio, fin).
+_fuentes = []
+_lector = (None, None)  # (posición del archivo, PdfReader)
+
+
+def _iniciar_proceso(fuentes):
+    global _fuentes, _lector
+    _fuentes, _lector = fuentes, (None, None)
+
+
+def _abrir(fuente):
+    return PdfReader(fuente if isinstance(fuente, str) else io.BytesIO(fuente))
+
+
+def _textos_rango(reader, inicio, fin):
+    return [[texto, contar_tokens(texto)] for texto in textos_pagina(reader, inicio, fin)]
+
+
+def _extraer_rango(idx, inicio, fin):
+    """[texto, tokens] de las páginas [inicio, fin) del archivo `idx` (se ejecuta en el proceso hijo)."""
+    global _lector
+    if _lector[0] != idx:
+        _lector = (idx, _abrir(_fuentes[idx]))
+    return _textos_rango(_lector[1], inicio, fin)
+
+
+def _encabezado(nombre):
+    return f"\n\n--- INICIO DOCUMENTO: {nombre} ---\n"
+
+
+def _pie(nombre):
+    return f"\n--- FIN DOCUMENTO: {nombre} ---\n"
+
+
+def _error(nombre, e):
+    return f"\n[ERROR LEYENDO {nombre}]: {str(e)}\n"
+
+
+def _planear(archivos, paginas_por_tarea, cache):
+    """Lee los bytes y arma las tareas (archivo, inicio, fin) en orden.
+
+    Los archivos que ya están en caché no generan tareas ni se abren con pypdf.
+    """
+    datos, tareas, errores, huellas, cacheados = [], [], {}, {}, {}
+    for idx, (file_obj, nombre) in enumerate(archivos):
+        contenido = leer_bytes(file_obj)
+        datos.append(contenido)
+        if cache is not None:
+            huellas[idx] = huella(contenido)
+            paginas = cache.obtener(huellas[idx], VERSION_EXTRACTOR)
+            if paginas is not None:
+                cacheados[idx] = paginas
+                continue
+        try:
+            total = len(PdfReader(io.BytesIO(contenido)).pages)
+        except Exception as e:
+            errores[idx] = _error(nombre, e)
+            continue
+        for inicio in range(0, total, paginas_por_tarea):
+            tareas.append((idx, inicio, min(inicio + paginas_por_tarea, total)))
+    return datos, tareas, errores, huellas, cacheados
+
+
+def _resultados_en_orden(fuentes, tareas, procesos):
+    """Genera (tarea, textos o excepción) en el orden de `tareas`, aunque terminen desordenadas.
+
+    fuentes: ruta (o bytes, si el archivo no está en disco) de cada archivo con tareas.
+    """
+    if procesos <= 1 or sum(fin - inicio for _, inicio, fin in tareas) < MIN_PAGINAS_PARALELO:
+        lector = (None, None)
+        for idx, inicio, fin in tareas:
+            try:
+                if lector[0] != idx:
+                    lector = (idx, _abrir(fuentes[idx]))
+                yield (idx, inicio, fin), _textos_rango(lector[1], inicio, fin)
+            except Exception as e:
+                yield (idx, inicio, fin), e
+        return
+
+    # "spawn" evita heredar los hilos del servidor de Streamlit al hacer fork
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(procesos, len(tareas)), mp_context=contexto,
+                             initializer=_iniciar_proceso, initargs=(fuentes,)) as pool:
+        futuros = {pool.submit(_extraer_rango, *t): t for t in tareas}
+        listos, siguiente = {}, 0
+        for futuro in as_completed(futuros):
+            try:
+                listos[futuros[futuro]] = futuro.result()
+            except Exception as e:
+                listos[futuros[futuro]] = e
+            # Solo se retienen los rangos que llegaron antes de su turno
+            while siguiente < len(tareas) and tareas[siguiente] in listos:
+                t = tareas[siguiente]
+                yield t, listos.pop(t)
+                siguiente += 1
+
+
+def iterar_paginas(archivos, max_procesos=None, paginas_por_tarea=PAGINAS_POR_TAREA, progreso=None,
+                   cache=None):
+    """Genera registros Pagina de varios PDFs, en orden de archivo y de página.
+
+    archivos: lista de (archivo o ruta, nombre).
+    progreso: función opcional que recibe (páginas leídas, páginas totales).
+    cache: CacheTexto opcional; los documentos extraídos completos se guardan ahí.
+    Los offsets corresponden al texto que arma `consolidar`. Un archivo (o rango)
+    ilegible produce un marcador de error sin detener a los demás.
+    """
+    datos, tareas, errores, huellas, cacheados = _planear(archivos, paginas_por_tarea, cache)
+    total_paginas = sum(fin - inicio for _, inicio, fin in tareas) + sum(len(p) for p in cacheados.values())
+    procesos = max_procesos or os.cpu_count() or 1
+    # Las rutas viajan como ruta; los archivos subidos, como bytes. Los que no tienen tareas, ni eso
+    con_tareas = {idx for idx, _, _ in tareas}
+    fuentes = [None if idx not in con_tareas else file_obj if isinstance(file_obj, str) else datos[idx]
+               for idx, (file_obj, _) in enumerate(archivos)]
+    del datos
+    resultados = _resultados_en_orden(fuentes, tareas, procesos)
+
+    posicion, leidas = 0, 0
+    pendientes = iter(tareas)
+    siguiente = next(pendientes, None)
+    for idx, (_, nombre) in enumerate(archivos):
+        if idx in cacheados:
+            if not cacheados[idx]:
+                continue
+            posicion += len(_encabezado(nombre))
+            for numero, (texto, tokens) in enumerate(cacheados[idx], start=1):
+                yield Pagina(idx, nombre, numero, texto, posicion, posicion + len(texto), tokens)
+                posicion += len(texto)
+            posicion += len(_pie(nombre))
+            leidas += len(cacheados[idx])
+            if progreso:
+                progreso(leidas, total_paginas)
+            continue
+        if idx not in errores and (siguiente is None or siguiente[0] != idx):
+            continue  # PDF sin páginas: no aporta nada al texto
+        posicion += len(_encabezado(nombre))
+        if idx in errores:
+            yield Pagina(idx, nombre, None, errores[idx], posicion, posicion + len(errores[idx]),
+                         contar_tokens(errores[idx]))
+            posicion += len(errores[idx])
+        completas = [] if idx in huellas and idx not in errores else None
+        while siguiente is not None and siguiente[0] == idx:
+            t, textos = next(resultados)
+            siguiente = next(pendientes, None)
+            if isinstance(textos, Exception):
+                marcador = _error(nombre, textos)
+                yield Pagina(idx, nombre, None, marcador, posicion, posicion + len(marcador),
+                             contar_tokens(marcador))
+                posicion += len(marcador)
+                completas = None  # Un documento con errores no se guarda en caché
+            else:
+                for numero, (texto, tokens) in enumerate(textos, start=t[1] + 1):
+                    yield Pagina(idx, nombre, numero, texto, posicion, posicion + len(texto), tokens)
+                    posicion += len(texto)
+                if completas is not None:
+                    completas.extend(textos)
+            leidas += t[2] - t[1]
+            if progreso:
+                progreso(leidas, total_paginas)
+        posicion += len(_pie(nombre))
+        if completas is not None:
+            cache.guardar(huellas[idx], VERSION_EXTRACTOR, completas)
+
+
+def consolidar(paginas):
+    """Arma el texto consolidado con un solo join.
+
+    Devuelve (texto, índice) donde el índice es una lista de (archivo, numero,
+    inicio, fin, tokens) sin el texto, para citar páginas sin duplicar memoria.
+    """
+    piezas, indice, actual = [], [], None
+    for p in paginas:
+        if actual is None or p.documento != actual.documento:
+            if actual is not None:
+                piezas.append(_pie(actual.archivo))
+            piezas.append(_encabezado(p.archivo))
+            actual = p
+        piezas.append(p.texto)
+        indice.append((p.archivo, p.numero, p.inicio, p.fin, p.tokens))
+    if actual is not None:
+        piezas.append(_pie(actual.archivo))
+    return "".join(piezas), indice
+
@@ -0,0 +1,196 @@
+import json
+import re
+import unicodedata
+from collections import namedtuple
+
+from tokens import contar_tokens
+
+# ==============================================================================
+# MAP-REDUCE: FRAGMENTACIÓN Y COMBINACIÓN DE RESULTADOS
+# ==============================================================================
+# En lugar de recortar el documento (text[:500000]) y perder lo que queda
+# después, se parte en fragmentos acotados en tokens (contados con tokens.py,
+# igual que el presupuesto de cada prompt) que respetan, hasta donde
+# se puede, los límites de documento y de sección. Cada fragmento se analiza
+# por separado y los resultados parciales se combinan: las listas (matrices,
+# eventos, partidas) se concatenan sin duplicados y los campos sueltos se quedan
+# con el primer valor no vacío.
+
+MAX_TOKENS_FRAGMENTO = 120_000
+
+# Inicio de un documento, de una página marcada o de una sección típica de bases de licitación
+RE_SECCION = re.compile(
+    r"^(?:--- (?!FIN DOCUMENTO)"
+    r"|(?:ANEXO|AP[EÉ]NDICE|CAP[IÍ]TULO|SECCI[OÓ]N|T[IÍ]TULO|APARTADO|CL[AÁ]USULA|PARTIDA)\b"
+    r"|(?:[IVXLC]+|\d+(?:\.\d+)*)[.)]?\s+[A-ZÁÉÍÓÚÑ])",
+    re.MULTILINE,
+)
+
+# Campos que identifican una fila al quitar duplicados, por lista
+LLAVES = {
+    "matriz_control": ("documento", "criterio"),
+    "matriz_cumplimiento": ("requisito",),
+    "matriz_tecnica": ("partida", "descripcion"),
+    "eventos": ("evento", "fecha"),
+    "cronograma": ("evento", "fecha"),
+    "partidas_tecnicas": ("partida", "descripcion_licitacion"),
+    "segmento_tecnico": ("partida", "requerimiento"),
+}
+VACIOS = {"", "...", "n/a", "na", "none", "null", "no mencionado", "desconocido", "sin datos"}
+
+Fragmento = namedtuple("Fragmento", "inicio fin texto")
+
+
+def _cortes_seccion(texto):
+    cortes = [m.start() for m in RE_SECCION.finditer(texto)]
+    if not cortes or cortes[0] != 0:
+        cortes.insert(0, 0)
+    return cortes + [len(texto)]
+
+
+def _partir(texto, inicio, fin, max_chars):
+    """Parte [inicio, fin) en tramos de hasta max_chars, cortando en párrafo, línea o espacio."""
+    while fin - inicio > max_chars:
+        limite = inicio + max_chars
+        corte = -1
+        for separador in ("\n\n", "\n", " "):
+            corte = texto.rfind(separador, inicio + max_chars // 2, limite)
+            if corte != -1:
+                corte += len(separador)
+                break
+        if corte == -1:
+            corte = limite
+        yield inicio, corte
+        inicio = corte
+    if fin > inicio:
+        yield inicio, fin
+
+
+def _partir_tokens(texto, inicio, fin, max_tokens, tokens):
+    """Parte [inicio, fin), que mide `tokens`, en tramos (inicio, fin, tokens) de hasta max_tokens.
+
+    El largo en caracteres sale de la densidad medida del tramo; cada pieza se
+    vuelve a contar y, si aún se pasa, se parte de nuevo.
+    """
+    max_chars = max(1, (fin - inicio) * max_tokens // tokens)
+    for a, b in _partir(texto, inicio, fin, max_chars):
+        medidos = contar_tokens(texto[a:b])
+        if medidos > max_tokens and b - a > 1:
+            yield from _partir_tokens(texto, a, b, max_tokens, medidos)
+        else:
+            yield a, b, medidos
+
+
+def fragmentar(texto, max_tokens=MAX_TOKENS_FRAGMENTO):
+    """Divide el texto en fragmentos contiguos de hasta max_tokens.
+
+    Junta secciones completas mientras quepan; una sección que no cabe sola se
+    parte por párrafos. Cada sección se cuenta una sola vez. Los fragmentos
+    cubren todo el texto, sin huecos.
+    """
+    max_tokens = max(1, max_tokens)
+    cortes = _cortes_seccion(texto)
+    tramos, actual = [], None  # (inicio, fin, tokens)
+    for inicio, fin in zip(cortes[:-1], cortes[1:]):
+        tokens = contar_tokens(texto[inicio:fin])
+        if actual is not None and actual[2] + tokens <= max_tokens:
+            actual = (actual[0], fin, actual[2] + tokens)
+            continue
+        if actual is not None:
+            tramos.append(actual)
+        if tokens <= max_tokens:
+            actual = (inicio, fin, tokens)
+            continue
+        partes = list(_partir_tokens(texto, inicio, fin, max_tokens, tokens))
+        tramos.extend(partes[:-1])
+        actual = partes[-1]
+    if actual is not None:
+        tramos.append(actual)
+    if not tramos:
+        tramos.append((0, 0, 0))  # Texto vacío: un fragmento vacío, igual que antes del cambio
+    return [Fragmento(a, b, texto[a:b]) for a, b, _ in tramos]
+
+
+def _normalizar(valor):
+    """Texto comparable: sin acentos, en minúsculas y con espacios colapsados."""
+    texto = unicodedata.normalize("NFKD", str(valor))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto).strip(" .;:").lower()
+
+
+def _vacio(valor):
+    if valor is None or valor == [] or valor == {}:
+        return True
+    return isinstance(valor, str) and _normalizar(valor) in VACIOS
+
+
+def _llave_fila(fila, campos):
+    if isinstance(fila, dict):
+        if campos and any(not _vacio(fila.get(c)) for c in campos):
+            return tuple(_normalizar(fila.get(c, "")) for c in campos)
+        return _normalizar(json.dumps(fila, ensure_ascii=False, sort_keys=True))
+    return _normalizar(json.dumps(fila, ensure_ascii=False) if isinstance(fila, list) else fila)
+
+
+def _deduplicar(filas, campos):
+    """Quita filas repetidas; la primera se queda y se completa con los campos vacíos de las demás."""
+    vistas, salida = {}, []
+    for fila in filas:
+        llave = _llave_fila(fila, campos)
+        if llave not in vistas:
+            vistas[llave] = len(salida)
+            salida.append(dict(fila) if isinstance(fila, dict) else fila)
+        elif isinstance(fila, dict):
+            previa = salida[vistas[llave]]
+            for campo, valor in fila.items():
+                if _vacio(previa.get(campo)) and not _vacio(valor):
+                    previa[campo] = valor
+    return salida
+
+
+def _fusionar(a, b, llave=None):
+    if isinstance(a, dict) and isinstance(b, dict):
+        salida = dict(a)
+        for campo, valor in b.items():
+            salida[campo] = _fusionar(salida.get(campo), valor, campo)
+        return salida
+    if isinstance(a, list) and isinstance(b, list):
+        return _deduplicar(a + b, LLAVES.get(llave))
+    return a if not _vacio(a) else b
+
+
+def combinar_resultados(parciales):
+    """Reduce los JSON de cada fragmento a uno solo, sin duplicados."""
+    salida = {}
+    for parcial in parciales:
+        if isinstance(parcial, dict):
+            salida = _fusionar(salida, parcial)
+    for llave, valor in salida.items():
+        if isinstance(valor, list):
+            salida[llave] = _deduplicar(valor, LLAVES.get(llave))
+    return salida
+
+
+def diferencias(anterior, nuevo):
+    """Cambios en las listas (matrices, eventos) entre dos resultados combinados.
+
+    Devuelve {lista: {"agregadas": [...], "eliminadas": [...], "modificadas": [(antes, después)]}}
+    solo para las listas que cambiaron. Las filas se emparejan por sus campos de LLAVES.
+    """
+    salida = {}
+    for llave in sorted(set(anterior) | set(nuevo)):
+        viejas, nuevas = anterior.get(llave), nuevo.get(llave)
+        if not isinstance(viejas, list) and not isinstance(nuevas, list):
+            continue
+        campos = LLAVES.get(llave)
+        antes = {_llave_fila(f, campos): f for f in viejas or []}
+        despues = {_llave_fila(f, campos): f for f in nuevas or []}
+        cambios = {
+            "agregadas": [f for k, f in despues.items() if k not in antes],
+            "eliminadas": [f for k, f in antes.items() if k not in despues],
+            "modificadas": [(antes[k], f) for k, f in despues.items()
+                            if k in antes and _llave_fila(antes[k], None) != _llave_fila(f, None)],
+        }
+        if any(cambios.values()):
+            salida[llave] = cambios
+    return salida
@@ -0,0 +1,136 @@
+import math
+import re
+import unicodedata
+from collections import Counter, namedtuple
+
+import numpy as np
+
+# ==============================================================================
+# ÍNDICE LOCAL PARA EL CHAT (BM25 + FAISS)
+# ==============================================================================
+# Se construye una vez por licitación, después de la ingesta: el texto se parte
+# en pasajes etiquetados con archivo y página, y cada pregunta del chat manda al
+# modelo solo los k pasajes más relevantes en lugar del documento completo.
+# La búsqueda es híbrida: BM25 (palabras exactas: números de partida, nombres de
+# anexos) más similitud de embeddings en FAISS (paráfrasis), combinadas por
+# Reciprocal Rank Fusion. Sin embeddings o sin faiss queda solo BM25 / NumPy.
+# Los pasajes son offsets en el texto consolidado: el índice no guarda una copia
+# del documento y el texto de los pasajes elegidos se lee por rango del almacén.
+
+MAX_CARACTERES_PASAJE = 1500
+SOLAPE = 200
+TOP_K = 8
+K1, B = 1.5, 0.75  # Parámetros estándar de BM25
+RRF_K = 60
+
+STOPWORDS = set("""
+a al algo ante como con contra cual cuando de del desde donde el ella ellas ellos en entre era es esa ese eso esta
+este esto fue ha hay la las le les lo los mas me mi muy no nos o para pero por que quien se sea ser si sin sobre
+son su sus tambien te tiene todo tu un una uno unos y ya
+""".split())
+
+# inicio/fin: offsets de caracteres en el texto consolidado (ver extraccion.consolidar)
+Pasaje = namedtuple("Pasaje", "archivo pagina inicio fin")
+
+
+def tokenizar(texto):
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [t for t in re.findall(r"[a-z0-9]+", texto) if t not in STOPWORDS and len(t) > 1]
+
+
+def pasajes_desde_paginas(texto, indice_paginas, max_caracteres=MAX_CARACTERES_PASAJE, solape=SOLAPE):
+    """Parte cada página (según el índice de `consolidar`) en pasajes con su archivo y número."""
+    pasajes = []
+    paso = max(1, max_caracteres - solape)
+    for archivo, numero, inicio, fin, _ in indice_paginas:
+        for a in range(inicio, max(fin - solape, inicio + 1), paso):
+            b = min(a + max_caracteres, fin)
+            fragmento = texto[a:b]
+            recortado = fragmento.strip()
+            if recortado:
+                a += len(fragmento) - len(fragmento.lstrip())
+                pasajes.append(Pasaje(archivo, numero, a, a + len(recortado)))
+    return pasajes
+
+
+def _normalizar_filas(matriz):
+    matriz = np.asarray(matriz, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    return matriz / np.where(normas > 0, normas, 1)
+
+
+class IndiceChat:
+    """Índice híbrido BM25 + vectores sobre los pasajes de una licitación."""
+
+    def __init__(self, texto, pasajes, vectores=None):
+        self.pasajes = pasajes
+        documentos = [tokenizar(texto[p.inicio:p.fin]) for p in pasajes]
+        self.n = len(documentos)
+        self.largos = np.array([len(d) for d in documentos], dtype=np.float32)
+        self.largo_medio = float(self.largos.mean()) if self.n else 1.0
+
+        # Índice invertido: término -> (ids de pasaje, frecuencias)
+        ids, frecuencias = {}, {}
+        for i, doc in enumerate(documentos):
+            for termino, tf in Counter(doc).items():
+                ids.setdefault(termino, []).append(i)
+                frecuencias.setdefault(termino, []).append(tf)
+        self.postings = {t: (np.array(ids[t], dtype=np.int32), np.array(frecuencias[t], dtype=np.float32))
+                         for t in ids}
+        self.idf = {t: math.log(1 + (self.n - len(v[0]) + 0.5) / (len(v[0]) + 0.5))
+                    for t, v in self.postings.items()}
+
+        self.vectores = None
+        self._faiss = None
+        if vectores is not None and len(vectores) == self.n and self.n:
+            self.vectores = _normalizar_filas(vectores)
+            try:
+                import faiss  # Opcional: sin faiss se usa el producto punto de NumPy
+                self._faiss = faiss.IndexFlatIP(self.vectores.shape[1])
+                self._faiss.add(self.vectores)
+            except ImportError:
+                self._faiss = None
+
+    def _bm25(self, terminos):
+        puntajes = np.zeros(self.n, dtype=np.float32)
+        norma = K1 * (1 - B + B * self.largos / self.largo_medio)
+        for termino in set(terminos):
+            if termino not in self.postings:
+                continue
+            ids, tf = self.postings[termino]
+            puntajes[ids] += self.idf[termino] * tf * (K1 + 1) / (tf + norma[ids])
+        return puntajes
+
+    def _vecinos(self, vector, n):
+        consulta = _normalizar_filas(np.asarray(vector).reshape(1, -1))
+        if self._faiss is not None:
+            _, ids = self._faiss.search(consulta, n)
+            return [i for i in ids[0] if i >= 0]
+        similitud = self.vectores @ consulta[0]
+        return list(np.argsort(-similitud)[:n])
+
+    def buscar(self, pregunta, k=TOP_K, vector_pregunta=None):
+        """Los k pasajes más relevantes, en orden de relevancia."""
+        if not self.n:
+            return []
+        candidatos = min(self.n, max(k * 4, 20))
+        fusion = {}
+        puntajes = self._bm25(tokenizar(pregunta))
+        orden = np.argsort(-puntajes)[:candidatos]
+        for rango, i in enumerate(i for i in orden if puntajes[i] > 0):
+            fusion[i] = fusion.get(i, 0.0) + 1 / (RRF_K + rango)
+        if vector_pregunta is not None and self.vectores is not None:
+            for rango, i in enumerate(self._vecinos(vector_pregunta, candidatos)):
+                fusion[i] = fusion.get(i, 0.0) + 1 / (RRF_K + rango)
+        mejores = sorted(fusion, key=fusion.get, reverse=True)[:k]
+        return [self.pasajes[i] for i in mejores]
+
+
+def formatear_pasajes(pasajes, leer):
+    """Texto para el prompt: cada pasaje con su archivo y página. leer(inicio, fin) da el texto."""
+    bloques = []
+    for p in pasajes:
+        pagina = f"pág. {p.pagina}" if p.pagina else "sin página"
+        bloques.append(f"[{p.archivo}, {pagina}]\n{leer(p.inicio, p.fin)}")
+    return "\n\n".join(bloques)
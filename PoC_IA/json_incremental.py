@@ -0,0 +1,137 @@
+import json
+
+# ==============================================================================
+# JSON INCREMENTAL Y TOLERANTE
+# ==============================================================================
+# Interpreta la respuesta del modelo mientras llega por streaming. Un escáner
+# de estados (dentro/fuera de cadena, pila de llaves y corchetes) marca los
+# "puntos seguros": posiciones donde termina un valor completo en el objeto
+# raíz o en una de sus listas. Cortar ahí y cerrar lo que quedó abierto da un
+# JSON válido, así que:
+#   - las filas completas de cada matriz se pueden mostrar antes de que termine
+#     la respuesta (una fila a medias nunca aparece);
+#   - si la respuesta llega truncada o con un carácter inválido a la mitad, se
+#     recupera el prefijo válido más largo en vez de perder todo el módulo.
+# Los cercos ```json y el texto antes del primer { se ignoran solos. La raíz
+# siempre es un objeto: los [ del preámbulo ("según [Anexo 1]...") no la abren,
+# y si una raíz cerrada no deja nada utilizable (llaves en el preámbulo) se
+# descarta y se busca el siguiente {.
+
+PROFUNDIDAD_FILAS = 2  # Raíz (1) -> listas de la raíz (2) -> filas
+
+
+class ParserIncremental:
+    """Acumula trozos de texto y devuelve el mayor JSON válido visto hasta ahora."""
+
+    _CIERRES = {"{": "}", "[": "]"}
+
+    def __init__(self):
+        self._partes = []
+        self._largo = 0
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._inicio = None          # Posición del { que abre la raíz
+        self._pila = []              # Cierres pendientes
+        self._en_cadena = False
+        self._escape = False
+        self._seguros = []           # Posiciones de corte válidas (crecientes)
+        self._cierres = []           # Cierres pendientes en cada punto seguro
+        self._terminado = False
+        self._ultimo = {}
+        self._ultimo_seguro = -1
+
+    def alimentar(self, trozo):
+        """Agrega texto nuevo. Cada carácter se escanea una sola vez."""
+        base = self._largo
+        self._partes.append(trozo)
+        self._largo += len(trozo)
+        if self._terminado:
+            return
+        for i, c in enumerate(trozo):
+            if self._en_cadena:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._en_cadena = False
+                continue
+            if self._inicio is None:
+                if c == "{":
+                    self._inicio = base + i
+                    self._pila.append("}")
+                continue
+            if c == '"':
+                self._en_cadena = True
+            elif c in self._CIERRES:
+                self._pila.append(self._CIERRES[c])
+            elif c in "}]" and self._pila:
+                self._pila.pop()
+                if not self._pila:
+                    self._marcar(base + i + 1)
+                    if self.resultado(final=True):
+                        self._terminado = True
+                        return
+                    self._reiniciar()  # No era la raíz: se sigue buscando
+                if len(self._pila) <= PROFUNDIDAD_FILAS:
+                    self._marcar(base + i + 1)
+            elif c == "," and len(self._pila) <= PROFUNDIDAD_FILAS:
+                self._marcar(base + i)
+
+    @property
+    def completo(self):
+        """True cuando ya se cerró el objeto raíz."""
+        return self._terminado
+
+    def _marcar(self, posicion):
+        self._seguros.append(posicion)
+        self._cierres.append("".join(reversed(self._pila)))
+
+    def _intentar(self, texto, k):
+        try:
+            return json.loads(texto[self._inicio:self._seguros[k]] + self._cierres[k], strict=False)
+        except ValueError:
+            return None
+
+    def resultado(self, final=False):
+        """El JSON recuperado hasta ahora ({} si todavía no hay nada utilizable).
+
+        Con final=True, si el último corte no es válido (un carácter malo a la
+        mitad) se busca por bisección el corte válido más largo.
+        """
+        if not self._seguros:
+            return self._ultimo
+        ultimo = len(self._seguros) - 1
+        if ultimo == self._ultimo_seguro and not final:
+            return self._ultimo
+        texto = "".join(self._partes)
+        valor = self._intentar(texto, ultimo)
+        if valor is None and final:
+            # Los cortes son válidos hasta el primer error y luego no: bisección
+            bajo, alto = -1, ultimo
+            while alto - bajo > 1:
+                medio = (bajo + alto) // 2
+                if self._intentar(texto, medio) is None:
+                    alto = medio
+                else:
+                    bajo = medio
+            valor = self._intentar(texto, bajo) if bajo >= 0 else None
+        if isinstance(valor, dict):
+            self._ultimo = valor
+        self._ultimo_seguro = ultimo
+        return self._ultimo
+
+
+def parsear_tolerante(texto):
+    """Interpreta una respuesta completa; si está rota o truncada, recupera su prefijo válido."""
+    limpio = texto.replace("```json", "").replace("```", "").strip()
+    try:
+        valor = json.loads(limpio[limpio.find("{"):limpio.rfind("}") + 1], strict=False)
+        if isinstance(valor, dict):
+            return valor
+    except ValueError:
+        pass
+    parser = ParserIncremental()
+    parser.alimentar(texto)
+    return parser.resultado(final=True)
@@ -0,0 +1,80 @@
+import random
+import threading
+import time
+
+# ==============================================================================
+# LIMITADOR ADAPTATIVO DE LLAMADAS (Token Bucket)
+# ==============================================================================
+# Controla el ritmo de llamadas a la API de IA cuando varios módulos corren en
+# paralelo. Cada llamada consume un token; los tokens se reponen a `tasa` por
+# segundo hasta `rafaga`. Ante un 429 la tasa se reduce a la mitad y el balde
+# se vacía; cada éxito la sube un poco (AIMD), así el ritmo converge a la cuota
+# real sin tenerla configurada. Es seguro entre hilos y se comparte por API key.
+
+TASA_INICIAL = 1.0   # llamadas por segundo
+RAFAGA = 3           # los tres módulos pueden salir juntos
+TASA_MINIMA = 0.05
+TASA_MAXIMA = 5.0
+INCREMENTO = 0.05     # aumento aditivo por cada llamada exitosa
+
+
+class LimitadorAdaptativo:
+    """Token bucket cuya tasa se ajusta con los 429 observados."""
+
+    def __init__(self, tasa=TASA_INICIAL, rafaga=RAFAGA, tasa_minima=TASA_MINIMA, tasa_maxima=TASA_MAXIMA):
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self.tasa_minima = tasa_minima
+        self.tasa_maxima = tasa_maxima
+        self._tokens = float(rafaga)
+        self._ultimo = time.monotonic()
+        self._ultimo_recorte = float("-inf")
+        self._lock = threading.Lock()
+
+    def _reponer(self, ahora):
+        self._tokens = min(self.rafaga, self._tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def adquirir(self):
+        """Bloquea hasta que haya un token disponible y lo consume."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._reponer(ahora)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.tasa
+            time.sleep(espera)
+
+    def exito(self):
+        with self._lock:
+            self.tasa = min(self.tasa_maxima, self.tasa + INCREMENTO)
+
+    def saturado(self):
+        """Registra un 429: reduce la tasa a la mitad y vacía el balde."""
+        with self._lock:
+            ahora = time.monotonic()
+            # Varios hilos reciben el mismo 429 casi a la vez: se cuenta como uno solo
+            if ahora - self._ultimo_recorte >= 1 / self.tasa:
+                self.tasa = max(self.tasa_minima, self.tasa / 2)
+                self._ultimo_recorte = ahora
+            self._tokens = 0.0
+            self._ultimo = ahora
+
+
+def espera_exponencial(intento, base=2.0, maximo=60.0):
+    """Segundos a esperar antes del reintento `intento` (0, 1, ...), con jitter completo."""
+    return random.uniform(0, min(maximo, base * 2 ** intento))
+
+
+_limitadores = {}
+_lock_registro = threading.Lock()
+
+
+def limitador_para(llave):
+    """Un limitador por API key, compartido por todas las sesiones del proceso."""
+    with _lock_registro:
+        if llave not in _limitadores:
+            _limitadores[llave] = LimitadorAdaptativo()
+        return _limitadores[llave]
@@ -0,0 +1,78 @@
+import hashlib
+import io
+import json
+
+import xlsxwriter
+
+# ==============================================================================
+# REPORTE EXCEL
+# ==============================================================================
+# Escribe el reporte directamente con xlsxwriter en modo constant_memory: cada
+# fila se escribe y se baja a disco en orden, sin armar DataFrames, así que una
+# matriz de cientos de miles de filas se exporta con memoria acotada. La app lo
+# genera una sola vez por conjunto de resultados (ver huella_resultados) en vez
+# de reconstruirlo en cada rerun de Streamlit.
+
+# (llave en los resultados, hoja), en el orden en que aparecen en el libro
+HOJAS = [
+    ("matriz_control", "Control"),
+    ("matriz_cumplimiento", "Cumplimiento"),
+    ("matriz_tecnica", "Tecnica"),
+    ("eventos", "Cronograma"),
+]
+ANCHO_COLUMNA = 25
+
+
+def huella_resultados(data):
+    """SHA-256 del JSON de resultados; identifica el reporte en la caché."""
+    texto = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def _columnas(filas):
+    """Columnas en el orden en que aparecen (igual que pd.DataFrame sobre una lista de dicts)."""
+    columnas = {}
+    for fila in filas:
+        if isinstance(fila, dict):
+            columnas.update(dict.fromkeys(fila))
+        else:
+            columnas["valor"] = None
+    return list(columnas)
+
+
+def _celda(valor):
+    if valor is None or isinstance(valor, (str, int, float, bool)):
+        return valor
+    return json.dumps(valor, ensure_ascii=False, default=str)
+
+
+def _escribir_hoja(libro, nombre, filas, fmt_encabezado, fmt_texto):
+    hoja = libro.add_worksheet(nombre)
+    columnas = _columnas(filas)
+    hoja.set_column(0, max(len(columnas) - 1, 0), ANCHO_COLUMNA, fmt_texto)
+    for col, titulo in enumerate(columnas):
+        hoja.write(0, col, titulo, fmt_encabezado)
+    # constant_memory exige escribir fila por fila, en orden
+    for n, fila in enumerate(filas, start=1):
+        if not isinstance(fila, dict):
+            fila = {"valor": fila}
+        for col, titulo in enumerate(columnas):
+            valor = _celda(fila.get(titulo))
+            if valor is not None:
+                hoja.write(n, col, valor)
+
+
+def generar_excel(data):
+    """Bytes del reporte .xlsx con las matrices y el resumen."""
+    salida = io.BytesIO()
+    libro = xlsxwriter.Workbook(salida, {"constant_memory": True, "strings_to_numbers": False,
+                                         "strings_to_formulas": False, "strings_to_urls": False})
+    fmt_encabezado = libro.add_format({'bold': True, 'bg_color': '#1f497d', 'font_color': 'white', 'border': 1,
+                                       'text_wrap': True, 'valign': 'top'})
+    fmt_texto = libro.add_format({'text_wrap': True, 'valign': 'top', 'border': 1})
+    for llave, hoja in HOJAS:
+        if data.get(llave):
+            _escribir_hoja(libro, hoja, data[llave], fmt_encabezado, fmt_texto)
+    _escribir_hoja(libro, "Resumen", [data.get("resumen", {})], fmt_encabezado, fmt_texto)
+    libro.close()
+    return salida.getvalue()
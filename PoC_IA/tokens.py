@@ -0,0 +1,88 @@
+import threading
+
+# ==============================================================================
+# PRESUPUESTO DE TOKENS
+# ==============================================================================
+# Cuenta tokens reales (tiktoken) en lugar de recortar por caracteres. Las
+# cuentas se hacen una sola vez por página, al extraer, y viajan en la caché de
+# texto junto con la página. Con esas cuentas se empaquetan páginas completas
+# en cada prompt hasta el presupuesto del modelo (ventana de contexto menos la
+# reserva de salida y lo que ocupa la plantilla del prompt), y se reporta qué
+# páginas quedaron fuera.
+#
+# Gemini no publica su tokenizador; o200k_base es una aproximación cercana para
+# español. Si tiktoken o su codificación no están disponibles (p. ej. sin red
+# la primera vez), se estima con caracteres / 4.
+
+CODIFICACION = "o200k_base"
+CARACTERES_POR_TOKEN = 4
+
+# Ventana de contexto y salida máxima por modelo (tokens)
+MODELOS = {
+    "gemini-2.5-flash": {"ventana": 1_048_576, "salida": 65_536},
+    "gemini-2.5-pro": {"ventana": 1_048_576, "salida": 65_536},
+    "gemini-1.5-flash": {"ventana": 1_048_576, "salida": 8_192},
+    "gemini-1.5-pro": {"ventana": 2_097_152, "salida": 8_192},
+}
+MARGEN_SEGURIDAD = 0.05  # La cuenta es aproximada: se deja un 5% libre
+
+_codificador = None
+_sin_tiktoken = False
+_lock = threading.Lock()
+
+
+def _obtener_codificador():
+    global _codificador, _sin_tiktoken
+    if _codificador is None and not _sin_tiktoken:
+        with _lock:
+            if _codificador is None and not _sin_tiktoken:
+                try:
+                    import tiktoken  # Opcional: sin tiktoken se estima por caracteres
+                    _codificador = tiktoken.get_encoding(CODIFICACION)
+                except Exception:
+                    _sin_tiktoken = True
+    return _codificador
+
+
+def contar_tokens(texto):
+    codificador = _obtener_codificador()
+    if codificador is None:
+        return len(texto) // CARACTERES_POR_TOKEN + 1
+    return len(codificador.encode(texto, disallowed_special=()))
+
+
+def presupuesto_prompt(modelo, plantilla=""):
+    """Tokens disponibles para el documento en un prompt de `modelo`.
+
+    plantilla: el prompt sin el documento (instrucciones, catálogo, esquema JSON).
+    """
+    nombre = modelo.split("/")[-1]
+    limites = MODELOS.get(nombre, MODELOS["gemini-2.5-flash"])
+    disponible = limites["ventana"] * (1 - MARGEN_SEGURIDAD) - limites["salida"]
+    return max(0, int(disponible) - contar_tokens(plantilla))
+
+
+def empaquetar_paginas(posiciones, tokens_pagina, presupuesto, max_grupos=None):
+    """Agrupa páginas consecutivas (en orden) sin pasar el presupuesto de cada prompt.
+
+    Devuelve (grupos, excluidas): listas de posiciones. Se excluyen las páginas
+    que solas no caben en un prompt y las que sobran después de max_grupos.
+    """
+    grupos, excluidas, actual, usados = [], [], [], 0
+    for i in posiciones:
+        costo = tokens_pagina[i]
+        if costo > presupuesto:
+            excluidas.append(i)
+            continue
+        if actual and usados + costo > presupuesto:
+            grupos.append(actual)
+            actual, usados = [], 0
+        actual.append(i)
+        usados += costo
+    if actual:
+        grupos.append(actual)
+    if max_grupos is not None and len(grupos) > max_grupos:
+        for grupo in grupos[max_grupos:]:
+            excluidas.extend(grupo)
+        grupos = grupos[:max_grupos]
+    return grupos, sorted(excluidas)
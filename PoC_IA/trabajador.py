@@ -0,0 +1,240 @@
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import google.generativeai as genai
+
+from extraccion import iterar_paginas, consolidar, leer_bytes
+from cache_texto import CacheTexto, huella
+from cache_ia import CacheIA
+from limitador import limitador_para
+from almacen import AlmacenDocumentos, Documento, DocumentoNoDisponible
+from fragmentos import combinar_resultados, diferencias
+from analisis import MODELO_ANALISIS, MAX_LLAMADAS_SIMULTANEAS, llamada_segura_ia, planear_tareas, describir_excluidas
+from trabajos import ColaTrabajos
+
+# ==============================================================================
+# TRABAJADOR DE ANÁLISIS EN SEGUNDO PLANO
+# ==============================================================================
+# Proceso aparte (python trabajador.py) que toma trabajos de la cola y los
+# ejecuta por etapas: extracción (el texto va al almacén compartido) y luego
+# todas las llamadas de General, Legal y Técnico en paralelo. Cada llamada
+# que devuelve datos se guarda como checkpoint; al retomar un trabajo solo se
+# ejecuta lo que falta. Una llamada sin datos ya no se convierte en {} en
+# silencio: el resultado se entrega con lo que sí llegó y marca qué módulos y
+# fragmentos quedaron sin datos (un reanálisis los vuelve a pedir). El trabajo
+# falla, y se reintenta desde sus checkpoints, solo si ningún módulo devolvió nada.
+#
+# Reanálisis incremental: cada archivo se analiza por separado y su resultado
+# se guarda bajo el SHA-256 del PDF. Un trabajo con `base` (el análisis anterior
+# de la misma licitación) reutiliza los archivos que no cambiaron y solo manda
+# al modelo los nuevos o corregidos; el resultado trae las diferencias en las
+# matrices respecto al anterior.
+#
+# La app lanza un trabajador cuando no ve ninguno vivo; el trabajador sale solo
+# después de INACTIVIDAD_MAXIMA segundos sin trabajos.
+#
+# Variables de entorno:
+#   LICI_TRABAJADORES  trabajadores que mantiene la app (por defecto 1)
+
+TRABAJADORES = int(os.environ.get("LICI_TRABAJADORES", 1))
+INTERVALO_SONDEO = 2.0      # Segundos entre consultas a la cola cuando no hay trabajo
+INTERVALO_LATIDO = 15
+INTERVALO_REPORTE = 1.0     # Segundos entre reportes de progreso (y JSON parcial) a la cola
+INACTIVIDAD_MAXIMA = 600
+
+ETAPA_EXTRACCION = "extraccion"
+
+
+class ModuloSinDatos(RuntimeError):
+    """Ningún módulo devolvió datos; el trabajo se reintenta desde sus checkpoints."""
+
+
+def etapa_tarea(llave):
+    documento, nombre, i = llave
+    return f"{documento}:{nombre}:{i}"
+
+
+def _extraer(cola, almacen, trabajo, etapas):
+    """Etapa 1: texto consolidado (en el almacén), índice de páginas, archivo de cada página y
+    huella de cada archivo; o el checkpoint si ya existe."""
+    guardado = etapas.get(ETAPA_EXTRACCION)
+    if guardado is not None:
+        documento = Documento(*guardado["documento"])
+        try:
+            return (documento, almacen.leer(documento), [tuple(p) for p in guardado["indice_paginas"]],
+                    guardado["documentos"], guardado["huellas"])
+        except DocumentoNoDisponible:
+            pass  # La poda del almacén lo borró: se vuelve a extraer (la caché de texto lo hace barato)
+
+    def avance(leidas, total):
+        cola.reportar(trabajo["id"], {"etapa": "Extracción", "hechas": leidas, "total": total})
+
+    paginas = list(iterar_paginas(trabajo["archivos"], progreso=avance, cache=CacheTexto()))
+    texto, indice_paginas = consolidar(paginas)
+    documentos = [p.documento for p in paginas]
+    del paginas
+    huellas = [huella(leer_bytes(ruta)) for ruta, _ in trabajo["archivos"]]
+    documento = almacen.guardar(texto)
+    cola.guardar_etapa(trabajo["id"], ETAPA_EXTRACCION,
+                       {"documento": list(documento), "indice_paginas": indice_paginas,
+                        "documentos": documentos, "huellas": huellas})
+    return documento, texto, indice_paginas, documentos, huellas
+
+
+def _analisis_base(cola, parametros):
+    """Resultado del análisis anterior (`base`) y los resultados por archivo que se pueden reutilizar."""
+    info = cola.estado(parametros["base"]) if parametros.get("base") else None
+    previo = info["resultado"] if info and info["resultado"] else None
+    if previo is None:
+        return None, {}
+    # Solo se reutiliza lo analizado con el mismo modelo, enfoque y margen, y si no se pidió refrescar
+    mismos = previo.get("parametros") == _parametros_analisis(parametros)
+    if not mismos or parametros.get("refrescar"):
+        return previo, {}
+    return previo, previo.get("por_archivo", {})
+
+
+def _parametros_analisis(parametros):
+    return {"modelo": MODELO_ANALISIS, "enfoque": parametros["enfoque"], "margen": parametros["margen"]}
+
+
+def procesar(cola, almacen, trabajo):
+    """Ejecuta (o retoma) un trabajo y devuelve su resultado."""
+    parametros = trabajo["parametros"]
+    etapas = cola.etapas(trabajo["id"])
+    documento, texto, indice_paginas, documentos, huellas = _extraer(cola, almacen, trabajo, etapas)
+    previo, reutilizables = _analisis_base(cola, parametros)
+
+    # Etapa 2: módulos. Las tareas son deterministas, así que los checkpoints siguen aplicando;
+    # las de archivos sin cambios respecto al análisis base ni se ejecutan
+    tareas, excluidas = planear_tareas(texto, parametros["enfoque"], indice_paginas, parametros["margen"],
+                                       documentos)
+    del texto
+    tareas = {llave: prompt for llave, prompt in tareas.items() if huellas[llave[0]] not in reutilizables}
+    hechas = {llave: etapas[etapa_tarea(llave)] for llave in tareas if etapa_tarea(llave) in etapas}
+    pendientes = [llave for llave in tareas if llave not in hechas]
+
+    fallidas = []
+
+    def reportar(avisos=(), parcial=None):
+        modulos = {}
+        for _, nombre, _ in tareas:
+            propias = [llave for llave in tareas if llave[1] == nombre]
+            sin_datos = sum(1 for llave in fallidas if llave[1] == nombre)
+            if any(llave not in hechas and llave not in fallidas for llave in propias):
+                modulos[nombre] = "en curso"
+            elif sin_datos:
+                modulos[nombre] = f"incompleto ({sin_datos} de {len(propias)} fragmentos sin datos)"
+            else:
+                modulos[nombre] = "listo"
+        cola.reportar(trabajo["id"], {"etapa": "Análisis", "hechas": len(hechas), "total": len(tareas),
+                                      "modulos": modulos, "avisos": list(avisos)[-3:]}, parcial)
+
+    if pendientes:
+        genai.configure(api_key=trabajo["api_key"])
+        model = genai.GenerativeModel(MODELO_ANALISIS)
+        limitador = limitador_para(trabajo["api_key"])
+        cache = CacheIA()
+        avisos = []
+        parciales = dict(hechas)  # Lo escriben los hilos (una asignación por llave), lo lee este hilo
+        reportar()
+        with ThreadPoolExecutor(max_workers=min(len(pendientes), MAX_LLAMADAS_SIMULTANEAS)) as pool:
+            futuros = {pool.submit(llamada_segura_ia, model, tareas[llave],
+                                   f"{llave[1]} ({trabajo['archivos'][llave[0]][1]})", limitador, avisos.append,
+                                   cache, parametros.get("refrescar", False),
+                                   lambda d, llave=llave: parciales.__setitem__(llave, d)): llave
+                       for llave in pendientes}
+            abiertos = set(futuros)
+            while abiertos:
+                listos, abiertos = wait(abiertos, timeout=INTERVALO_REPORTE, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    llave = futuros[futuro]
+                    datos = parciales[llave] = futuro.result()
+                    if datos:
+                        cola.guardar_etapa(trabajo["id"], etapa_tarea(llave), datos)
+                        hechas[llave] = datos
+                    else:
+                        fallidas.append(llave)
+                reportar(avisos, combinar_resultados(parciales.get(llave, {}) for llave in tareas))
+    if fallidas and not hechas and not any(h in reutilizables for h in huellas):
+        nombres = ", ".join(sorted({nombre for _, nombre, _ in fallidas}))
+        raise ModuloSinDatos(f"Sin datos del modelo para: {nombres}")
+
+    # Reduce en orden fijo (archivo, módulo, fragmento), para que el resultado no dependa de cuál
+    # terminó primero; primero cada archivo por separado, para poder reutilizarlo después. Un
+    # archivo con fragmentos sin datos aporta lo que llegó, pero no se guarda para reutilizar
+    por_archivo, incompletos = {}, {}
+    for d, h in enumerate(huellas):
+        if h in reutilizables:
+            por_archivo[h] = reutilizables[h]
+        elif any(llave[0] == d for llave in tareas):
+            combinado = combinar_resultados(hechas[llave] for llave in tareas if llave[0] == d and llave in hechas)
+            if any(llave[0] == d for llave in fallidas):
+                incompletos[h] = combinado
+            else:
+                por_archivo[h] = combinado
+    if not por_archivo and not incompletos:
+        raise ModuloSinDatos("Ningún archivo tiene texto que analizar")
+    datos = combinar_resultados({**incompletos, **por_archivo}[h] for h in dict.fromkeys(huellas)
+                                if h in por_archivo or h in incompletos)
+    return {
+        "datos": datos,
+        "documento": list(documento),
+        "indice_paginas": indice_paginas,
+        "aviso": describir_excluidas(excluidas, indice_paginas) if excluidas else None,
+        "parametros": _parametros_analisis(parametros),
+        "por_archivo": por_archivo,
+        "reutilizados": sum(1 for h in huellas if h in reutilizables),
+        "fallidas": [{"modulo": nombre, "archivo": trabajo["archivos"][d][1], "fragmento": i + 1}
+                     for d, nombre, i in sorted(fallidas)],
+        "diferencias": diferencias(previo["datos"], datos) if previo else None,
+    }
+
+
+def main():
+    cola = ColaTrabajos()
+    almacen = AlmacenDocumentos()
+    id_trabajador = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    cola.registrar_trabajador(id_trabajador)
+    actual = {"trabajo": None}
+    parar = threading.Event()
+
+    def latidos():
+        while not parar.wait(INTERVALO_LATIDO):
+            try:
+                cola.latir(id_trabajador, actual["trabajo"])
+            except sqlite3.Error:
+                pass  # Base ocupada: el siguiente latido lo intenta de nuevo
+
+    threading.Thread(target=latidos, daemon=True).start()
+    cola.podar()
+    ultimo = time.monotonic()
+    try:
+        while time.monotonic() - ultimo < INACTIVIDAD_MAXIMA:
+            trabajo = cola.tomar(id_trabajador)
+            if trabajo is None:
+                time.sleep(INTERVALO_SONDEO)
+                continue
+            actual["trabajo"] = trabajo["id"]
+            try:
+                cola.terminar(trabajo["id"], procesar(cola, almacen, trabajo))
+            except Exception as e:
+                traceback.print_exc(file=sys.stderr)
+                cola.fallar(trabajo["id"], f"{type(e).__name__}: {e}")
+            finally:
+                actual["trabajo"] = None
+                ultimo = time.monotonic()
+    finally:
+        parar.set()
+        cola.baja_trabajador(id_trabajador)
+
+
+if __name__ == "__main__":
+    main()
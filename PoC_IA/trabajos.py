@@ -0,0 +1,212 @@
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+from limitador import espera_exponencial
+
+# ==============================================================================
+# COLA PERSISTENTE DE TRABAJOS DE ANÁLISIS (SQLite local)
+# ==============================================================================
+# La app ya no analiza dentro del hilo de Streamlit: encola un trabajo (los PDFs
+# se copian a disco) y un proceso trabajador (ver trabajador.py) lo ejecuta.
+# Cada etapa terminada (extracción y cada llamada de General, Legal y Técnico)
+# queda guardada como checkpoint, así que un trabajo que falla o se interrumpe
+# (caída del trabajador, reinicio del servidor) se retoma desde la última etapa
+# completa. La interfaz solo consulta el estado; un refresh del navegador no
+# pierde nada.
+#
+# Un trabajador toma un trabajo marcándolo con su id y un latido; si el latido
+# se vence, otro trabajador lo puede retomar. Los errores se reintentan con
+# espera exponencial hasta MAX_INTENTOS y después el trabajo queda en "error"
+# hasta que alguien lo reintente desde la interfaz.
+#
+# La API key de Gemini se guarda solo mientras el trabajo está activo y se
+# borra al terminar o al fallar definitivamente.
+#
+# Variables de entorno:
+#   LICI_TRABAJOS_DIR  carpeta de la base y los PDFs (por defecto ~/.cache/licitacion_ai/trabajos)
+
+DIRECTORIO = os.environ.get("LICI_TRABAJOS_DIR",
+                            os.path.join(os.path.expanduser("~"), ".cache", "licitacion_ai", "trabajos"))
+MAX_INTENTOS = 3
+LATIDO_VENCIDO = 120  # Segundos sin latido para considerar caído a un trabajador
+DIAS_RETENCION = 7    # Los trabajos terminados se borran después de esto
+
+PENDIENTE, EN_CURSO, LISTO, ERROR = "pendiente", "en_curso", "listo", "error"
+
+
+class ColaTrabajos:
+    """Cola de trabajos con checkpoints por etapa, compartida entre procesos."""
+
+    def __init__(self, directorio=DIRECTORIO):
+        self.directorio = directorio
+        self.ruta = os.path.join(directorio, "trabajos.sqlite")
+        os.makedirs(directorio, exist_ok=True)
+        with self._conectar() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("""CREATE TABLE IF NOT EXISTS trabajos (
+                id TEXT PRIMARY KEY, estado TEXT, parametros TEXT, api_key TEXT, archivos TEXT,
+                creado REAL, actualizado REAL, disponible REAL, intentos INTEGER DEFAULT 0,
+                trabajador TEXT, latido REAL, progreso TEXT, parcial TEXT, resultado TEXT, error TEXT)""")
+            con.execute("""CREATE TABLE IF NOT EXISTS etapas (
+                trabajo TEXT, etapa TEXT, datos TEXT, creado REAL, PRIMARY KEY (trabajo, etapa))""")
+            con.execute("CREATE TABLE IF NOT EXISTS trabajadores (id TEXT PRIMARY KEY, pid INTEGER, latido REAL)")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_estado ON trabajos (estado, disponible)")
+        os.chmod(self.ruta, 0o600)  # Guarda API keys mientras los trabajos corren
+
+    @contextmanager
+    def _conectar(self):
+        # Una conexión por operación: así se puede usar desde varios hilos y procesos
+        con = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                yield con
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+        finally:
+            con.close()
+
+    # --- Lado de la interfaz ---
+    def encolar(self, archivos, parametros, api_key):
+        """Copia los PDFs a disco y encola el trabajo. archivos: lista de (bytes, nombre)."""
+        id_trabajo = uuid.uuid4().hex
+        carpeta = os.path.join(self.directorio, id_trabajo)
+        os.makedirs(carpeta)
+        rutas = []
+        for n, (datos, nombre) in enumerate(archivos):
+            ruta = os.path.join(carpeta, f"{n:03d}.pdf")
+            with open(ruta, "wb") as f:
+                f.write(datos)
+            rutas.append((ruta, nombre))
+        ahora = time.time()
+        with self._conectar() as con:
+            con.execute("""INSERT INTO trabajos (id, estado, parametros, api_key, archivos, creado, actualizado,
+                           disponible) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                        (id_trabajo, PENDIENTE, json.dumps(parametros, ensure_ascii=False), api_key,
+                         json.dumps(rutas, ensure_ascii=False), ahora, ahora, ahora))
+        return id_trabajo
+
+    def estado(self, id_trabajo):
+        """Dict con estado, progreso, parcial, resultado y error, o None si no existe."""
+        with self._conectar() as con:
+            fila = con.execute("""SELECT estado, intentos, progreso, parcial, resultado, error FROM trabajos
+                                  WHERE id = ?""", (id_trabajo,)).fetchone()
+            etapas = [e for (e,) in con.execute("SELECT etapa FROM etapas WHERE trabajo = ?", (id_trabajo,))]
+        if fila is None:
+            return None
+        estado, intentos, progreso, parcial, resultado, error = fila
+        return {
+            "estado": estado, "intentos": intentos, "etapas": etapas, "error": error,
+            "progreso": json.loads(progreso) if progreso else {},
+            "parcial": json.loads(parcial) if parcial else {},
+            "resultado": json.loads(resultado) if resultado else None,
+        }
+
+    def reintentar(self, id_trabajo, api_key):
+        """Vuelve a encolar un trabajo con error; retoma desde sus checkpoints."""
+        with self._conectar() as con:
+            con.execute("""UPDATE trabajos SET estado = ?, api_key = ?, intentos = 0, error = NULL,
+                           disponible = ?, actualizado = ? WHERE id = ? AND estado = ?""",
+                        (PENDIENTE, api_key, time.time(), time.time(), id_trabajo, ERROR))
+
+    def trabajadores_vivos(self):
+        limite = time.time() - LATIDO_VENCIDO
+        with self._conectar() as con:
+            return con.execute("SELECT COUNT(*) FROM trabajadores WHERE latido >= ?", (limite,)).fetchone()[0]
+
+    # --- Lado del trabajador ---
+    def registrar_trabajador(self, id_trabajador):
+        with self._conectar() as con:
+            con.execute("INSERT OR REPLACE INTO trabajadores (id, pid, latido) VALUES (?, ?, ?)",
+                        (id_trabajador, os.getpid(), time.time()))
+
+    def baja_trabajador(self, id_trabajador):
+        with self._conectar() as con:
+            con.execute("DELETE FROM trabajadores WHERE id = ?", (id_trabajador,))
+
+    def tomar(self, id_trabajador):
+        """Reserva el siguiente trabajo disponible (o uno cuyo trabajador se cayó).
+
+        Devuelve dict con id, parametros, api_key y archivos, o None si no hay.
+        """
+        ahora = time.time()
+        with self._conectar() as con:
+            fila = con.execute("""SELECT id, parametros, api_key, archivos FROM trabajos
+                                  WHERE (estado = ? AND disponible <= ?) OR (estado = ? AND latido < ?)
+                                  ORDER BY creado LIMIT 1""",
+                               (PENDIENTE, ahora, EN_CURSO, ahora - LATIDO_VENCIDO)).fetchone()
+            if fila is None:
+                return None
+            con.execute("""UPDATE trabajos SET estado = ?, trabajador = ?, latido = ?, actualizado = ?
+                           WHERE id = ?""", (EN_CURSO, id_trabajador, ahora, ahora, fila[0]))
+        return {"id": fila[0], "parametros": json.loads(fila[1]), "api_key": fila[2],
+                "archivos": [tuple(a) for a in json.loads(fila[3])]}
+
+    def latir(self, id_trabajador, id_trabajo=None):
+        ahora = time.time()
+        with self._conectar() as con:
+            con.execute("UPDATE trabajadores SET latido = ? WHERE id = ?", (ahora, id_trabajador))
+            if id_trabajo:
+                con.execute("UPDATE trabajos SET latido = ? WHERE id = ? AND trabajador = ?",
+                            (ahora, id_trabajo, id_trabajador))
+
+    def reportar(self, id_trabajo, progreso, parcial=None):
+        """Guarda el progreso (y opcionalmente el JSON parcial) para que la interfaz lo consulte."""
+        with self._conectar() as con:
+            if parcial is None:
+                con.execute("UPDATE trabajos SET progreso = ?, actualizado = ? WHERE id = ?",
+                            (json.dumps(progreso, ensure_ascii=False), time.time(), id_trabajo))
+            else:
+                con.execute("UPDATE trabajos SET progreso = ?, parcial = ?, actualizado = ? WHERE id = ?",
+                            (json.dumps(progreso, ensure_ascii=False), json.dumps(parcial, ensure_ascii=False),
+                             time.time(), id_trabajo))
+
+    def etapas(self, id_trabajo):
+        """{etapa: datos} de los checkpoints ya guardados."""
+        with self._conectar() as con:
+            filas = con.execute("SELECT etapa, datos FROM etapas WHERE trabajo = ?", (id_trabajo,)).fetchall()
+        return {etapa: json.loads(datos) for etapa, datos in filas}
+
+    def guardar_etapa(self, id_trabajo, etapa, datos):
+        with self._conectar() as con:
+            con.execute("INSERT OR REPLACE INTO etapas (trabajo, etapa, datos, creado) VALUES (?, ?, ?, ?)",
+                        (id_trabajo, etapa, json.dumps(datos, ensure_ascii=False), time.time()))
+
+    def terminar(self, id_trabajo, resultado):
+        with self._conectar() as con:
+            con.execute("""UPDATE trabajos SET estado = ?, resultado = ?, api_key = NULL, parcial = NULL,
+                           actualizado = ? WHERE id = ?""",
+                        (LISTO, json.dumps(resultado, ensure_ascii=False), time.time(), id_trabajo))
+        shutil.rmtree(os.path.join(self.directorio, id_trabajo), ignore_errors=True)  # Ya no hacen falta los PDFs
+
+    def fallar(self, id_trabajo, error):
+        """Reintenta más tarde (espera exponencial) o, agotados los intentos, deja el trabajo en error."""
+        with self._conectar() as con:
+            (intentos,) = con.execute("SELECT intentos FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+            intentos += 1
+            if intentos < MAX_INTENTOS:
+                con.execute("""UPDATE trabajos SET estado = ?, intentos = ?, error = ?, disponible = ?,
+                               actualizado = ? WHERE id = ?""",
+                            (PENDIENTE, intentos, error, time.time() + espera_exponencial(intentos, base=10),
+                             time.time(), id_trabajo))
+            else:
+                con.execute("""UPDATE trabajos SET estado = ?, intentos = ?, error = ?, api_key = NULL,
+                               actualizado = ? WHERE id = ?""", (ERROR, intentos, error, time.time(), id_trabajo))
+
+    def podar(self, dias=DIAS_RETENCION):
+        """Borra trabajos terminados (y sus checkpoints y PDFs) más viejos que `dias`."""
+        limite = time.time() - dias * 86400
+        with self._conectar() as con:
+            viejos = [i for (i,) in con.execute("SELECT id FROM trabajos WHERE estado IN (?, ?) AND actualizado < ?",
+                                                (LISTO, ERROR, limite))]
+            con.executemany("DELETE FROM etapas WHERE trabajo = ?", [(i,) for i in viejos])
+            con.executemany("DELETE FROM trabajos WHERE id = ?", [(i,) for i in viejos])
+        for i in viejos:
+            shutil.rmtree(os.path.join(self.directorio, i), ignore_errors=True)
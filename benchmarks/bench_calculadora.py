@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor_roi import calcular_roi_oee, calcular_ale_ciber  # noqa: E402
+from montecarlo import simular_ciber, beta_desde_media  # noqa: E402
+
+# ==============================================================================
+# BENCHMARK DE LA CALCULADORA
+# ==============================================================================
+# Mide tiempo, memoria pico y escenarios por segundo de los caminos de cálculo
+# (escalar, vectorizado y Monte Carlo) y guarda el resultado en JSON para
+# comparar entre versiones.
+#
+# Uso:
+#   python benchmarks/bench_calculadora.py -o bench.json
+#   python benchmarks/bench_calculadora.py --tamanos 1 1000 --repeticiones 5
+#   python benchmarks/bench_calculadora.py --comparar bench_anterior.json
+
+TAMANOS = (1, 1_000, 100_000, 10_000_000)
+MAX_ESCALAR = 100_000  # El camino escalar es un ciclo de Python: más allá no aporta
+
+
+def _entradas_oee(n, rng):
+    return dict(
+        prod_anual=rng.uniform(1e5, 1e6, n), precio_unit=rng.uniform(5, 50, n),
+        margen_pct=rng.uniform(0.05, 0.6, n), horas_anuales=rng.uniform(2000, 8000, n),
+        costo_hora_duro=rng.uniform(100, 1000, n), costo_solucion=rng.uniform(5e3, 5e4, n),
+        mejora_oee=rng.uniform(0.01, 0.15, n),
+    )
+
+
+def _entradas_ciber(n, rng):
+    return dict(
+        ingreso_diario=rng.uniform(1e4, 1e5, n), dias_paro=rng.uniform(1, 30, n),
+        probabilidad=rng.uniform(0.01, 0.5, n), costo_ciber=rng.uniform(5e3, 5e4, n),
+        mitigacion=rng.uniform(0.5, 0.99, n),
+    )
+
+
+def escalar_oee(n, rng):
+    entradas = _entradas_oee(n, rng)
+    filas = [{k: float(v[i]) for k, v in entradas.items()} for i in range(n)]
+    return lambda: [calcular_roi_oee(**f) for f in filas]
+
+
+def escalar_ciber(n, rng):
+    entradas = _entradas_ciber(n, rng)
+    filas = [{k: float(v[i]) for k, v in entradas.items()} for i in range(n)]
+    return lambda: [calcular_ale_ciber(**f) for f in filas]
+
+
+def lote_oee(n, rng):
+    entradas = _entradas_oee(n, rng)
+    return lambda: calcular_roi_oee(**entradas)
+
+
+def lote_ciber(n, rng):
+    entradas = _entradas_ciber(n, rng)
+    return lambda: calcular_ale_ciber(**entradas)
+
+
+def montecarlo_ciber(n, rng):
+    return lambda: simular_ciber(
+        50000.0, ("triangular", 7, 14, 30), beta_desde_media(0.10, 20), 12000.0,
+        beta_desde_media(0.85, 30, 0.5, 0.99), n=n, semilla=0,
+    )
+
+
+CAMINOS = {
+    "escalar_oee": escalar_oee,
+    "escalar_ciber": escalar_ciber,
+    "lote_oee": lote_oee,
+    "lote_ciber": lote_ciber,
+    "montecarlo_ciber": montecarlo_ciber,
+}
+
+
+def medir(preparar, n, repeticiones):
+    """Devuelve el mejor tiempo de `repeticiones` corridas y la memoria pico de una corrida."""
+    rng = np.random.default_rng(0)
+    funcion = preparar(n, rng)
+    funcion()  # Calentamiento (imports, cachés de NumPy)
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    # La memoria se mide aparte: tracemalloc agrega sobrecosto al tiempo
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mejor = min(tiempos)
+    return {
+        "n": n,
+        "segundos": mejor,
+        "segundos_mediana": float(np.median(tiempos)),
+        "memoria_pico_mb": pico / 2**20,
+        "escenarios_por_segundo": n / mejor if mejor > 0 else float("inf"),
+    }
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def correr(caminos, tamanos, repeticiones, max_escalar=MAX_ESCALAR):
+    resultados = []
+    for nombre in caminos:
+        for n in tamanos:
+            if nombre.startswith("escalar") and n > max_escalar:
+                print(f"  {nombre:<18} n={n:>12,}  (omitido, > {max_escalar:,})", file=sys.stderr)
+                continue
+            r = {"camino": nombre, **medir(CAMINOS[nombre], n, repeticiones)}
+            print(f"  {nombre:<18} n={n:>12,}  {r['segundos']*1000:>10.2f} ms  "
+                  f"{r['memoria_pico_mb']:>9.1f} MB  {r['escenarios_por_segundo']:>14,.0f} esc/s", file=sys.stderr)
+            resultados.append(r)
+    return {
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "repeticiones": repeticiones,
+        "resultados": resultados,
+    }
+
+
+def comparar(actual, anterior, umbral=0.10):
+    """Lista los casos que se hicieron más lentos que `umbral` respecto al reporte anterior."""
+    previos = {(r["camino"], r["n"]): r for r in anterior["resultados"]}
+    regresiones = []
+    for r in actual["resultados"]:
+        previo = previos.get((r["camino"], r["n"]))
+        if previo and r["segundos"] > previo["segundos"] * (1 + umbral):
+            regresiones.append((r["camino"], r["n"], previo["segundos"], r["segundos"]))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de los cálculos de ROI y ALE.")
+    parser.add_argument("-o", "--salida", default="bench_calculadora.json", help="Archivo JSON de resultados")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=list(TAMANOS), help="Número de escenarios")
+    parser.add_argument("--caminos", nargs="+", choices=list(CAMINOS), default=list(CAMINOS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--max-escalar", type=int, default=MAX_ESCALAR,
+                        help="Tamaño máximo para los caminos escalares (ciclo de Python)")
+    parser.add_argument("--comparar", help="Reporte JSON anterior para detectar regresiones")
+    parser.add_argument("--umbral", type=float, default=0.10, help="Tolerancia de regresión (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    reporte = correr(args.caminos, args.tamanos, args.repeticiones, args.max_escalar)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = comparar(reporte, json.load(f), args.umbral)
+        for camino, n, antes, ahora in regresiones:
+            print(f"REGRESIÓN {camino} n={n:,}: {antes*1000:.2f} ms -> {ahora*1000:.2f} ms")
+        return 1 if regresiones else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import numpy as np
+
+from motor_roi import calcular_roi_oee
+
+# ==============================================================================
+# FLUJO DE EFECTIVO MULTI-AÑO (VAN / TIR)
+# ==============================================================================
+# Proyecta el beneficio del OEE año por año con una curva de arranque (la mejora
+# no llega completa el primer año) y calcula VAN y TIR para muchos escenarios a
+# la vez. Convención: el costo anual de la solución se paga al inicio de cada
+# año (t = 0 .. anios-1) y los beneficios se reciben al cierre (t = 1 .. anios).
+
+
+def curva_rampa(anios, anios_rampa=1, forma="lineal"):
+    """Fracción de la mejora alcanzada en cada año 1..anios.
+
+    anios_rampa puede ser escalar o arreglo (uno por escenario); forma "lineal"
+    o "s" (arranque lento, luego acelera). Devuelve forma (n, anios).
+    """
+    t = np.arange(1, anios + 1, dtype=np.float64)
+    rampa = np.atleast_1d(np.asarray(anios_rampa, dtype=np.float64))
+    x = np.clip(t[None, :] / np.maximum(rampa[:, None], 1e-9), 0.0, 1.0)
+    if forma == "s":
+        x = x * x * (3 - 2 * x)
+    elif forma != "lineal":
+        raise ValueError(f"Forma de rampa no soportada: {forma}")
+    return x
+
+
+def proyectar_flujos(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro,
+                     costo_solucion, mejora_oee, anios=5, anios_rampa=1, forma="lineal",
+                     inversion_inicial=0.0):
+    """Arma la matriz de flujos (n, anios + 1) para uno o muchos escenarios.
+
+    Todas las entradas aceptan escalares o arreglos de longitud n.
+    """
+    mejora = np.atleast_1d(np.asarray(mejora_oee, dtype=np.float64))
+    rampa = curva_rampa(anios, anios_rampa, forma)
+    n = np.broadcast_shapes(
+        *(np.shape(v) for v in (prod_anual, precio_unit, margen_pct, horas_anuales,
+                                costo_hora_duro, costo_solucion, inversion_inicial,
+                                anios_rampa)),
+        mejora.shape,
+    )
+    n = n[0] if n else 1
+
+    def columna(v):
+        return np.broadcast_to(np.asarray(v, dtype=np.float64), (n,))[:, None]
+
+    # El beneficio es lineal en la mejora, así que basta escalar la mejora por la rampa
+    r = calcular_roi_oee(columna(prod_anual), columna(precio_unit), columna(margen_pct),
+                         columna(horas_anuales), columna(costo_hora_duro), 0.0,
+                         columna(mejora) * rampa)
+    costo = columna(costo_solucion)
+
+    flujos = np.zeros((n, anios + 1))
+    flujos[:, 1:] = r["beneficio_total"]
+    flujos[:, :anios] -= costo
+    flujos[:, 0] -= columna(inversion_inicial)[:, 0]
+    return flujos
+
+
+def van(flujos, tasa):
+    """Valor actual neto de cada fila de flujos a la tasa dada (escalar o por fila)."""
+    flujos = np.atleast_2d(flujos)
+    t = np.arange(flujos.shape[1])
+    tasa = np.asarray(tasa, dtype=np.float64).reshape(-1, 1)
+    return (flujos / (1 + tasa) ** t).sum(axis=1)
+
+
+def tir(flujos, tol=1e-9, max_iter=100, minimo=-0.99, maximo=10.0):
+    """Tasa interna de retorno de cada fila, resuelta para todas a la vez.
+
+    Newton-Raphson con respaldo de bisección dentro de [minimo, maximo]: cada
+    iteración se queda con el paso de Newton si cae dentro del intervalo y, si
+    no, con el punto medio. Devuelve NaN donde el VAN no cambia de signo.
+    """
+    flujos = np.atleast_2d(np.asarray(flujos, dtype=np.float64))
+    n = flujos.shape[0]
+    t = np.arange(flujos.shape[1], dtype=np.float64)
+
+    def f_y_derivada(x, filas):
+        desc = (1 + x)[:, None] ** -t
+        c = flujos[filas] * desc
+        return c.sum(axis=1), (-t * c / (1 + x)[:, None]).sum(axis=1)
+
+    lo, hi = np.full(n, minimo), np.full(n, maximo)
+    todas = slice(None)
+    f_lo, _ = f_y_derivada(lo, todas)
+    f_hi, _ = f_y_derivada(hi, todas)
+    valido = np.sign(f_lo) != np.sign(f_hi)
+    escala = np.abs(flujos).max(axis=1) + 1e-12
+
+    x = np.where(valido, 0.1, np.nan)
+    activo = valido.copy()
+    for _ in range(max_iter):
+        if not activo.any():
+            break
+        xa = x[activo]
+        f, df = f_y_derivada(xa, activo)
+
+        # Acotar: el intervalo se queda con el cambio de signo
+        mismo = np.sign(f) == np.sign(f_lo[activo])
+        lo_a = np.where(mismo, xa, lo[activo])
+        hi_a = np.where(mismo, hi[activo], xa)
+        f_lo[activo] = np.where(mismo, f, f_lo[activo])
+        lo[activo], hi[activo] = lo_a, hi_a
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = xa - f / df
+        fuera = ~np.isfinite(newton) | (newton <= lo_a) | (newton >= hi_a)
+        siguiente = np.where(fuera, (lo_a + hi_a) / 2, newton)
+
+        listo = (np.abs(f) < tol * escala[activo]) | (hi_a - lo_a < tol)
+        x[activo] = np.where(listo, xa, siguiente)
+        activo[activo] = ~listo
+    return x
@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from portafolio import leer_en_bloques
+
+# ==============================================================================
+# HISTÓRICO DE INCIDENTES (Bootstrap por Industria)
+# ==============================================================================
+# Estima los insumos de la pestaña de ciberseguridad (días de paro, costo y
+# probabilidad anual) a partir de un histórico local de incidentes, con
+# intervalos de confianza por bootstrap. El resultado por industria se guarda en
+# un índice JSON junto al archivo fuente; mientras el archivo no cambie, la
+# pestaña lo lee directo sin volver a remuestrear.
+#
+# Archivo de incidentes (CSV/Parquet): industria, dias_paro, costo
+# Exposición (opcional, CSV): industria, planta_anios  -> plantas observadas x años
+#   Sin exposición no se puede estimar la probabilidad (queda en NaN).
+#
+# Uso:
+#   python incidentes.py datos/incidentes.csv --exposicion datos/exposicion.csv
+
+N_REMUESTRAS = 10_000
+MAX_NIVELES = 256
+VERSION_INDICE = 1
+
+
+def cargar_incidentes(origen, formato=None):
+    """Lee solo las columnas necesarias del histórico, por bloques."""
+    partes = []
+    for bloque in leer_en_bloques(origen, formato):
+        faltantes = [c for c in ("industria", "dias_paro", "costo") if c not in bloque.columns]
+        if faltantes:
+            raise ValueError(f"Faltan columnas en el histórico: {', '.join(faltantes)}")
+        partes.append(pd.DataFrame({
+            "industria": bloque["industria"].astype(str).str.strip(),
+            "dias_paro": pd.to_numeric(bloque["dias_paro"], errors="coerce"),
+            "costo": pd.to_numeric(bloque["costo"], errors="coerce"),
+        }))
+    if not partes:
+        return pd.DataFrame(columns=["industria", "dias_paro", "costo"])
+    return pd.concat(partes, ignore_index=True)
+
+
+def bootstrap_media(x, n_remuestras, rng, max_niveles=MAX_NIVELES):
+    """Distribución bootstrap de la media de x (n_remuestras valores).
+
+    Remuestrear n valores con reemplazo equivale a sortear cuántas veces sale
+    cada valor distinto (multinomial), así que el costo es O(remuestras x
+    valores distintos) y no O(remuestras x n). Si hay demasiados valores
+    distintos se agrupan en cuantiles; cada grupo aporta su media más un ruido
+    normal con la varianza interna del grupo.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    x = x[np.isfinite(x)]
+    n = x.size
+    if n == 0:
+        return np.full(n_remuestras, np.nan)
+
+    valores, conteos = np.unique(x, return_counts=True)
+    varianzas = None
+    if valores.size > max_niveles:
+        orden = np.sort(x)
+        cortes = np.linspace(0, n, max_niveles + 1).astype(np.int64)
+        conteos = np.diff(cortes)
+        valores = np.add.reduceat(orden, cortes[:-1]) / conteos
+        varianzas = np.maximum(np.add.reduceat(orden ** 2, cortes[:-1]) / conteos - valores ** 2, 0.0)
+
+    conteos_remuestra = rng.multinomial(n, conteos / n, size=n_remuestras)
+    sumas = conteos_remuestra @ valores
+    if varianzas is not None:
+        # Variación dentro de cada grupo: c sorteos de un grupo suman c*media con varianza c*var
+        sumas += np.sqrt(conteos_remuestra @ varianzas) * rng.standard_normal(n_remuestras)
+    return sumas / n
+
+
+def _intervalo(muestras, nivel):
+    alfa = (1 - nivel) / 2
+    bajo, alto = np.nanquantile(muestras, [alfa, 1 - alfa])
+    return float(bajo), float(alto)
+
+
+def resumir_industria(df, planta_anios=None, n_remuestras=N_REMUESTRAS, rng=None, nivel=0.95):
+    """Estimaciones puntuales e intervalos bootstrap para una industria."""
+    rng = rng or np.random.default_rng()
+    n = len(df)
+    dias = bootstrap_media(df["dias_paro"], n_remuestras, rng)
+    costo = bootstrap_media(df["costo"], n_remuestras, rng)
+    resumen = {
+        "incidentes": n,
+        "dias_paro": float(df["dias_paro"].mean()),
+        "dias_paro_ic": _intervalo(dias, nivel),
+        "costo": float(df["costo"].mean()),
+        "costo_ic": _intervalo(costo, nivel),
+        "planta_anios": float(planta_anios) if planta_anios else None,
+        "probabilidad": float("nan"),
+        "probabilidad_ic": (float("nan"), float("nan")),
+    }
+    if planta_anios:
+        # Cada planta-año es 0/1: remuestrearlos es una binomial con la tasa observada
+        p = min(n / planta_anios, 1.0)
+        exposicion = int(round(planta_anios))
+        prob = rng.binomial(exposicion, p, size=n_remuestras) / exposicion
+        resumen["probabilidad"] = p
+        resumen["probabilidad_ic"] = _intervalo(prob, nivel)
+    return resumen
+
+
+def _llave_fuente(*rutas):
+    """Identifica la versión de los archivos fuente por tamaño y fecha de modificación."""
+    return [[os.path.abspath(r), os.path.getsize(r), os.stat(r).st_mtime_ns] if r else None for r in rutas]
+
+
+def construir_indice(origen, exposicion=None, n_remuestras=N_REMUESTRAS, semilla=0, nivel=0.95):
+    """Calcula el resumen de todas las industrias. Devuelve un dict industria -> resumen."""
+    df = cargar_incidentes(origen)
+    expo = {}
+    if exposicion:
+        tabla = pd.read_csv(exposicion)
+        expo = dict(zip(tabla["industria"].astype(str).str.strip(), tabla["planta_anios"].astype(float)))
+
+    rng = np.random.default_rng(semilla)
+    indice = {"todas": resumir_industria(df, sum(expo.values()) or None, n_remuestras, rng, nivel)}
+    for industria, grupo in df.groupby("industria", sort=True):
+        indice[industria] = resumir_industria(grupo, expo.get(industria), n_remuestras, rng, nivel)
+    return indice
+
+
+def ruta_indice(origen):
+    return f"{origen}.indice.json"
+
+
+def _llave(origen, exposicion, n_remuestras, semilla, nivel):
+    return {"version": VERSION_INDICE, "fuente": _llave_fuente(origen, exposicion),
+            "n_remuestras": n_remuestras, "semilla": semilla, "nivel": nivel}
+
+
+def indice_guardado(origen, exposicion=None, n_remuestras=N_REMUESTRAS, semilla=0, nivel=0.95):
+    """Devuelve el índice ya calculado si sigue vigente, o None (nunca remuestrea)."""
+    destino = ruta_indice(origen)
+    if not os.path.exists(destino):
+        return None
+    try:
+        with open(destino, encoding="utf-8") as f:
+            guardado = json.load(f)
+    except (OSError, ValueError):
+        return None  # Índice corrupto o ilegible: se reconstruye
+    if guardado.get("llave") != _llave(origen, exposicion, n_remuestras, semilla, nivel):
+        return None
+    return guardado["industrias"]
+
+
+def cargar_indice(origen, exposicion=None, n_remuestras=N_REMUESTRAS, semilla=0, nivel=0.95):
+    """Devuelve el índice por industria; lo recalcula solo si la fuente o los parámetros cambiaron."""
+    indice = indice_guardado(origen, exposicion, n_remuestras, semilla, nivel)
+    if indice is not None:
+        return indice
+
+    llave = _llave(origen, exposicion, n_remuestras, semilla, nivel)
+    destino = ruta_indice(origen)
+    indice = construir_indice(origen, exposicion, n_remuestras, semilla, nivel)
+    temporal = f"{destino}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"llave": llave, "industrias": indice}, f, ensure_ascii=False, indent=1)
+    os.replace(temporal, destino)
+    return indice
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precalcula el índice bootstrap de incidentes por industria.")
+    parser.add_argument("incidentes", help="CSV o Parquet con industria, dias_paro, costo")
+    parser.add_argument("--exposicion", help="CSV con industria, planta_anios")
+    parser.add_argument("--remuestras", type=int, default=N_REMUESTRAS)
+    args = parser.parse_args(argv)
+
+    try:
+        indice = cargar_indice(args.incidentes, args.exposicion, args.remuestras)
+    except (ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    for industria, r in indice.items():
+        print(f"{industria:<25} n={r['incidentes']:>7,}  días={r['dias_paro']:.1f} "
+              f"[{r['dias_paro_ic'][0]:.1f}, {r['dias_paro_ic'][1]:.1f}]  p={r['probabilidad']:.3f}")
+    print(f"Índice guardado en {ruta_indice(args.incidentes)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
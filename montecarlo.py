@@ -0,0 +1,102 @@
+import numpy as np
+
+from motor_roi import calcular_ale_ciber
+
+# ==============================================================================
+# SIMULACIÓN MONTE CARLO (Riesgo Ciber)
+# ==============================================================================
+# Cada entrada de la pestaña de ciberseguridad puede ser un valor fijo o una
+# distribución. Se sortean todas las muestras de golpe (vectorizado) y se
+# reportan percentiles y la curva de excedencia de pérdidas.
+#
+# Formatos de distribución aceptados:
+#   12000.0                                  -> valor fijo
+#   ("triangular", minimo, moda, maximo)
+#   ("lognormal", mediana, sigma)             -> sigma en escala logarítmica
+#   ("beta", a, b)                            -> en [0, 1]
+#   ("beta", a, b, minimo, maximo)            -> reescalada a [minimo, maximo]
+
+PERCENTILES = (50, 90, 99)
+
+
+def muestrear(dist, n, rng):
+    """Devuelve n muestras de la distribución indicada (ver formatos arriba)."""
+    if not isinstance(dist, (tuple, list)):
+        return np.full(n, float(dist))
+
+    tipo, *params = dist
+    if tipo == "triangular":
+        minimo, moda, maximo = params
+        if minimo == maximo:
+            return np.full(n, float(moda))
+        return rng.triangular(minimo, moda, maximo, n)
+    if tipo == "lognormal":
+        mediana, sigma = params
+        return rng.lognormal(np.log(mediana), sigma, n)
+    if tipo == "beta":
+        a, b, *rango = params
+        minimo, maximo = rango if rango else (0.0, 1.0)
+        return minimo + (maximo - minimo) * rng.beta(a, b, n)
+    raise ValueError(f"Distribución no soportada: {tipo}")
+
+
+def beta_desde_media(media, concentracion, minimo=0.0, maximo=1.0):
+    """Arma una beta (a, b) con la media dada; más concentración = menos dispersión."""
+    frac = (media - minimo) / (maximo - minimo)
+    frac = min(max(frac, 1e-6), 1 - 1e-6)
+    return ("beta", frac * concentracion, (1 - frac) * concentracion, minimo, maximo)
+
+
+def curva_excedencia(perdidas, n, grid):
+    """Probabilidad de que la pérdida anual supere cada valor de grid.
+
+    perdidas: solo los montos de los años con evento (los demás son 0).
+    n: número total de años simulados.
+    """
+    ordenadas = np.sort(perdidas)
+    return (ordenadas.size - np.searchsorted(ordenadas, grid, side="right")) / n
+
+
+def simular_ciber(ingreso_diario, dias_paro, probabilidad, costo_ciber, mitigacion,
+                  n=1_000_000, semilla=None, puntos_curva=100):
+    """Simula n años de riesgo ransomware con entradas inciertas.
+
+    Devuelve percentiles (P50/P90/P99) de ALE, ahorro y ROI, y la curva de
+    excedencia de pérdidas actual vs. con solución.
+    """
+    rng = np.random.default_rng(semilla)
+
+    ingreso = muestrear(ingreso_diario, n, rng)
+    dias = muestrear(dias_paro, n, rng)
+    prob = np.clip(muestrear(probabilidad, n, rng), 0.0, 1.0)
+    costo = muestrear(costo_ciber, n, rng)
+    mitig = np.clip(muestrear(mitigacion, n, rng), 0.0, 1.0)
+
+    r = calcular_ale_ciber(ingreso, dias, prob, costo, mitig)
+
+    # Año simulado: ocurre el evento con probabilidad p (con solución, p*(1-mitigación)).
+    # Se usa el mismo sorteo para que ambos escenarios sean comparables.
+    u = rng.random(n)
+    impacto = r["impacto_evento"]
+    perdida_actual = impacto[u < prob]
+    perdida_futura = impacto[u < prob * (1 - mitig)]
+
+    maximo = float(perdida_actual.max()) if perdida_actual.size else float(impacto.max())
+    grid = np.linspace(0.0, maximo, puntos_curva)
+
+    percentiles = {
+        clave: dict(zip(PERCENTILES, map(float, np.percentile(r[clave], PERCENTILES))))
+        for clave in ("ale_actual", "ale_futuro", "ahorro_riesgo", "roi_ciber")
+    }
+
+    return {
+        "n": n,
+        "percentiles": percentiles,
+        "media": {clave: float(r[clave].mean()) for clave in percentiles},
+        "prob_roi_positivo": float((r["roi_ciber"] > 0).mean()),
+        "curva_excedencia": {
+            "perdida": grid,
+            "prob_actual": curva_excedencia(perdida_actual, n, grid),
+            "prob_futuro": curva_excedencia(perdida_futura, n, grid),
+        },
+    }
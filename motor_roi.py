@@ -0,0 +1,89 @@
+import numpy as np
+
+# ==============================================================================
+# MOTOR DE CÁLCULO ROI (Vectorizado)
+# ==============================================================================
+# Misma lógica que la pestaña "ROI Operativo (OEE)" de Calculator.py, pero
+# acepta escalares o arreglos de NumPy en cada entrada. Un solo llamado evalúa
+# cientos de miles de escenarios (barridos de mejora_oee / costo_solucion).
+
+CAMPOS_OEE = (
+    "prod_anual", "precio_unit", "margen_pct", "horas_anuales",
+    "costo_hora_duro", "costo_solucion", "mejora_oee",
+)
+
+
+def _como_arreglos(*valores):
+    """Convierte las entradas a float64 y las alinea por broadcasting."""
+    return np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in valores))
+
+
+def _dividir(num, den):
+    """División elemento a elemento que devuelve 0 donde el denominador es <= 0."""
+    out = np.zeros(np.broadcast(num, den).shape, dtype=np.float64)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def calcular_roi_oee(prod_anual, precio_unit, margen_pct, horas_anuales,
+                     costo_hora_duro, costo_solucion, mejora_oee):
+    """Calcula el ROI operativo por eficiencia (OEE) para uno o muchos escenarios.
+
+    Los porcentajes (margen_pct, mejora_oee) van en fracción (0.30 = 30%).
+    Devuelve un dict de arreglos con la forma común de las entradas.
+    """
+    (prod_anual, precio_unit, margen_pct, horas_anuales,
+     costo_hora_duro, costo_solucion, mejora_oee) = _como_arreglos(
+        prod_anual, precio_unit, margen_pct, horas_anuales,
+        costo_hora_duro, costo_solucion, mejora_oee)
+
+    # 1. Ganancia por Volumen (Opportunity Cost)
+    unidades_hora = _dividir(prod_anual, horas_anuales)
+    horas_ganadas = horas_anuales * mejora_oee
+    unidades_extra = horas_ganadas * unidades_hora
+    ganancia_extra = unidades_extra * precio_unit * margen_pct
+
+    # 2. Ahorro por Eficiencia (Hard Costs)
+    ahorro_costos = horas_ganadas * costo_hora_duro
+
+    # 3. Totales
+    beneficio_total = ganancia_extra + ahorro_costos
+    net_value = beneficio_total - costo_solucion
+    roi = _dividir(net_value, costo_solucion) * 100
+    payback = _dividir(costo_solucion, beneficio_total) * 12
+
+    return {
+        "unidades_hora": unidades_hora,
+        "horas_ganadas": horas_ganadas,
+        "unidades_extra": unidades_extra,
+        "ganancia_extra": ganancia_extra,
+        "ahorro_costos": ahorro_costos,
+        "beneficio_total": beneficio_total,
+        "net_value": net_value,
+        "roi": roi,
+        "payback": payback,
+    }
+
+
+def calcular_ale_ciber(ingreso_diario, dias_paro, probabilidad, costo_ciber, mitigacion):
+    """Calcula la Pérdida Anual Esperada (ALE) y el ROI de ciberseguridad.
+
+    Misma lógica que la pestaña "ROI Ciberseguridad"; probabilidad y
+    mitigacion van en fracción. Acepta escalares o arreglos.
+    """
+    ingreso_diario, dias_paro, probabilidad, costo_ciber, mitigacion = _como_arreglos(
+        ingreso_diario, dias_paro, probabilidad, costo_ciber, mitigacion)
+
+    impacto_evento = (ingreso_diario * dias_paro) * 1.2  # 1.2 factor de recuperación técnica
+    ale_actual = impacto_evento * probabilidad
+    ale_futuro = ale_actual * (1 - mitigacion)
+    ahorro_riesgo = ale_actual - ale_futuro
+    roi_ciber = _dividir(ahorro_riesgo - costo_ciber, costo_ciber) * 100
+
+    return {
+        "impacto_evento": impacto_evento,
+        "ale_actual": ale_actual,
+        "ale_futuro": ale_futuro,
+        "ahorro_riesgo": ahorro_riesgo,
+        "roi_ciber": roi_ciber,
+    }
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+from portafolio import leer_en_bloques
+
+# ==============================================================================
+# OEE REAL DESDE BITÁCORAS DE MÁQUINA
+# ==============================================================================
+# Lee bitácoras de cambios de estado (CSV/Parquet, decenas de millones de filas)
+# por bloques y calcula Disponibilidad x Rendimiento x Calidad por línea, turno
+# y día. Cada fila marca el INICIO de un estado; dura hasta el siguiente evento
+# de la misma línea. Los intervalos que cruzan un cambio de turno se reparten
+# entre ambos turnos. La memoria queda acotada al bloque más las sumas parciales.
+#
+# Columnas esperadas (renombrables con `columnas=`):
+#   timestamp     fecha/hora del evento (la bitácora debe venir ordenada por tiempo)
+#   linea         identificador de la línea o máquina
+#   estado        ver ESTADOS_OPERANDO / ESTADOS_PLANEADOS; lo demás es paro no planeado
+#   piezas        (opcional) piezas producidas durante el intervalo
+#   piezas_malas  (opcional) piezas rechazadas durante el intervalo
+#   ciclo_ideal_seg (opcional) tiempo de ciclo ideal; si no viene se usa el parámetro
+
+ESTADOS_OPERANDO = {"PRODUCCION", "OPERANDO", "RUN", "RUNNING"}
+ESTADOS_PLANEADOS = {"PLANEADO", "PARO_PLANEADO", "PLANNED", "SIN_TURNO"}
+COLUMNAS = {"timestamp": "timestamp", "linea": "linea", "estado": "estado",
+            "piezas": "piezas", "piezas_malas": "piezas_malas", "ciclo_ideal_seg": "ciclo_ideal_seg"}
+SUMAS = ["t_total", "t_planeado", "t_operando", "t_ideal", "piezas", "piezas_malas"]
+OEE_CLASE_MUNDIAL = 0.85
+
+
+def _normalizar(df, columnas, ciclo_ideal_seg):
+    """Convierte un bloque crudo a las columnas internas (tiempos en segundos enteros)."""
+    c = {**COLUMNAS, **(columnas or {})}
+    faltantes = [c[k] for k in ("timestamp", "linea", "estado") if c[k] not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en la bitácora: {', '.join(faltantes)}")
+
+    estado = df[c["estado"]].astype(str).str.strip().str.upper()
+    out = pd.DataFrame({
+        "ts": pd.to_datetime(df[c["timestamp"]]).to_numpy("datetime64[s]").astype(np.int64),
+        "linea": df[c["linea"]].astype(str).to_numpy(),
+        "operando": estado.isin(ESTADOS_OPERANDO).to_numpy(),
+        "planeado": estado.isin(ESTADOS_PLANEADOS).to_numpy(),
+    })
+    for k in ("piezas", "piezas_malas"):
+        out[k] = df[c[k]].fillna(0).to_numpy(dtype=np.float64) if c[k] in df.columns else 0.0
+    if c["ciclo_ideal_seg"] in df.columns:
+        out["ciclo"] = df[c["ciclo_ideal_seg"]].to_numpy(dtype=np.float64)
+    else:
+        out["ciclo"] = float(ciclo_ideal_seg)
+    return out
+
+
+def _cerrar_intervalos(df, pendientes):
+    """Asigna a cada evento su fin (el siguiente evento de la línea).
+
+    Devuelve (eventos con fin, último evento abierto de cada línea).
+    """
+    if pendientes is not None:
+        df = pd.concat([pendientes, df], ignore_index=True)
+    df = df.sort_values(["linea", "ts"], kind="stable", ignore_index=True)
+    fin = df.groupby("linea", sort=False)["ts"].shift(-1)
+    abiertos = fin.isna().to_numpy()
+    cerrados = df[~abiertos].assign(fin=fin[~abiertos].astype(np.int64).to_numpy())
+    return cerrados, df[abiertos]
+
+
+def _repartir_turnos(df, horas_turno, inicio_turno_h):
+    """Parte cada intervalo en los turnos que cruza (vectorizado) y devuelve sumas por grupo."""
+    seg_turno = int(horas_turno * 3600)
+    desfase = int(inicio_turno_h * 3600)
+    ini, fin = df["ts"].to_numpy(), df["fin"].to_numpy()
+    k0 = (ini - desfase) // seg_turno
+    k1 = np.maximum((fin - desfase - 1) // seg_turno, k0)
+    reps = (k1 - k0 + 1).astype(np.int64)
+
+    fila = np.repeat(np.arange(len(df)), reps)
+    k = k0[fila] + (np.arange(reps.sum()) - np.repeat(np.cumsum(reps) - reps, reps))
+    a = np.maximum(ini[fila], desfase + k * seg_turno)
+    b = np.minimum(fin[fila], desfase + (k + 1) * seg_turno)
+    dur = (b - a).astype(np.float64)
+    total = (fin - ini)[fila].astype(np.float64)
+    frac = np.divide(dur, total, out=np.ones_like(dur), where=total > 0)
+
+    operando = df["operando"].to_numpy()[fila]
+    piezas = df["piezas"].to_numpy()[fila] * frac
+    turnos_por_dia = max(1, int(round(24 / horas_turno)))
+    partes = pd.DataFrame({
+        "linea": df["linea"].to_numpy()[fila],
+        "fecha": (k * seg_turno // 86400).astype("datetime64[D]"),
+        "turno": (k % turnos_por_dia + 1).astype(np.int64),
+        "t_total": dur,
+        "t_planeado": np.where(df["planeado"].to_numpy()[fila], dur, 0.0),
+        "t_operando": np.where(operando, dur, 0.0),
+        "t_ideal": piezas * df["ciclo"].to_numpy()[fila],
+        "piezas": piezas,
+        "piezas_malas": df["piezas_malas"].to_numpy()[fila] * frac,
+    })
+    return partes.groupby(["linea", "fecha", "turno"], sort=False)[SUMAS].sum()
+
+
+def calcular_indicadores(sumas):
+    """Agrega disponibilidad, rendimiento, calidad y OEE a un DataFrame de sumas."""
+    df = sumas.copy()
+    disponible = df["t_total"] - df["t_planeado"]
+    df["horas_planeadas"] = disponible / 3600
+    df["disponibilidad"] = np.divide(df["t_operando"], disponible, out=np.zeros(len(df)), where=disponible > 0)
+    df["rendimiento"] = np.clip(np.divide(df["t_ideal"], df["t_operando"], out=np.zeros(len(df)),
+                                          where=df["t_operando"] > 0), 0.0, 1.0)
+    df["calidad"] = np.divide(df["piezas"] - df["piezas_malas"], df["piezas"], out=np.ones(len(df)),
+                              where=df["piezas"] > 0)
+    df["oee"] = df["disponibilidad"] * df["rendimiento"] * df["calidad"]
+    return df
+
+
+def oee_desde_bitacora(origen, formato=None, tam_bloque=1_000_000, ciclo_ideal_seg=1.0,
+                       horas_turno=8, inicio_turno_h=6, columnas=None, progreso=None):
+    """Procesa la bitácora completa por bloques. Devuelve OEE por (linea, fecha, turno).
+
+    El último evento de cada línea no tiene fin conocido y se descarta.
+    progreso: función opcional que recibe el acumulado de filas leídas.
+    """
+    parciales, pendientes, leidas = [], None, 0
+    for bloque in leer_en_bloques(origen, formato, tam_bloque):
+        eventos, pendientes = _cerrar_intervalos(_normalizar(bloque, columnas, ciclo_ideal_seg), pendientes)
+        if len(eventos):
+            parciales.append(_repartir_turnos(eventos, horas_turno, inicio_turno_h))
+        # Compactar de vez en cuando para que las sumas parciales no crezcan sin límite
+        if len(parciales) >= 16:
+            parciales = [pd.concat(parciales).groupby(level=[0, 1, 2]).sum()]
+        leidas += len(bloque)
+        if progreso:
+            progreso(leidas)
+
+    if not parciales:
+        return calcular_indicadores(pd.DataFrame(columns=["linea", "fecha", "turno"] + SUMAS)
+                                    .set_index(["linea", "fecha", "turno"]).astype(float))
+    sumas = pd.concat(parciales).groupby(level=[0, 1, 2]).sum().sort_index()
+    return calcular_indicadores(sumas)
+
+
+def agregar_oee(por_turno, niveles=("linea",)):
+    """Re-agrega el resultado por turno a otro nivel (por línea, por día, planta completa...)."""
+    if not niveles:
+        sumas = por_turno[SUMAS].sum().to_frame().T
+    else:
+        sumas = por_turno[SUMAS].groupby(level=list(niveles)).sum()
+    return calcular_indicadores(sumas)
+
+
+def resumen_para_roi(por_turno, lineas=None, recuperable=0.5):
+    """Traduce la bitácora a entradas de la pestaña OEE.
+
+    horas_anuales: horas planeadas promedio por línea, anualizadas.
+    mejora_oee: fracción `recuperable` de la brecha contra OEE de clase mundial (85%).
+    """
+    df = por_turno
+    if lineas is not None:
+        df = df[df.index.get_level_values("linea").isin(lineas)]
+    total = agregar_oee(df, niveles=())
+    n_lineas = max(1, df.index.get_level_values("linea").nunique())
+    n_dias = max(1, df.index.get_level_values("fecha").nunique())
+    oee = float(total["oee"].iloc[0])
+    return {
+        "oee_actual": oee,
+        "disponibilidad": float(total["disponibilidad"].iloc[0]),
+        "rendimiento": float(total["rendimiento"].iloc[0]),
+        "calidad": float(total["calidad"].iloc[0]),
+        "horas_anuales": float(total["horas_planeadas"].iloc[0]) / n_lineas / n_dias * 365,
+        "mejora_oee": max(0.0, OEE_CLASE_MUNDIAL - oee) * recuperable,
+    }
@@ -0,0 +1,300 @@
+import math
+import time
+
+import numpy as np
+
+# ==============================================================================
+# OPTIMIZADOR DE PRESUPUESTO (Lógica de Dependencias)
+# ==============================================================================
+# Dado un catálogo de módulos con costo, impacto y prerrequisitos, encuentra el
+# conjunto factible (todo módulo elegido tiene sus prerrequisitos elegidos) que
+# maximiza el impacto sin pasarse del presupuesto.
+#
+# Se usa programación dinámica sobre el orden topológico, memoizando por
+# "frontera" (prerrequisitos elegidos que aún se necesitan) y vectorizada sobre
+# el presupuesto. Es exacta mientras las fronteras de cada paso quepan en el haz
+# (árboles poco profundos y grafos poco densos); si la frontera crece demasiado
+# se recorta a los estados más prometedores y la solución se marca como no
+# garantizada. El haz empieza chico y se duplica mientras haya recortes y quede
+# tiempo (TIEMPO_MAXIMO), con el tope de memoria repartido entre las unidades
+# del presupuesto: los árboles salen exactos en milisegundos y los grafos
+# densos devuelven la mejor selección encontrada a tiempo.
+#
+# Los costos se discretizan en unidades (el MCD de los costos, o más gruesas si
+# el presupuesto es enorme); al redondear siempre hacia arriba, la solución
+# nunca excede el presupuesto real.
+
+CATALOGO_BASE = [
+    {"nombre": "Monitoreo", "costo": 10000, "impacto": 0.05, "requiere": []},
+    {"nombre": "Integración", "costo": 15000, "impacto": 0.03, "requiere": ["Monitoreo"]},
+    {"nombre": "Predictivo", "costo": 25000, "impacto": 0.12, "requiere": ["Integración"]},
+    {"nombre": "Ciberseguridad", "costo": 8000, "impacto": 0.0, "requiere": []},
+]
+
+MAX_UNIDADES = 5_000       # Resolución máxima del presupuesto
+MAX_ESTADOS = 4_096        # Fronteras distintas por paso antes de recortar
+MAX_CELDAS = 20_000_000    # Tope de memoria de la DP (float32)
+HAZ_INICIAL = 64           # Estados por paso en la primera pasada
+TIEMPO_MAXIMO = 0.5        # Segundos para ensanchar el haz; la respuesta debe salir en menos de 1 s
+
+
+def orden_topologico(catalogo):
+    """Valida el catálogo y devuelve los nombres en orden topológico.
+
+    Lanza ValueError si hay nombres repetidos, prerrequisitos desconocidos o ciclos.
+    """
+    nombres = [m["nombre"] for m in catalogo]
+    if len(set(nombres)) != len(nombres):
+        raise ValueError("Hay módulos con nombre repetido en el catálogo.")
+    requiere = {m["nombre"]: list(m.get("requiere") or []) for m in catalogo}
+    for nombre, reqs in requiere.items():
+        for r in reqs:
+            if r not in requiere:
+                raise ValueError(f"'{nombre}' requiere '{r}', que no existe en el catálogo.")
+
+    pendientes = {n: len(reqs) for n, reqs in requiere.items()}
+    dependientes = {n: [] for n in requiere}
+    for n, reqs in requiere.items():
+        for r in reqs:
+            dependientes[r].append(n)
+
+    # Entre los módulos listos se prefiere el que "cierra" más prerrequisitos
+    # abiertos y abre menos; así la frontera del optimizador se mantiene angosta.
+    por_cerrar = {n: len(dependientes[n]) for n in nombres}
+
+    def puntaje(n):
+        cierra = sum(1 for r in requiere[n] if por_cerrar[r] == 1)
+        return cierra - (1 if dependientes[n] else 0)
+
+    listos = [n for n in nombres if pendientes[n] == 0]
+    orden = []
+    while listos:
+        k = max(range(len(listos)), key=lambda i: (puntaje(listos[i]), i))
+        n = listos.pop(k)
+        orden.append(n)
+        for r in requiere[n]:
+            por_cerrar[r] -= 1
+        for d in dependientes[n]:
+            pendientes[d] -= 1
+            if pendientes[d] == 0:
+                listos.append(d)
+    if len(orden) != len(nombres):
+        raise ValueError("El catálogo tiene dependencias circulares.")
+    return orden
+
+
+def cerradura(nombres, catalogo):
+    """Devuelve los módulos indicados junto con todos sus prerrequisitos (transitivos)."""
+    requiere = {m["nombre"]: list(m.get("requiere") or []) for m in catalogo}
+    resultado, pila = set(), list(nombres)
+    while pila:
+        n = pila.pop()
+        if n not in resultado:
+            resultado.add(n)
+            pila.extend(requiere[n])
+    return resultado
+
+
+def _unidad_costo(costos, presupuesto):
+    """Elige la unidad de discretización. Devuelve (unidad, exacta)."""
+    enteros = [int(c) for c in costos if c > 0 and float(c).is_integer()]
+    exacta = len(enteros) == sum(1 for c in costos if c > 0)
+    unidad = math.gcd(*enteros) if exacta and enteros else 1
+    if presupuesto / unidad > MAX_UNIDADES:
+        unidad, exacta = presupuesto / MAX_UNIDADES, False
+    return unidad, exacta
+
+
+def _vivos(reqs):
+    """vivos[i]: máscara de módulos que todavía son prerrequisito de algún módulo >= i."""
+    n = len(reqs)
+    ultimo_uso = [-1] * n
+    for j in range(n):
+        for r in reqs[j]:
+            ultimo_uso[r] = max(ultimo_uso[r], j)
+    return [sum(1 << r for r in range(n) if ultimo_uso[r] >= i) for i in range(n + 1)]
+
+
+def _paso(capa, i, items, vivos, prereqs, capacidad, max_estados):
+    """Capa i+1 a partir de la capa i (decidir el módulo i). Devuelve (capa, recortada).
+
+    Es determinista: recalcular un tramo desde la misma capa da exactamente los
+    mismos valores, y la reconstrucción se apoya en eso.
+    """
+    costo, impacto = items[i]["unidades"], np.float32(items[i]["impacto"])
+    nueva = {}
+    for estado, valores in capa.items():
+        sin = estado & vivos[i + 1]
+        nueva[sin] = np.maximum(nueva[sin], valores) if sin in nueva else valores
+        if estado & prereqs[i] == prereqs[i] and costo <= capacidad:
+            con = (estado | (1 << i)) & vivos[i + 1]
+            tomar = np.full(capacidad + 1, -np.inf, dtype=np.float32)
+            tomar[costo:] = valores[:capacidad + 1 - costo] + impacto
+            nueva[con] = np.maximum(nueva[con], tomar) if con in nueva else tomar
+    if len(nueva) <= max_estados:
+        return nueva, False
+    mejores = sorted(nueva, key=lambda e: nueva[e][-1], reverse=True)[:max_estados]
+    return {e: nueva[e] for e in mejores}, True
+
+
+def _paso_atras(capa, i, items, vivos, prereqs, destino):
+    """Qué transición de la capa i produjo `destino` = (estado, presupuesto, valor) en la capa i+1."""
+    estado, b, valor = destino
+    costo, impacto = items[i]["unidades"], np.float32(items[i]["impacto"])
+    for previo, valores in capa.items():
+        if previo & vivos[i + 1] == estado and valores[b] == valor:
+            return (previo, b, valor), []
+        if (previo & prereqs[i] == prereqs[i] and costo <= b
+                and (previo | (1 << i)) & vivos[i + 1] == estado
+                and valores[b - costo] + impacto == valor):
+            return (previo, b - costo, valores[b - costo]), [i]
+    raise RuntimeError("No se encontró la transición al reconstruir la solución.")
+
+
+def _tramo(n):
+    """Capas entre puntos de control de la reconstrucción (~raíz de n)."""
+    return max(1, math.isqrt(max(n, 1)))
+
+
+def _max_estados(n, capacidad):
+    """Estados por capa que caben en MAX_CELDAS con las capas que viven a la vez."""
+    tramo = _tramo(n)
+    capas_vivas = math.ceil(n / tramo) + tramo + 1
+    return max(1, min(MAX_ESTADOS, MAX_CELDAS // (capas_vivas * (capacidad + 1))))
+
+
+def _resolver_frontera(items, reqs, capacidad, max_estados):
+    """DP sobre el orden topológico, vectorizada sobre el presupuesto.
+
+    El estado es la "frontera": los módulos elegidos que algún módulo pendiente
+    todavía requiere. En árboles recorridos en profundidad la frontera es solo
+    la rama actual, así que el número de estados se mantiene chico. Si una capa
+    excede max_estados se conservan los más prometedores (haz) y la solución
+    deja de ser óptima garantizada.
+
+    No se guardan todas las capas: la pasada hacia adelante deja un punto de
+    control cada ~raíz de n capas y la reconstrucción recalcula un tramo a la
+    vez desde su punto de control, así viven O(raíz de n) capas y todo cuesta
+    unas dos pasadas.
+
+    Devuelve (índices elegidos, exacta).
+    """
+    n = len(items)
+    if n == 0:
+        return [], True
+    vivos = _vivos(reqs)
+    prereqs = [sum(1 << r for r in reqs[j]) for j in range(n)]
+    tramo = _tramo(n)
+
+    capa = {0: np.zeros(capacidad + 1, dtype=np.float32)}  # estado -> mejor impacto por presupuesto
+    puntos, recortada = {0: capa}, False
+    for i in range(n):
+        capa, recorte = _paso(capa, i, items, vivos, prereqs, capacidad, max_estados)
+        recortada |= recorte
+        if (i + 1) % tramo == 0 and i + 1 < n:
+            puntos[i + 1] = capa
+
+    # La última capa tiene un solo estado (ya no queda nada vivo): se reconstruye desde ahí
+    destino, elegidos = (0, capacidad, capa[0][capacidad]), []
+    for desde in sorted(puntos, reverse=True):
+        hasta = min(desde + tramo, n)
+        capas = [puntos.pop(desde)]
+        for i in range(desde, hasta - 1):
+            capas.append(_paso(capas[-1], i, items, vivos, prereqs, capacidad, max_estados)[0])
+        for i in range(hasta - 1, desde - 1, -1):
+            destino, tomado = _paso_atras(capas.pop(), i, items, vivos, prereqs, destino)
+            elegidos.extend(tomado)
+    return sorted(elegidos), not recortada
+
+
+def _resolver(items, reqs, capacidad, tiempo=TIEMPO_MAXIMO):
+    """Corre la DP con un haz que se duplica mientras haya recortes y quede tiempo.
+
+    Cada pasada cuesta más o menos el doble que la anterior; no se empieza una
+    que no alcance a terminar dentro de `tiempo`. Devuelve (índices elegidos, exacta).
+    """
+    inicio = time.perf_counter()
+    tope = _max_estados(len(items), capacidad)
+    haz, mejor = min(HAZ_INICIAL, tope), None
+    while True:
+        comienzo = time.perf_counter()
+        elegidos, exacta = _resolver_frontera(items, reqs, capacidad, haz)
+        if exacta:
+            return elegidos, True
+        if mejor is None or sum(items[i]["impacto"] for i in elegidos) > sum(items[i]["impacto"] for i in mejor):
+            mejor = elegidos
+        ahora = time.perf_counter()
+        if haz >= tope or ahora - inicio + 2 * (ahora - comienzo) > tiempo:
+            return mejor, False
+        haz = min(2 * haz, tope)
+
+
+def _greedy(items, reqs, capacidad):
+    """Respaldo: agrega el paquete (módulo + prerrequisitos faltantes) con mejor impacto/costo."""
+    elegidos, restante = set(), capacidad
+    while True:
+        mejor_paquete, mejor_razon = None, 0.0
+        for j in range(len(items)):
+            if j in elegidos:
+                continue
+            paquete, pila = set(), [j]
+            while pila:
+                k = pila.pop()
+                if k not in elegidos and k not in paquete:
+                    paquete.add(k)
+                    pila.extend(reqs[k])
+            costo = sum(items[k]["unidades"] for k in paquete)
+            impacto = sum(items[k]["impacto"] for k in paquete)
+            if costo <= restante and impacto > 0 and impacto / max(costo, 1e-9) > mejor_razon:
+                mejor_paquete, mejor_razon = paquete, impacto / max(costo, 1e-9)
+        if mejor_paquete is None:
+            return sorted(elegidos)
+        elegidos |= mejor_paquete
+        restante -= sum(items[k]["unidades"] for k in mejor_paquete)
+
+
+def optimizar_modulos(catalogo, presupuesto, obligatorios=()):
+    """Encuentra el conjunto de módulos factible que maximiza el impacto dentro del presupuesto.
+
+    catalogo: lista de dicts {"nombre", "costo", "impacto", "requiere": [nombres]}.
+    obligatorios: módulos que se incluyen sí o sí (junto con sus prerrequisitos).
+    Devuelve un dict con la selección, costo e impacto totales y si la solución
+    es óptima garantizada.
+    """
+    orden = orden_topologico(catalogo)
+    por_nombre = {m["nombre"]: m for m in catalogo}
+
+    forzados = cerradura(obligatorios, catalogo)
+    costo_forzado = sum(float(por_nombre[n]["costo"]) for n in forzados)
+    if costo_forzado > presupuesto:
+        raise ValueError(f"Los módulos obligatorios cuestan ${costo_forzado:,.0f} y exceden el presupuesto.")
+
+    # Los obligatorios ya están pagados: sus dependientes los tienen satisfechos
+    libres = [n for n in orden if n not in forzados]
+    indice = {n: i for i, n in enumerate(libres)}
+    reqs = [[indice[r] for r in (por_nombre[n].get("requiere") or []) if r not in forzados] for n in libres]
+
+    restante = presupuesto - costo_forzado
+    unidad, exacta = _unidad_costo([float(por_nombre[n]["costo"]) for n in libres], restante)
+    items = [{
+        "nombre": n,
+        "unidades": int(math.ceil(float(por_nombre[n]["costo"]) / unidad - 1e-9)),
+        "impacto": float(por_nombre[n]["impacto"]),
+    } for n in libres]
+    capacidad = int(math.floor(restante / unidad + 1e-9))
+
+    elegidos, optimo = _resolver(items, reqs, capacidad)
+    if not optimo:
+        # La DP recortada no garantiza nada: nos quedamos con la mejor de las dos
+        alterna = _greedy(items, reqs, capacidad)
+        if sum(items[i]["impacto"] for i in alterna) > sum(items[i]["impacto"] for i in elegidos):
+            elegidos = alterna
+
+    seleccion = forzados | {libres[i] for i in elegidos}
+    seleccion = [n for n in orden if n in seleccion]
+    return {
+        "seleccion": seleccion,
+        "costo_total": sum(float(por_nombre[n]["costo"]) for n in seleccion),
+        "impacto_total": sum(float(por_nombre[n]["impacto"]) for n in seleccion),
+        "optimo": optimo and exacta,
+    }
@@ -0,0 +1,159 @@
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from motor_roi import CAMPOS_OEE, calcular_roi_oee, calcular_ale_ciber
+from punto_equilibrio import mejora_minima_roi, costo_maximo_payback, probabilidad_equilibrio
+
+# ==============================================================================
+# MODO PORTAFOLIO (Multi-Planta, sin Streamlit)
+# ==============================================================================
+# Lee un CSV/Parquet con una fila por planta y calcula ROI, payback y ALE por
+# bloques, escribiendo cada bloque al archivo de salida apenas se termina.
+# La memoria queda acotada al tamaño del bloque, no al del archivo.
+#
+# Columnas (mismas unidades que la calculadora, porcentajes en 0-100):
+#   Pestaña OEE (obligatorias): prod_anual, precio_unit, margen_pct,
+#       horas_anuales, costo_hora_duro, costo_solucion, mejora_oee
+#   Pestaña Ciber (opcionales, todas o ninguna): ingreso_diario, dias_paro,
+#       probabilidad, costo_ciber, mitigacion
+#
+# Además de ROI/payback/ALE se agregan puntos de equilibrio: mejora_oee_roi_100
+# (mejora mínima para ROI >= 100%, en %), costo_max_payback_12 (inversión
+# máxima que se paga en 12 meses) y probabilidad_equilibrio (en %).
+#
+# Uso:
+#   python portafolio.py plantas.csv -o resultados.csv
+#   python portafolio.py plantas.parquet -o resultados.parquet --bloque 100000
+
+CAMPOS_CIBER = ("ingreso_diario", "dias_paro", "probabilidad", "costo_ciber", "mitigacion")
+CAMPOS_PCT = ("margen_pct", "mejora_oee", "probabilidad", "mitigacion")
+TAM_BLOQUE = 50_000
+
+
+def detectar_formato(origen):
+    """Deduce 'csv' o 'parquet' a partir de la ruta o del nombre del archivo subido."""
+    nombre = origen if isinstance(origen, str) else getattr(origen, "name", "")
+    return "parquet" if nombre.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def leer_en_bloques(origen, formato=None, tam_bloque=TAM_BLOQUE):
+    """Genera DataFrames de hasta tam_bloque filas sin cargar el archivo completo."""
+    formato = formato or detectar_formato(origen)
+    if formato == "parquet":
+        import pyarrow.parquet as pq  # Opcional: solo se necesita para Parquet
+        for lote in pq.ParquetFile(origen).iter_batches(batch_size=tam_bloque):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(origen, chunksize=tam_bloque)
+
+
+def calcular_bloque(df):
+    """Agrega las columnas de resultados (ROI, payback, ALE) a un bloque de plantas."""
+    faltantes = [c for c in CAMPOS_OEE if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltantes)}")
+
+    entradas = {c: df[c].to_numpy(dtype=float) for c in df.columns if c in CAMPOS_OEE + CAMPOS_CIBER}
+    for c in CAMPOS_PCT:
+        if c in entradas:
+            entradas[c] = entradas[c] / 100
+
+    salida = df.copy()
+    r = calcular_roi_oee(*(entradas[c] for c in CAMPOS_OEE))
+    for clave in ("beneficio_total", "net_value", "roi", "payback"):
+        salida[clave] = r[clave]
+    planta = [entradas[c] for c in CAMPOS_OEE[:5]]
+    salida["mejora_oee_roi_100"] = mejora_minima_roi(*planta, entradas["costo_solucion"], 100.0) * 100
+    salida["costo_max_payback_12"] = costo_maximo_payback(*planta, entradas["mejora_oee"], 12.0)
+
+    presentes = [c for c in CAMPOS_CIBER if c in df.columns]
+    if presentes:
+        if len(presentes) != len(CAMPOS_CIBER):
+            faltan = [c for c in CAMPOS_CIBER if c not in df.columns]
+            raise ValueError(f"Columnas de ciberseguridad incompletas, faltan: {', '.join(faltan)}")
+        rc = calcular_ale_ciber(*(entradas[c] for c in CAMPOS_CIBER))
+        for clave in ("impacto_evento", "ale_actual", "ale_futuro", "ahorro_riesgo", "roi_ciber"):
+            salida[clave] = rc[clave]
+        salida["probabilidad_equilibrio"] = probabilidad_equilibrio(
+            entradas["ingreso_diario"], entradas["dias_paro"], entradas["costo_ciber"], entradas["mitigacion"]) * 100
+
+    return salida
+
+
+class EscritorResultados:
+    """Escribe bloques de resultados a CSV o Parquet de forma incremental."""
+
+    def __init__(self, destino, formato=None):
+        self.destino = destino
+        self.formato = formato or detectar_formato(destino)
+        self._parquet = None
+        self._primero = True
+
+    def escribir(self, df):
+        if self.formato == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            tabla = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.destino, tabla.schema)
+            self._parquet.write_table(tabla.cast(self._parquet.schema))
+        else:
+            modo = "w" if self._primero else "a"
+            if isinstance(self.destino, str):
+                df.to_csv(self.destino, mode=modo, header=self._primero, index=False)
+            else:
+                df.to_csv(self.destino, header=self._primero, index=False)
+        self._primero = False
+
+    def cerrar(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def procesar_portafolio(origen, destino, formato_entrada=None, formato_salida=None,
+                        tam_bloque=TAM_BLOQUE, progreso=None):
+    """Procesa el portafolio completo bloque por bloque. Devuelve el total de filas.
+
+    progreso: función opcional que recibe el acumulado de filas tras cada bloque.
+    """
+    total = 0
+    with EscritorResultados(destino, formato_salida) as escritor:
+        for bloque in leer_en_bloques(origen, formato_entrada, tam_bloque):
+            escritor.escribir(calcular_bloque(bloque))
+            total += len(bloque)
+            if progreso:
+                progreso(total)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calcula ROI, payback y ALE para un portafolio de plantas.")
+    parser.add_argument("entrada", help="Archivo CSV o Parquet con una planta por fila")
+    parser.add_argument("-o", "--salida", help="Archivo de resultados (CSV o Parquet). Por defecto <entrada>_resultados.csv")
+    parser.add_argument("--bloque", type=int, default=TAM_BLOQUE, help="Filas por bloque")
+    args = parser.parse_args(argv)
+
+    salida = args.salida or f"{os.path.splitext(args.entrada)[0]}_resultados.csv"
+    try:
+        total = procesar_portafolio(
+            args.entrada, salida, tam_bloque=args.bloque,
+            progreso=lambda n: print(f"  {n:,} plantas procesadas...", file=sys.stderr),
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Listo: {total:,} plantas -> {salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import numpy as np
+
+from motor_roi import _como_arreglos, calcular_roi_oee, calcular_ale_ciber
+
+# ==============================================================================
+# PUNTO DE EQUILIBRIO (Goal-Seek)
+# ==============================================================================
+# Responde preguntas inversas ("¿cuánta mejora necesito para ROI >= 100%?").
+# Donde el modelo es lineal se despeja en forma cerrada; para cualquier otra
+# combinación variable/métrica hay una bisección vectorizada que resuelve todo
+# un portafolio a la vez. Todas las funciones aceptan escalares o arreglos y
+# devuelven NaN donde el objetivo es inalcanzable.
+
+
+def _beneficio_por_mejora(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro):
+    """Beneficio anual por cada unidad de mejora OEE (el beneficio es lineal en la mejora)."""
+    venta = np.where(horas_anuales > 0, prod_anual * precio_unit * margen_pct, 0.0)
+    return venta + horas_anuales * costo_hora_duro
+
+
+def mejora_minima_roi(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro,
+                      costo_solucion, roi_objetivo=100.0):
+    """Mejora OEE mínima (fracción) para que el ROI alcance roi_objetivo (%)."""
+    prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro, costo_solucion, roi_objetivo = \
+        _como_arreglos(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro,
+                       costo_solucion, roi_objetivo)
+    k = _beneficio_por_mejora(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mejora = costo_solucion * (1 + roi_objetivo / 100) / k
+        # Una mejora mayor al 100% del OEE no existe: el objetivo es inalcanzable
+        return np.where((k > 0) & (costo_solucion > 0) & (mejora <= 1), mejora, np.nan)
+
+
+def mejora_minima_payback(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro,
+                          costo_solucion, meses=12.0):
+    """Mejora OEE mínima (fracción) para recuperar la inversión en `meses` o menos."""
+    prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro, costo_solucion, meses = \
+        _como_arreglos(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro,
+                       costo_solucion, meses)
+    k = _beneficio_por_mejora(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mejora = 12 * costo_solucion / (meses * k)
+        return np.where((k > 0) & (meses > 0) & (mejora <= 1), mejora, np.nan)
+
+
+def costo_maximo_payback(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro,
+                         mejora_oee, meses=12.0):
+    """Inversión anual máxima que todavía se recupera en `meses` o menos."""
+    prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro, mejora_oee, meses = \
+        _como_arreglos(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro,
+                       mejora_oee, meses)
+    k = _beneficio_por_mejora(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro)
+    return meses * mejora_oee * k / 12
+
+
+def costo_maximo_roi(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro,
+                     mejora_oee, roi_objetivo=100.0):
+    """Inversión anual máxima con la que el ROI todavía alcanza roi_objetivo (%)."""
+    prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro, mejora_oee, roi_objetivo = \
+        _como_arreglos(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro,
+                       mejora_oee, roi_objetivo)
+    k = _beneficio_por_mejora(prod_anual, precio_unit, margen_pct, horas_anuales, costo_hora_duro)
+    factor = 1 + roi_objetivo / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(factor > 0, mejora_oee * k / factor, np.nan)
+
+
+def probabilidad_equilibrio(ingreso_diario, dias_paro, costo_ciber, mitigacion, roi_objetivo=0.0):
+    """Probabilidad anual de ataque (fracción) a partir de la cual la protección alcanza roi_objetivo (%).
+
+    Con roi_objetivo=0 es el punto donde la inversión en ciberseguridad se paga sola.
+    """
+    ingreso_diario, dias_paro, costo_ciber, mitigacion, roi_objetivo = _como_arreglos(
+        ingreso_diario, dias_paro, costo_ciber, mitigacion, roi_objetivo)
+    # Con probabilidad 1 se obtiene el ahorro por unidad de probabilidad
+    ahorro_unitario = calcular_ale_ciber(ingreso_diario, dias_paro, 1.0, costo_ciber, mitigacion)["ahorro_riesgo"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prob = costo_ciber * (1 + roi_objetivo / 100) / ahorro_unitario
+        # Hace falta una probabilidad mayor a 1: ni con un ataque seguro se alcanza
+        return np.where((ahorro_unitario > 0) & (prob <= 1), prob, np.nan)
+
+
+# ==============================================================================
+# RESPALDO GENÉRICO: Bisección vectorizada
+# ==============================================================================
+CALCULOS = {"oee": calcular_roi_oee, "ciber": calcular_ale_ciber}
+
+
+def resolver_objetivo(calculo, entradas, variable, metrica, objetivo, minimo, maximo,
+                      iteraciones=60):
+    """Encuentra, fila por fila, el valor de `variable` que lleva `metrica` a `objetivo`.
+
+    calculo: "oee" o "ciber" (o la función del motor directamente).
+    entradas: dict con todas las demás entradas del cálculo (escalares o arreglos).
+    La métrica debe ser monótona en [minimo, maximo]; donde el objetivo no queda
+    dentro de ese intervalo se devuelve NaN.
+    """
+    funcion = CALCULOS.get(calculo, calculo)
+    otras = {k: np.asarray(v, dtype=np.float64) for k, v in entradas.items() if k != variable}
+    forma = np.broadcast_shapes(*(v.shape for v in otras.values()), np.shape(objetivo),
+                                np.shape(minimo), np.shape(maximo))
+    lo = np.broadcast_to(np.asarray(minimo, dtype=np.float64), forma).copy()
+    hi = np.broadcast_to(np.asarray(maximo, dtype=np.float64), forma).copy()
+    objetivo = np.broadcast_to(np.asarray(objetivo, dtype=np.float64), forma)
+
+    def evaluar(x):
+        return funcion(**otras, **{variable: x})[metrica] - objetivo
+
+    f_lo, f_hi = evaluar(lo), evaluar(hi)
+    valido = np.sign(f_lo) != np.sign(f_hi)
+    creciente = f_hi > f_lo
+    extremo_exacto = np.where(f_lo == 0, lo, np.where(f_hi == 0, hi, np.nan))
+    for _ in range(iteraciones):
+        medio = (lo + hi) / 2
+        f_medio = evaluar(medio)
+        # Si la métrica crece con la variable y nos pasamos, el cruce está abajo
+        abajo = (f_medio > 0) == creciente
+        hi = np.where(abajo, medio, hi)
+        lo = np.where(abajo, lo, medio)
+    resultado = np.where(np.isnan(extremo_exacto), (lo + hi) / 2, extremo_exacto)
+    return np.where(valido, resultado, np.nan)
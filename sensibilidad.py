@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from motor_roi import CAMPOS_OEE, calcular_roi_oee
+
+# ==============================================================================
+# ANÁLISIS DE SENSIBILIDAD (Tornado)
+# ==============================================================================
+# Mueve cada entrada del OEE ±X% (una a la vez, las demás en su valor base) y
+# evalúa todos los escenarios en un solo llamado vectorizado al motor.
+
+
+def tornado_oee(base, variacion=0.10, metrica="net_value"):
+    """Calcula el efecto de perturbar cada entrada ±variacion sobre net_value y payback.
+
+    base: dict con los valores de CAMPOS_OEE.
+    Devuelve un DataFrame ordenado por el rango de la métrica elegida (mayor primero).
+    """
+    k = len(CAMPOS_OEE)
+    # Fila 0 = base; filas 1..k = -X%; filas k+1..2k = +X%
+    factores = np.ones((2 * k + 1, k))
+    factores[1:k + 1][np.arange(k), np.arange(k)] = 1 - variacion
+    factores[k + 1:][np.arange(k), np.arange(k)] = 1 + variacion
+
+    valores_base = np.array([float(base[c]) for c in CAMPOS_OEE])
+    escenarios = factores * valores_base
+    r = calcular_roi_oee(*escenarios.T)
+
+    filas = []
+    for i, campo in enumerate(CAMPOS_OEE):
+        bajo, alto = 1 + i, 1 + k + i
+        filas.append({
+            "variable": campo,
+            "net_value_bajo": r["net_value"][bajo],
+            "net_value_alto": r["net_value"][alto],
+            "payback_bajo": r["payback"][bajo],
+            "payback_alto": r["payback"][alto],
+        })
+
+    df = pd.DataFrame(filas)
+    df["rango_net_value"] = (df["net_value_alto"] - df["net_value_bajo"]).abs()
+    df["rango_payback"] = (df["payback_alto"] - df["payback_bajo"]).abs()
+    df.attrs["net_value_base"] = float(r["net_value"][0])
+    df.attrs["payback_base"] = float(r["payback"][0])
+    return df.sort_values(f"rango_{metrica}", ascending=False, ignore_index=True)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos de PoC_IA se importan entre sí sin paquete (from tokens import ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "PoC_IA"))
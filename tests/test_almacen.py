@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from almacen import BLOQUE, AlmacenDocumentos, DocumentoNoDisponible
+from indice_chat import IndiceChat, formatear_pasajes, pasajes_desde_paginas
+
+
+def _texto(semilla, largo=3 * BLOQUE + 123):
+    rnd = random.Random(semilla)
+    return "".join(rnd.choice("abcdeñó \n") for _ in range(largo))
+
+
+def test_lectura_por_rango(tmp_path):
+    almacen = AlmacenDocumentos(str(tmp_path))
+    texto = _texto(0)
+    documento = almacen.guardar(texto)
+    assert almacen.leer(documento) == texto
+    for inicio, fin in [(0, 10), (BLOQUE - 5, BLOQUE + 5), (10, 3 * BLOQUE), (len(texto) - 3, len(texto) + 50)]:
+        assert almacen.leer(documento, inicio, fin) == texto[inicio:fin]
+
+
+def test_mapas_acotados_y_poda_los_cierra(tmp_path):
+    almacen = AlmacenDocumentos(str(tmp_path), mapas_abiertos=2)
+    textos = [_texto(n, 1000) for n in range(4)]
+    documentos = [almacen.guardar(t) for t in textos]
+    assert len(almacen._mapas) == 2
+    assert [almacen.leer(d) for d in documentos] == textos  # Los cerrados se vuelven a abrir
+    mapas = [m for m, *_ in almacen._mapas.values()]
+    almacen.max_bytes = 0
+    almacen.podar()
+    assert all(m.closed for m in mapas) and not almacen._mapas
+    with pytest.raises(DocumentoNoDisponible):
+        almacen.leer(documentos[0])
+
+
+def test_pasajes_del_chat_se_leen_del_almacen(tmp_path):
+    almacen = AlmacenDocumentos(str(tmp_path))
+    paginas = ["  Garantía de cumplimiento del 10%.  ", "\nPartida 3: switch de 48 puertos PoE+.\n"]
+    texto, indice, posicion = "", [], 0
+    for n, pagina in enumerate(paginas, start=1):
+        indice.append(("bases.pdf", n, posicion, posicion + len(pagina), 10))
+        texto += pagina
+        posicion += len(pagina)
+    documento = almacen.guardar(texto)
+    indice_chat = IndiceChat(texto, pasajes_desde_paginas(texto, indice))
+    pasajes = indice_chat.buscar("partida switch", k=1)
+    contexto = formatear_pasajes(pasajes, lambda inicio, fin: almacen.leer(documento, inicio, fin))
+    assert contexto == "[bases.pdf, pág. 2]\nPartida 3: switch de 48 puertos PoE+."
@@ -0,0 +1,27 @@
+from fragmentos import combinar_resultados, fragmentar
+from tokens import contar_tokens
+
+
+def test_fragmentos_cubren_el_texto_sin_pasar_el_presupuesto():
+    secciones = [f"ANEXO {n}\n" + "El licitante deberá presentar la garantía de cumplimiento. " * (20 * n)
+                 for n in range(1, 15)]
+    texto = "\n".join(secciones)
+    fragmentos = fragmentar(texto, 500)
+    assert "".join(f.texto for f in fragmentos) == texto
+    assert len(fragmentos) > 1
+    # Las secciones se cuentan por separado; unir dos puede costar un token de más
+    assert all(contar_tokens(f.texto) <= 500 + 1 for f in fragmentos)
+
+
+def test_texto_vacio_da_un_fragmento_vacio():
+    assert [f.texto for f in fragmentar("")] == [""]
+
+
+def test_matriz_control_distingue_criterios_del_mismo_documento():
+    datos = combinar_resultados([
+        {"matriz_control": [{"documento": "Acta", "criterio": "Vigente"}]},
+        {"matriz_control": [{"documento": "Acta", "criterio": "Certificada"},
+                            {"documento": "acta ", "criterio": "vigente"}]},
+    ])
+    assert datos["matriz_control"] == [{"documento": "Acta", "criterio": "Vigente"},
+                                       {"documento": "Acta", "criterio": "Certificada"}]
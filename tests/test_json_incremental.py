@@ -0,0 +1,41 @@
+from json_incremental import ParserIncremental, parsear_tolerante
+
+RESPUESTA = '{"matriz_control": [{"documento": "Acta", "criterio": "Vigente"}, {"documento": "RFC", "criterio": "Copia"}], "resumen": {"objeto": "Obra"}}'
+
+
+def parsear(texto, trozo=7):
+    parser = ParserIncremental()
+    for i in range(0, len(texto), trozo):
+        parser.alimentar(texto[i:i + trozo])
+    return parser
+
+
+def test_preambulo_con_corchetes():
+    parser = parsear('Según el documento [Anexo 1], el resultado es:\n' + RESPUESTA)
+    assert parser.completo
+    assert parser.resultado(final=True)["resumen"] == {"objeto": "Obra"}
+
+
+def test_preambulo_con_llaves_y_cercos():
+    parser = parsear('Ver {Anexo 1}:\n```json\n' + RESPUESTA + '\n```')
+    assert len(parser.resultado(final=True)["matriz_control"]) == 2
+
+
+def test_respuesta_truncada_conserva_filas_completas():
+    corte = RESPUESTA.index('"RFC"') + 3
+    parser = parsear(RESPUESTA[:corte])
+    assert not parser.completo
+    assert parser.resultado(final=True) == {"matriz_control": [{"documento": "Acta", "criterio": "Vigente"}]}
+
+
+def test_caracter_invalido_recupera_prefijo_valido():
+    roto = RESPUESTA.replace('"Copia"', 'Copia"')
+    resultado = parsear(roto).resultado(final=True)
+    assert resultado == {"matriz_control": [{"documento": "Acta", "criterio": "Vigente"}]}
+    assert parsear_tolerante(roto) == resultado
+
+
+def test_filas_parciales_mientras_llega():
+    parser = ParserIncremental()
+    parser.alimentar(RESPUESTA[:RESPUESTA.index('{"documento": "RFC"')])
+    assert parser.resultado() == {"matriz_control": [{"documento": "Acta", "criterio": "Vigente"}]}
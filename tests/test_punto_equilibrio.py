@@ -0,0 +1,55 @@
+import numpy as np
+
+from motor_roi import calcular_ale_ciber
+from punto_equilibrio import (costo_maximo_roi, mejora_minima_payback, mejora_minima_roi, probabilidad_equilibrio,
+                              resolver_objetivo)
+
+# Portafolio de tres plantas; la última no alcanza ROI 100% ni con 100% de mejora
+PLANTAS = {
+    "prod_anual": np.array([500_000.0, 1_200_000.0, 10_000.0]),
+    "precio_unit": np.array([12.0, 8.0, 5.0]),
+    "margen_pct": np.array([0.3, 0.25, 0.2]),
+    "horas_anuales": np.array([6000.0, 8000.0, 2000.0]),
+    "costo_hora_duro": np.array([150.0, 90.0, 20.0]),
+}
+
+
+def test_objetivo_inalcanzable_devuelve_nan():
+    # Haría falta más del 100% de mejora OEE / una probabilidad de ataque mayor a 1
+    assert np.isnan(mejora_minima_roi(100, 1, 0.1, 100, 1, 1e6))
+    assert np.isnan(mejora_minima_payback(100, 1, 0.1, 100, 1, 1e6))
+    assert np.isnan(probabilidad_equilibrio(100, 1, 1e6, 0.5))
+
+
+def test_objetivo_alcanzable_en_arreglos():
+    prob = probabilidad_equilibrio(np.array([100.0, 1e5]), 5, 1e4, 0.5)
+    assert np.isnan(prob[0])
+    assert 0 < prob[1] <= 1
+    # En el punto de equilibrio el ROI de la protección es 0
+    assert np.isclose(calcular_ale_ciber(1e5, 5, prob[1], 1e4, 0.5)["roi_ciber"], 0.0, atol=1e-6)
+
+
+def test_biseccion_coincide_con_forma_cerrada():
+    costo = np.array([80_000.0, 150_000.0, 500_000.0])
+    esperado = mejora_minima_roi(**PLANTAS, costo_solucion=costo, roi_objetivo=100.0)
+    assert np.isnan(esperado[2]) and not np.isnan(esperado[:2]).any()
+    obtenido = resolver_objetivo("oee", {**PLANTAS, "costo_solucion": costo}, "mejora_oee", "roi", 100.0, 0.0, 1.0)
+    np.testing.assert_allclose(obtenido, esperado, rtol=1e-9, equal_nan=True)
+
+
+def test_biseccion_sin_cruce_en_el_intervalo_devuelve_nan():
+    entradas = {**PLANTAS, "costo_solucion": 80_000.0}
+    # Con mejoras entre 0 y 0.1% el ROI se queda muy por debajo de 100%
+    assert np.isnan(resolver_objetivo("oee", entradas, "mejora_oee", "roi", 100.0, 0.0, 0.001)).all()
+
+
+def test_biseccion_con_metrica_decreciente():
+    mejora = np.array([0.05, 0.1, 0.2])
+    # El ROI baja al subir el costo: la bisección debe dar el costo máximo de la forma cerrada
+    costo = resolver_objetivo("oee", {**PLANTAS, "mejora_oee": mejora}, "costo_solucion", "roi", 100.0, 1.0, 1e8)
+    np.testing.assert_allclose(costo, costo_maximo_roi(**PLANTAS, mejora_oee=mejora, roi_objetivo=100.0), rtol=1e-9)
+    # El payback baja al subir la mejora
+    entradas = {**PLANTAS, "costo_solucion": np.array([80_000.0, 150_000.0, 500_000.0])}
+    obtenido = resolver_objetivo("oee", entradas, "mejora_oee", "payback", 12.0, 1e-6, 1.0)
+    esperado = mejora_minima_payback(**PLANTAS, costo_solucion=entradas["costo_solucion"], meses=12.0)
+    np.testing.assert_allclose(obtenido, esperado, rtol=1e-9, equal_nan=True)